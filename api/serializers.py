@@ -1,25 +1,27 @@
 from rest_framework import serializers
+from vehicles.fieldsets import SparseModelSerializer
 from django.contrib.auth import get_user_model
 from accounts.models import CustomUser
 from audit.models import AuditLog
-from notifications.models import Notification
+from notifications.fanout import validate_segment
+from notifications.models import FanoutJob, Notification
 from vehicles.models import EVTelemetry
 
 User = get_user_model()
 
 # --- User Serializers ---
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'email', 'role', 'business_name']
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(SparseModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role', 'business_name']
 
 # --- Audit & Notification ---
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(SparseModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
 
     class Meta:
@@ -27,14 +29,40 @@ class AuditLogSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'path', 'method', 'status_code', 'timestamp']
         read_only_fields = ['id', 'timestamp']
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'message', 'is_read', 'timestamp']
-        read_only_fields = ['id', 'timestamp']
+        fields = ['id', 'message', 'notification_type', 'is_read', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+class FanoutJobSerializer(SparseModelSerializer):
+    notification_type = serializers.ChoiceField(
+        choices=Notification._meta.get_field('notification_type').choices, default='info'
+    )
+
+    class Meta:
+        model = FanoutJob
+        fields = [
+            'id', 'message', 'notification_type', 'segment', 'status', 'total', 'sent_count',
+            'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'status', 'total', 'sent_count', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at',
+        ]
+
+    def validate_message(self, value):
+        if not value.strip():
+            raise serializers.ValidationError('Message cannot be empty.')
+        return value
+
+    def validate_segment(self, value):
+        try:
+            return validate_segment(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
 
 # --- Vehicle Telemetry ---
-class EVTelemetrySerializer(serializers.ModelSerializer):
+class EVTelemetrySerializer(SparseModelSerializer):
     class Meta:
         model = EVTelemetry
         fields = '__all__'
@@ -4,6 +4,11 @@ from .views import (
     UserListView,
     AuditLogListView,
     NotificationListView,
+    NotificationUnreadCountView,
+    NotificationMarkReadView,
+    FanoutJobListCreateView,
+    FanoutJobDetailView,
+    FanoutJobCancelView,
     EVTelemetryListView
 )
 from rest_framework_simplejwt.views import TokenObtainPairView
@@ -12,6 +17,11 @@ urlpatterns = [
     path('users/', UserListView.as_view(), name='api-users'),
     path('audit/', AuditLogListView.as_view(), name='api-audit'),
     path('notifications/', NotificationListView.as_view(), name='api-notifications'),
+    path('notifications/unread-count/', NotificationUnreadCountView.as_view(), name='api-notifications-unread-count'),
+    path('notifications/mark-read/', NotificationMarkReadView.as_view(), name='api-notifications-mark-read'),
+    path('notifications/fanout/', FanoutJobListCreateView.as_view(), name='api-fanout-jobs'),
+    path('notifications/fanout/<int:pk>/', FanoutJobDetailView.as_view(), name='api-fanout-job'),
+    path('notifications/fanout/<int:pk>/cancel/', FanoutJobCancelView.as_view(), name='api-fanout-job-cancel'),
     path('ev-telemetry/', EVTelemetryListView.as_view(), name='api-ev-telemetry'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('export/pdf/', generate_pdf, name='generate_pdf'),
@@ -1,39 +1,173 @@
-from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
 from accounts.models import CustomUser
+from audit.archive import parse_month, read_month
 from audit.models import AuditLog
-from notifications.models import Notification
+from notifications.counters import mark_read, unread_count
+from notifications.fanout import cancel_job, create_fanout
+from notifications.models import FanoutJob, Notification
+from vehicles.conditional import ConditionalGetMixin
+from vehicles.fastpath import FastListMixin
+from vehicles.fieldsets import SparseQuerysetMixin, requested_fieldset
 from vehicles.models import EVTelemetry
+from vehicles.pagination import KeysetPagination, CreatedAtKeysetPagination
+from vehicles.renderers import SERIES_RENDERERS
 from api.serializers import (
     CustomUserSerializer,
     AuditLogSerializer,
+    FanoutJobSerializer,
     NotificationSerializer,
     EVTelemetrySerializer
 )
 
-class UserListView(generics.ListAPIView):
+class UserListView(SparseQuerysetMixin, ConditionalGetMixin, generics.ListAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [IsAuthenticated]
 
-class AuditLogListView(generics.ListAPIView):
-    queryset = AuditLog.objects.all()
+class AuditLogListView(FastListMixin, SparseQuerysetMixin, generics.ListAPIView):
+    """
+    Recent entries come from the table. `?month=YYYY-MM` lists that month
+    instead, merging archived entries (see audit.archive) with any rows not
+    archived yet; `?user=<id>` narrows either view.
+    """
+    queryset = AuditLog.objects.select_related('user')
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
-class NotificationListView(generics.ListAPIView):
+    def get_user_id(self):
+        value = self.request.query_params.get('user')
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({'user': 'Must be an integer user id.'})
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user_id = self.get_user_id()
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        month = request.query_params.get('month')
+        if not month:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            start, end = parse_month(month)
+        except ValueError as exc:
+            raise ValidationError({'detail': str(exc)})
+        user_id = self.get_user_id()
+
+        # Sort on the entries themselves; ?fields= may leave timestamp/id out of the rows.
+        entries = list(self.get_queryset().filter(timestamp__gte=start, timestamp__lt=end))
+        keyed = [
+            ((entry.timestamp, entry.pk), row)
+            for entry, row in zip(entries, self.get_serializer(entries, many=True).data)
+        ]
+        fields, _ = requested_fieldset(request)
+        keyed += [
+            (
+                (parse_datetime(entry['timestamp']), entry['id']),
+                {key: value for key, value in entry.items() if key != 'user_id' and (fields is None or key in fields)},
+            )
+            for entry in read_month(month, user_id=user_id)
+        ]
+        rows = [row for _, row in sorted(keyed, key=lambda pair: pair[0], reverse=True)]
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(rows)
+
+class NotificationListView(SparseQuerysetMixin, ConditionalGetMixin, generics.ListAPIView):
+    """The requesting user's notifications, newest first; `?unread=1` for unread only."""
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtKeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(recipient=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+class NotificationUnreadCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread': unread_count(request.user)})
+
+class NotificationMarkReadView(APIView):
+    """POST {"ids": [...]} to mark those read, or {"all": true} for everything."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        if data.get('all') is True:
+            ids = None
+        else:
+            ids = data.get('ids')
+            # type() rather than isinstance(): JSON true/false are bools, and bool is an int
+            if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+                raise ValidationError({'detail': 'Pass "ids" as a list of notification ids, or "all": true.'})
+        changed = mark_read(request.user, ids)
+        return Response({'marked': changed, 'unread': unread_count(request.user)})
+
+class FanoutJobListCreateView(APIView):
+    """Staff broadcasts: POST {"message", "notification_type", "segment": {"role"|"make"|"region": ...}}.
+
+    The job is queued for `manage.py fanout_notifications`; poll the detail view for progress.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        jobs = FanoutJob.objects.all()[:50]
+        return Response(FanoutJobSerializer(jobs, many=True).data)
+
+    def post(self, request):
+        serializer = FanoutJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = create_fanout(created_by=request.user, **serializer.validated_data)
+        return Response(FanoutJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class FanoutJobDetailView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk):
+        return Response(FanoutJobSerializer(get_object_or_404(FanoutJob, pk=pk)).data)
+
+class FanoutJobCancelView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, pk):
+        job = get_object_or_404(FanoutJob, pk=pk)
+        if not cancel_job(job):
+            return Response({'error': f'Fan-out is already {job.status}.'}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(FanoutJobSerializer(job).data)
 
-class EVTelemetryListView(generics.ListAPIView):
+class EVTelemetryListView(FastListMixin, SparseQuerysetMixin, ConditionalGetMixin, generics.ListAPIView):
     queryset = EVTelemetry.objects.all()
     serializer_class = EVTelemetrySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    renderer_classes = SERIES_RENDERERS  # + ?format=columnar / msgpack
+    etag_append_only = True
 
 # --- PDF Export View ---
 from django.http import HttpResponse
-from reportlab.pdfgen import canvas
+from vehicles.export import write_diagnostics_pdf
 from rest_framework.decorators import api_view, permission_classes
 from datetime import datetime
 
@@ -47,14 +181,6 @@ def generate_pdf(request):
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
-    p = canvas.Canvas(response)
-    p.setTitle("Diagnostics Report")
-    p.setFont("Helvetica", 12)
-    p.drawString(100, 750, f"Hello {user.username}, your diagnostics report is ready.")
-    p.drawString(100, 730, f"Role: {user.role}")
-    p.drawString(100, 710, "This PDF was generated dynamically using ReportLab.")
-    p.drawString(100, 690, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    p.showPage()
-    p.save()
+    write_diagnostics_pdf(response, user, datetime.now())
 
     return response
@@ -7,5 +7,7 @@ class AuditLogAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'path']
     readonly_fields = ['user', 'method', 'path', 'status_code', 'timestamp']
     ordering = ['-timestamp']
+    list_select_related = ['user']
+    show_full_result_count = False
 
 admin.site.register(AuditLog, AuditLogAdmin)
@@ -0,0 +1,112 @@
+"""
+Monthly AuditLog archives: one gzip'd NDJSON file per calendar month under
+AUDIT_ARCHIVE_DIR (auditlog-YYYY-MM.ndjson.gz). Each archive run appends a
+new gzip member, which gzip readers treat as one continuous stream. A row is
+deleted from the table only after its batch has been written and fsync'd,
+so a crash in between can leave a duplicate in the archive but never lose a
+row; readers drop duplicates by id.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from rest_framework.fields import DateTimeField
+
+from .models import AuditLog
+
+MONTH_RE = re.compile(r'^(\d{4})-(\d{2})$')
+ARCHIVE_FILE_RE = re.compile(r'^auditlog-(\d{4}-\d{2})\.ndjson\.gz$')
+
+_timestamp_field = DateTimeField()
+
+def parse_month(value):
+    """'2024-05' -> (start, end) aware datetimes; ValueError if malformed."""
+    match = MONTH_RE.match(value or '')
+    if not match:
+        raise ValueError("Month must look like YYYY-MM.")
+    year, month = int(match.group(1)), int(match.group(2))
+    start = datetime(year, month, 1, tzinfo=dt_timezone.utc)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+    return start, end
+
+def archive_path(month):
+    return os.path.join(settings.AUDIT_ARCHIVE_DIR, f'auditlog-{month}.ndjson.gz')
+
+def archived_months():
+    if not os.path.isdir(settings.AUDIT_ARCHIVE_DIR):
+        return []
+    return sorted(
+        match.group(1)
+        for match in map(ARCHIVE_FILE_RE.match, os.listdir(settings.AUDIT_ARCHIVE_DIR))
+        if match
+    )
+
+def serialize_entry(log):
+    # Same shape as api.serializers.AuditLogSerializer, plus user_id for filtering.
+    return {
+        'id': log.id,
+        'user': str(log.user) if log.user_id else None,
+        'user_id': log.user_id,
+        'path': log.path,
+        'method': log.method,
+        'status_code': log.status_code,
+        'timestamp': _timestamp_field.to_representation(log.timestamp),
+    }
+
+def _append(month, entries):
+    os.makedirs(settings.AUDIT_ARCHIVE_DIR, exist_ok=True)
+    with open(archive_path(month), 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as fh:
+            for entry in entries:
+                fh.write(json.dumps(entry, separators=(',', ':')).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def archive_before(cutoff, batch_size=5000):
+    """
+    Move every AuditLog older than `cutoff` into its monthly archive, in
+    batches of `batch_size` rows. Returns {month: rows archived}.
+    """
+    archived = {}
+    while True:
+        batch = list(
+            AuditLog.objects
+            .filter(timestamp__lt=cutoff)
+            .select_related('user')
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            return archived
+
+        by_month = {}
+        for log in batch:
+            by_month.setdefault(log.timestamp.astimezone(dt_timezone.utc).strftime('%Y-%m'), []).append(serialize_entry(log))
+        for month, entries in by_month.items():
+            _append(month, entries)
+            archived[month] = archived.get(month, 0) + len(entries)
+
+        with transaction.atomic():
+            AuditLog.objects.filter(id__in=[log.id for log in batch]).delete()
+
+def read_month(month, user_id=None):
+    """Archived entries for `month` ('YYYY-MM'), oldest first."""
+    path = archive_path(month)
+    if not os.path.exists(path):
+        return []
+
+    seen = set()
+    entries = []
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            entry = json.loads(line)
+            if entry['id'] in seen or (user_id is not None and entry['user_id'] != user_id):
+                continue
+            seen.add(entry['id'])
+            entries.append(entry)
+    entries.sort(key=lambda entry: (parse_datetime(entry['timestamp']), entry['id']))
+    return entries
@@ -0,0 +1,129 @@
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+class AuditBuffer:
+    """
+    In-process audit sink. Request threads only enqueue; a daemon thread
+    writes batches with bulk_create when `batch_size` entries are waiting or
+    every `flush_interval` seconds, and once more at interpreter exit.
+    The queue is bounded: when it is full new entries are dropped and
+    counted instead of blocking the request.
+
+    `mode` is 'thread' for the above, 'sync' to write each entry as it is
+    put (tests), or 'off' to discard entries; None follows
+    AUDIT_BUFFER_MODE at call time.
+    """
+
+    def __init__(self, max_size, batch_size, flush_interval, mode='thread'):
+        self.queue = queue.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._mode = mode
+        self.dropped = 0
+        self.written = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def mode(self):
+        return self._mode or settings.AUDIT_BUFFER_MODE
+
+    def put(self, entry):
+        if self.mode == 'off':
+            return False
+        if self.mode == 'sync':
+            return self._write([entry]) == 1
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        self._ensure_started()
+        if self.queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Write everything queued so far. Safe to call from any thread."""
+        entries = []
+        while True:
+            try:
+                entries.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return self._write(entries) if entries else 0
+
+    def _write(self, entries):
+        try:
+            with transaction.atomic():
+                AuditLog.objects.bulk_create(entries, batch_size=self.batch_size)
+            written = len(entries)
+        except IntegrityError:
+            # One bad row (e.g. a user deleted since the request) fails the
+            # whole INSERT; keep the rest.
+            written = self._write_each(entries)
+        except Exception:
+            logger.exception("Failed to write %d audit log entries", len(entries))
+            written = 0
+
+        with self._lock:
+            self.written += written
+            self.dropped += len(entries) - written
+        return written
+
+    def _write_each(self, entries):
+        written = 0
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    AuditLog.objects.bulk_create([entry])
+                written += 1
+            except IntegrityError:
+                logger.warning("Dropped audit log entry %s %s: integrity error", entry.method, entry.path)
+            except Exception:
+                logger.exception("Failed to write audit log entry %s %s", entry.method, entry.path)
+        return written
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self.queue.qsize(),
+                'max_size': self.queue.maxsize,
+                'written': self.written,
+                'dropped': self.dropped,
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+audit_buffer = AuditBuffer(
+    max_size=settings.AUDIT_QUEUE_MAXSIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+    mode=None,
+)
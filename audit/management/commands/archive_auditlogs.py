@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from audit.archive import archive_before
+from audit.models import AuditLog
+
+class Command(BaseCommand):
+    help = "Move audit log rows older than the retention window into gzip'd monthly NDJSON archives"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AUDIT_RETENTION_DAYS, help='Keep this many days in the table')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        if options['dry_run']:
+            count = AuditLog.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f"{count} audit log row(s) older than {cutoff:%Y-%m-%d %H:%M} would be archived.")
+            return
+
+        archived = archive_before(cutoff, batch_size=options['batch_size'])
+        for month, count in sorted(archived.items()):
+            self.stdout.write(f"{month}: {count} row(s)")
+        self.stdout.write(self.style.SUCCESS(f"Archived {sum(archived.values())} audit log row(s) to {settings.AUDIT_ARCHIVE_DIR}."))
@@ -1,16 +1,37 @@
+import random
+
+from django.conf import settings
+from django.utils import timezone
+
+from .buffer import audit_buffer
 from .models import AuditLog
 
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
 class AuditMiddleware:
+    """
+    Queues one AuditLog per authenticated request on the in-process buffer
+    (see audit.buffer); nothing is written on the request path. Read-only
+    requests are sampled at AUDIT_GET_SAMPLE_RATE.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.sample_rate = settings.AUDIT_GET_SAMPLE_RATE
 
     def __call__(self, request):
         response = self.get_response(request)
-        if request.user.is_authenticated:
-            AuditLog.objects.create(
-                user=request.user,
-                path=request.path,
+        if request.user.is_authenticated and self.should_log(request):
+            audit_buffer.put(AuditLog(
+                user_id=request.user.pk,
+                path=request.path[:255],
                 method=request.method,
-                status_code=response.status_code
-            )
+                status_code=response.status_code,
+                timestamp=timezone.now(),
+            ))
         return response
+
+    def should_log(self, request):
+        if request.method not in READ_ONLY_METHODS or self.sample_rate >= 1:
+            return True
+        return random.random() < self.sample_rate
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class AuditLog(models.Model):
     user = models.ForeignKey(
@@ -12,13 +13,14 @@ class AuditLog(models.Model):
     path = models.CharField(max_length=255)
     method = models.CharField(max_length=10)
     status_code = models.PositiveSmallIntegerField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = 'Audit Logs'
         indexes = [
-            models.Index(fields=['user']),
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['user', 'timestamp']),
             models.Index(fields=['method']),
             models.Index(fields=['status_code']),
         ]
@@ -1,3 +1,164 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .archive import archived_months, read_month
+from .buffer import AuditBuffer
+from .middleware import AuditMiddleware
+from .models import AuditLog
+
+User = get_user_model()
+
+class AuditBufferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auditor', password='pw')
+        self.factory = RequestFactory()
+        self.buffer = AuditBuffer(max_size=3, batch_size=2, flush_interval=60)
+        # Flush by hand so the writes happen on the test's connection.
+        patcher = mock.patch.object(self.buffer, '_ensure_started')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call(self, method='post', path='/api/vehicles/', sample_rate=1.0):
+        request = getattr(self.factory, method)(path)
+        request.user = self.user
+        with override_settings(AUDIT_GET_SAMPLE_RATE=sample_rate), \
+                mock.patch('audit.middleware.audit_buffer', self.buffer):
+            middleware = AuditMiddleware(lambda r: HttpResponse(status=201))
+            return middleware(request)
+
+    def test_requests_are_queued_not_written(self):
+        self._call()
+        self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertEqual(self.buffer.queue.qsize(), 1)
+
+    def test_flush_writes_queued_entries_with_request_time(self):
+        self._call()
+        queued_at = self.buffer.queue.queue[0].timestamp
+        self._call(path='/api/listings/')
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(AuditLog.objects.count(), 2)
+        log = AuditLog.objects.get(path='/api/vehicles/')
+        self.assertEqual(log.timestamp, queued_at)
+        self.assertEqual((log.user, log.method, log.status_code), (self.user, 'POST', 201))
+        self.assertEqual(self.buffer.stats()['written'], 2)
+
+    def test_full_queue_drops_and_counts(self):
+        for _ in range(5):
+            self._call()
+        self.assertEqual(self.buffer.queue.qsize(), 3)
+        self.assertEqual(self.buffer.stats()['dropped'], 2)
+
+    def test_get_sampling(self):
+        self._call(method='get', sample_rate=0.0)
+        self._call(method='post', sample_rate=0.0)
+        self.assertEqual(self.buffer.queue.qsize(), 1)
+        self.assertEqual(self.buffer.queue.queue[0].method, 'POST')
+
+    def test_anonymous_requests_are_not_logged(self):
+        request = self.factory.get('/api/vehicles/')
+        request.user = mock.Mock(is_authenticated=False)
+        with mock.patch('audit.middleware.audit_buffer', self.buffer):
+            AuditMiddleware(lambda r: HttpResponse())(request)
+        self.assertEqual(self.buffer.queue.qsize(), 0)
+
+    def test_one_bad_row_does_not_drop_the_batch(self):
+        existing = AuditLog.objects.create(user=self.user, path='/taken/', method='GET', status_code=200)
+        self.buffer.queue.put(AuditLog(user=self.user, path='/a/', method='POST', status_code=201))
+        self.buffer.queue.put(AuditLog(pk=existing.pk, user=self.user, path='/dup/', method='POST', status_code=201))
+        self.buffer.queue.put(AuditLog(user=self.user, path='/b/', method='POST', status_code=201))
+
+        with self.assertLogs('audit.buffer', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(set(AuditLog.objects.values_list('path', flat=True)), {'/taken/', '/a/', '/b/'})
+        self.assertEqual((self.buffer.stats()['written'], self.buffer.stats()['dropped']), (2, 1))
+
+    def test_sync_and_off_modes_start_no_thread(self):
+        for mode, expected in (('sync', 1), ('off', 1)):  # running total
+            buffer = AuditBuffer(max_size=3, batch_size=2, flush_interval=60, mode=mode)
+            with mock.patch('audit.middleware.audit_buffer', buffer), mock.patch('threading.Thread') as thread:
+                request = self.factory.post('/api/vehicles/')
+                request.user = self.user
+                AuditMiddleware(lambda r: HttpResponse(status=201))(request)
+            thread.assert_not_called()
+            self.assertEqual(AuditLog.objects.filter(path='/api/vehicles/').count(), expected)
+
+class AuditArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='archivist', email='archivist@example.com', password='pw')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings_override = override_settings(AUDIT_ARCHIVE_DIR=self.archive_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.now = timezone.now()
+        self.old = datetime(2024, 3, 10, 12, 0, tzinfo=dt_timezone.utc)
+        for i in range(3):
+            AuditLog.objects.create(user=self.user, path=f'/old/{i}/', method='GET', status_code=200, timestamp=self.old + timedelta(hours=i))
+        AuditLog.objects.create(user=self.other, path='/old/other/', method='GET', status_code=200, timestamp=self.old)
+        AuditLog.objects.create(user=self.user, path='/april/', method='POST', status_code=201, timestamp=datetime(2024, 4, 1, tzinfo=dt_timezone.utc))
+        AuditLog.objects.create(user=self.user, path='/recent/', method='GET', status_code=200, timestamp=self.now)
+
+    def test_command_moves_old_rows_into_monthly_archives(self):
+        call_command('archive_auditlogs', days=30, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(list(AuditLog.objects.values_list('path', flat=True)), ['/recent/'])
+        self.assertEqual(archived_months(), ['2024-03', '2024-04'])
+        march = read_month('2024-03')
+        self.assertEqual(len(march), 4)
+        names = {self.user.pk: str(self.user), self.other.pk: str(self.other)}
+        self.assertTrue(all(entry['user'] == names[entry['user_id']] for entry in march))
+        self.assertEqual([e['path'] for e in read_month('2024-03', user_id=self.user.pk)], ['/old/0/', '/old/1/', '/old/2/'])
+
+    def test_rerun_appends_and_reader_skips_duplicates(self):
+        call_command('archive_auditlogs', days=30, stdout=StringIO())
+        late = AuditLog.objects.create(user=self.user, path='/late/', method='GET', status_code=200, timestamp=self.old)
+        call_command('archive_auditlogs', days=30, stdout=StringIO())
+
+        paths = [e['path'] for e in read_month('2024-03')]
+        self.assertIn('/late/', paths)
+        self.assertEqual(len(paths), len(set(e['id'] for e in read_month('2024-03'))))
+        self.assertFalse(AuditLog.objects.filter(pk=late.pk).exists())
+
+    def test_api_month_merges_archive_and_table(self):
+        call_command('archive_auditlogs', days=30, stdout=StringIO())
+        AuditLog.objects.create(user=self.user, path='/march-live/', method='GET', status_code=200, timestamp=self.old + timedelta(days=5))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('api-audit'), {'month': '2024-03', 'user': self.user.pk}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        paths = [row['path'] for row in response.data['results']]
+        self.assertEqual(paths, ['/march-live/', '/old/2/', '/old/1/', '/old/0/'])
+        self.assertEqual(set(response.data['results'][0]), set(response.data['results'][1]))
+
+        self.assertEqual(client.get(reverse('api-audit'), {'month': 'March'}, secure=True).status_code, 400)
+        for params in ({'user': 'abc'}, {'month': '2024-03', 'user': 'abc'}):
+            response = client.get(reverse('api-audit'), params, secure=True)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('user', response.json())
+
+    @override_settings(AUDIT_BUFFER_MODE='off')  # both listings must see the same rows
+    def test_api_list_fast_path_matches_serializer(self):
+        AuditLog.objects.create(user=None, path='/anonymous/', method='GET', status_code=401, timestamp=self.now)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with override_settings(FAST_LIST_ENABLED=False):
+            expected = client.get(reverse('api-audit'), {'page_size': 4}, secure=True)
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(len(expected.data['results']), 4)
+        with mock.patch('api.serializers.AuditLogSerializer.to_representation', side_effect=AssertionError):
+            self.assertEqual(client.get(reverse('api-audit'), {'page_size': 4}, secure=True).content, expected.content)
@@ -1,9 +1,17 @@
 from django.urls import path
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+
+from .buffer import audit_buffer
 
 def audit_home(request):
     return HttpResponse("📋 Audit module is wired.")
 
+def audit_buffer_stats(request):
+    if not request.user.is_staff:
+        return JsonResponse({'detail': 'Forbidden'}, status=403)
+    return JsonResponse(audit_buffer.stats())
+
 urlpatterns = [
     path('', audit_home, name='audit-home'),
+    path('buffer/', audit_buffer_stats, name='audit-buffer-stats'),
 ]
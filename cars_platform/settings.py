@@ -101,6 +101,77 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Caching
+CACHES = {
+    'default': {
+        # e.g. django.core.cache.backends.redis.RedisCache with CACHE_LOCATION=redis://host:6379/1,
+        # or ...filebased.FileBasedCache with a directory, to share one cache between workers
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='cars-platform'),
+    }
+}
+RESPONSE_CACHE_ALIAS = config('RESPONSE_CACHE_ALIAS', default='default')
+RESPONSE_CACHE_SHARED = config(
+    'RESPONSE_CACHE_SHARED', cast=bool,
+    default=not CACHES.get(RESPONSE_CACHE_ALIAS, {}).get('BACKEND', '').endswith('LocMemCache'),
+)  # every worker sees the same generations, so ETags can include them (see vehicles.conditional)
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=600, cast=int)  # seconds; writes invalidate sooner via generations
+FAST_LIST_ENABLED = config('FAST_LIST_ENABLED', default=True, cast=bool)  # values() fast path on opted-in list endpoints
+
+# Background Exports
+EXPORT_JOB_TTL = config('EXPORT_JOB_TTL', default=3600, cast=int)  # seconds a finished artifact is reused
+EXPORT_ARTIFACT_RETENTION = config('EXPORT_ARTIFACT_RETENTION', default=7 * 24 * 3600, cast=int)  # seconds before a finished artifact is deleted
+EXPORT_WORKER_CONCURRENCY = config('EXPORT_WORKER_CONCURRENCY', default=2, cast=int)
+
+# External VIN Metadata
+VIN_METADATA_URL = config('VIN_METADATA_URL', default='https://external-api.example.com/vehicles/{vin}')
+VIN_METADATA_TIMEOUT = config('VIN_METADATA_TIMEOUT', default=5, cast=float)
+VIN_METADATA_TTL = config('VIN_METADATA_TTL', default=7 * 24 * 3600, cast=int)
+VIN_METADATA_NEGATIVE_TTL = config('VIN_METADATA_NEGATIVE_TTL', default=3600, cast=int)
+VIN_METADATA_CONCURRENCY = config('VIN_METADATA_CONCURRENCY', default=16, cast=int)
+VIN_METADATA_BREAKER_THRESHOLD = config('VIN_METADATA_BREAKER_THRESHOLD', default=5, cast=int)
+VIN_METADATA_BREAKER_RESET = config('VIN_METADATA_BREAKER_RESET', default=60, cast=int)
+
+# Trip Segmentation
+TRIP_MOVING_SPEED_KPH = config('TRIP_MOVING_SPEED_KPH', default=3.0, cast=float)  # slower readings count as stopped
+TRIP_STOP_GAP = config('TRIP_STOP_GAP', default=300, cast=int)  # seconds without movement that end a trip
+TRIP_MIN_READINGS = config('TRIP_MIN_READINGS', default=2, cast=int)  # shorter closed trips are discarded as noise
+
+# Email Outbox
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)  # emails sent per connection
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)  # then the email is dead-lettered
+OUTBOX_RETRY_BASE = config('OUTBOX_RETRY_BASE', default=60, cast=int)  # seconds before the first retry, doubling after
+OUTBOX_RETRY_MAX = config('OUTBOX_RETRY_MAX', default=3600, cast=int)  # upper bound on the retry delay
+OUTBOX_LEASE = config('OUTBOX_LEASE', default=300, cast=int)  # seconds before a crashed worker's claim is released
+
+# Notification Fan-out
+FANOUT_CHUNK_SIZE = config('FANOUT_CHUNK_SIZE', default=2000, cast=int)  # notifications inserted per transaction
+
+# Live Event Stream (Server-Sent Events)
+EVENT_BROKER = config('EVENT_BROKER', default='notifications.pubsub.InMemoryBroker')  # per-process; swap for multi-worker setups
+EVENT_STREAM_QUEUE_SIZE = config('EVENT_STREAM_QUEUE_SIZE', default=100, cast=int)  # buffered events per client
+EVENT_STREAM_HEARTBEAT = config('EVENT_STREAM_HEARTBEAT', default=15, cast=int)  # seconds between keep-alive comments
+EVENT_STREAM_TICKET_TTL = config('EVENT_STREAM_TICKET_TTL', default=60, cast=int)  # seconds a ?ticket= for the stream stays valid
+EVENT_STREAM_MAX_AGE = config('EVENT_STREAM_MAX_AGE', default=300, cast=int)  # seconds before the client is asked to reconnect
+
+# Low-Battery Alerts
+LOW_BATTERY_THRESHOLD = config('LOW_BATTERY_THRESHOLD', default=20.0, cast=float)  # alert when the level drops below this
+LOW_BATTERY_CLEAR = config('LOW_BATTERY_CLEAR', default=25.0, cast=float)  # ... and re-arm only once it is back above this
+LOW_BATTERY_COOLDOWN = config('LOW_BATTERY_COOLDOWN', default=3600, cast=int)  # minimum seconds between alerts per vehicle
+
+# Audit Logging
+AUDIT_BATCH_SIZE = config('AUDIT_BATCH_SIZE', default=200, cast=int)  # flush once this many entries are queued
+AUDIT_FLUSH_INTERVAL = config('AUDIT_FLUSH_INTERVAL', default=2.0, cast=float)  # ... or after this many seconds
+AUDIT_QUEUE_MAXSIZE = config('AUDIT_QUEUE_MAXSIZE', default=10000, cast=int)  # entries beyond this are dropped
+AUDIT_BUFFER_MODE = config('AUDIT_BUFFER_MODE', default='thread')  # thread | sync | off; the test runner forces sync
+AUDIT_GET_SAMPLE_RATE = config('AUDIT_GET_SAMPLE_RATE', default=1.0, cast=float)  # fraction of GET/HEAD requests logged
+AUDIT_RETENTION_DAYS = config('AUDIT_RETENTION_DAYS', default=90, cast=int)  # older rows are moved to the archive
+AUDIT_ARCHIVE_DIR = config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'audit'))
+
+# Tests
+TEST_RUNNER = 'cars_platform.test_runner.TestRunner'
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
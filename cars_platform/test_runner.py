@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+class TestRunner(DiscoverRunner):
+    """
+    Writes audit entries on the request's own connection while tests run:
+    the flusher thread and its exit flush would otherwise outlive the test
+    database and land in the developer's db.sqlite3.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._audit_buffer_mode = settings.AUDIT_BUFFER_MODE
+        settings.AUDIT_BUFFER_MODE = 'sync'
+
+    def teardown_test_environment(self, **kwargs):
+        settings.AUDIT_BUFFER_MODE = self._audit_buffer_mode
+        super().teardown_test_environment(**kwargs)
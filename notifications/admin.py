@@ -1,8 +1,35 @@
 from django.contrib import admin
-from notifications.models import Notification
+from django.utils import timezone
+from notifications.fanout import cancel_job
+from notifications.models import Notification, EmailOutbox, FanoutJob
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('recipient', 'message', 'is_read', 'timestamp')
     list_filter = ('is_read', 'timestamp')
     search_fields = ('recipient__username', 'message')
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'claimed_by', 'locked_until', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description='Retry selected emails')
+    def requeue(self, request, queryset):
+        queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now(), last_error='')
+
+
+@admin.register(FanoutJob)
+class FanoutJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'message', 'segment', 'status', 'sent_count', 'total', 'created_at', 'finished_at')
+    list_filter = ('status', 'notification_type')
+    readonly_fields = ('status', 'total', 'sent_count', 'last_user_id', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    actions = ['cancel']
+
+    @admin.action(description='Cancel selected broadcasts')
+    def cancel(self, request, queryset):
+        for job in queryset:
+            cancel_job(job)
@@ -4,5 +4,6 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
-def ready(self):
-        import notifications.signals  # ✅ Connect signals
\ No newline at end of file
+
+    def ready(self):
+        import notifications.signals  # ✅ Connect signals
@@ -0,0 +1,84 @@
+"""
+Per-user unread notification counters.
+
+NotificationCounter.unread is adjusted whenever a notification is created,
+read or deleted, so the navbar badge is a primary-key lookup instead of a
+COUNT over the user's notifications. Changes made with save()/delete() are
+tracked by the receivers in notifications.signals; code that bulk-creates
+notifications calls notifications_created(), and mark_read() keeps the
+counter in step with its single UPDATE. recount_unread() repairs drift.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from vehicles.response_cache import invalidate
+
+from .models import Notification, NotificationCounter
+
+def _upsert_sql():
+    qn = connection.ops.quote_name
+    table = qn(NotificationCounter._meta.db_table)
+    user_id, unread = qn('user_id'), qn('unread')
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    return (
+        f'INSERT INTO {table} ({user_id}, {unread}) VALUES (%s, %s) '
+        f'ON CONFLICT ({user_id}) DO UPDATE SET {unread} = {greatest}({table}.{unread} + %s, 0)'
+    )
+
+def _decrement_sql():
+    qn = connection.ops.quote_name
+    table = qn(NotificationCounter._meta.db_table)
+    unread = qn('unread')
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    return f'UPDATE {table} SET {unread} = {greatest}({unread} + %s, 0) WHERE {qn("user_id")} = %s'
+
+def adjust_unread(deltas):
+    """Apply {user_id: delta}; counts never go below zero."""
+    increments = [(user_id, delta, delta) for user_id, delta in deltas.items() if delta > 0]
+    # Decrements never create a row: when a user is deleted their counter can
+    # go before the notifications whose post_delete lands here.
+    decrements = [(delta, user_id) for user_id, delta in deltas.items() if delta < 0]
+    if not increments and not decrements:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        if increments:
+            cursor.executemany(_upsert_sql(), increments)
+        if decrements:
+            cursor.executemany(_decrement_sql(), decrements)
+
+def notifications_created(notifications):
+    """Count freshly inserted notifications, e.g. after bulk_create()."""
+    adjust_unread(Counter(n.recipient_id for n in notifications if not n.is_read))
+
+def unread_count(user):
+    return NotificationCounter.objects.filter(user_id=user.pk).values_list('unread', flat=True).first() or 0
+
+def mark_read(user, ids=None):
+    """Mark all (or only `ids`) of `user`'s unread notifications read. Returns the number changed."""
+    notifications = Notification.objects.filter(recipient=user, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    with transaction.atomic():
+        changed = notifications.update(is_read=True, updated_at=timezone.now())
+        adjust_unread({user.pk: -changed})
+        if changed:
+            invalidate(Notification)  # QuerySet.update() sends no post_save; see vehicles.conditional
+    return changed
+
+def recount_unread(user_ids=None):
+    """Rebuild counters from the notifications table. Returns counters written."""
+    unread = Notification.objects.filter(is_read=False)
+    counters = NotificationCounter.objects.all()
+    if user_ids is not None:
+        unread = unread.filter(recipient_id__in=user_ids)
+        counters = counters.filter(user_id__in=user_ids)
+    rows = unread.order_by().values('recipient_id').annotate(n=Count('id'))
+    with transaction.atomic():
+        counters.delete()
+        created = NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=row['recipient_id'], unread=row['n']) for row in rows]
+        )
+    return len(created)
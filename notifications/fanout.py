@@ -0,0 +1,137 @@
+"""
+Bulk notification fan-out to a user segment.
+
+A FanoutJob walks the segment's user ids in ascending order in chunks of
+FANOUT_CHUNK_SIZE. Each chunk is one transaction: a bulk INSERT of the
+notifications, one upsert batch for the unread counters, and the job's new
+resume point (`last_user_id`). A worker that dies loses at most the chunk in
+flight, and rerunning the job continues after the last committed recipient
+without notifying anyone twice.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from vehicles.models import Listing, Vehicle
+
+from .counters import notifications_created
+from .models import FanoutJob, Notification
+from .pubsub import publish_notifications
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_KEYS = ('role', 'make', 'region')
+NOTIFICATION_TYPES = [choice for choice, _ in Notification._meta.get_field('notification_type').choices]
+
+def validate_segment(segment):
+    """Raises ValueError for unknown keys, roles or empty values."""
+    if not isinstance(segment, dict):
+        raise ValueError("segment must be an object")
+    unknown = set(segment) - set(SEGMENT_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown segment key(s): {', '.join(sorted(unknown))}; use {', '.join(SEGMENT_KEYS)}")
+    if any(not isinstance(value, str) or not value.strip() for value in segment.values()):
+        raise ValueError("Segment values must be non-empty strings")
+    roles = [choice for choice, _ in get_user_model()._meta.get_field('role').choices]
+    if 'role' in segment and segment['role'] not in roles:
+        raise ValueError(f"role must be one of {', '.join(roles)}")
+    return segment
+
+def segment_users(segment):
+    """Active users matching every key of `segment` (all active users if empty)."""
+    users = get_user_model().objects.filter(is_active=True)
+    if segment.get('role'):
+        users = users.filter(role=segment['role'])
+    if segment.get('make'):
+        # Subqueries rather than joins: no duplicate rows, so no DISTINCT in the id walk.
+        users = users.filter(id__in=Vehicle.objects.filter(make__iexact=segment['make']).values('owner_id'))
+    if segment.get('region'):
+        users = users.filter(id__in=Listing.objects.filter(region__iexact=segment['region'], is_active=True).values('seller_id'))
+    return users
+
+def create_fanout(message, notification_type='info', segment=None, created_by=None):
+    segment = validate_segment(segment or {})
+    return FanoutJob.objects.create(
+        created_by=created_by, message=message, notification_type=notification_type,
+        segment=segment, total=segment_users(segment).count(),
+    )
+
+def claim_next_job():
+    # Same conditional-UPDATE claim as the export worker.
+    while True:
+        job_id = FanoutJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        if claim_job(job_id):
+            return FanoutJob.objects.get(pk=job_id)
+
+def claim_job(job_id):
+    now = timezone.now()
+    return FanoutJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=now, heartbeat_at=now, finished_at=None, error=''
+    )
+
+def requeue_stale_jobs(older_than):
+    """Running jobs whose worker stopped reporting go back to pending; they resume, not restart."""
+    cutoff = timezone.now() - older_than
+    return FanoutJob.objects.filter(status='running', heartbeat_at__lt=cutoff).update(status='pending')
+
+def _send_chunk(job, chunk_size):
+    """Deliver the next chunk. Returns recipients notified, 0 when finished, None if the job was
+    cancelled or another worker has taken it over."""
+    with transaction.atomic():
+        ids = list(
+            segment_users(job.segment).filter(id__gt=job.last_user_id)
+            .order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0
+        # Moving the resume point first doubles as the cancellation check, and matching the
+        # resume point we read makes it a claim: a worker that requeued and resumed this job
+        # has moved it, so only one of two workers can deliver the same chunk.
+        advanced = FanoutJob.objects.filter(pk=job.pk, status='running', last_user_id=job.last_user_id).update(
+            last_user_id=ids[-1], sent_count=F('sent_count') + len(ids), heartbeat_at=timezone.now()
+        )
+        if not advanced:
+            return None
+        rows = Notification.objects.bulk_create([
+            Notification(recipient_id=user_id, message=job.message, notification_type=job.notification_type)
+            for user_id in ids
+        ])
+        notifications_created(rows)
+        publish_notifications(rows)
+    job.last_user_id = ids[-1]
+    job.sent_count += len(ids)
+    return len(ids)
+
+def run_job(job, chunk_size=None, progress=None):
+    """Deliver a claimed (running) job to completion. `progress(job)` is called after each chunk."""
+    chunk_size = chunk_size or settings.FANOUT_CHUNK_SIZE
+    try:
+        while True:
+            sent = _send_chunk(job, chunk_size)
+            if sent is None:
+                job.refresh_from_db()
+                return job
+            if not sent:
+                break
+            if progress:
+                progress(job)
+    except Exception as exc:
+        logger.exception("Fan-out job %s failed after %s recipient(s)", job.pk, job.sent_count)
+        FanoutJob.objects.filter(pk=job.pk).update(status='failed', error=str(exc), finished_at=timezone.now())
+        job.refresh_from_db()
+        return job
+
+    FanoutJob.objects.filter(pk=job.pk, status='running').update(status='done', finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+def cancel_job(job):
+    return FanoutJob.objects.filter(pk=job.pk, status__in=['pending', 'running']).update(
+        status='cancelled', finished_at=timezone.now()
+    )
@@ -0,0 +1,81 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from notifications.fanout import (
+    NOTIFICATION_TYPES, claim_job, claim_next_job, create_fanout, requeue_stale_jobs, run_job,
+)
+from notifications.models import FanoutJob
+
+class Command(BaseCommand):
+    help = "Broadcast a notification to a user segment, or deliver queued fan-out jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--message', help='Create and deliver a new broadcast with this text')
+        parser.add_argument('--type', default='info', choices=NOTIFICATION_TYPES, dest='notification_type')
+        parser.add_argument('--role', help='Only users with this role')
+        parser.add_argument('--make', help='Only owners of a vehicle of this make')
+        parser.add_argument('--region', help='Only sellers with an active listing in this region')
+        parser.add_argument('--job', type=int, help='Resume this failed or stale job from where it stopped')
+        parser.add_argument('--chunk-size', type=int, default=settings.FANOUT_CHUNK_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue for new jobs')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty (with --loop)')
+        parser.add_argument('--stale-after', type=int, default=10, help='Requeue running jobs silent for this many minutes (also gates --job)')
+
+    def handle(self, *args, **options):
+        if options['message']:
+            segment = {key: options[key] for key in ('role', 'make', 'region') if options[key]}
+            try:
+                job = create_fanout(options['message'], options['notification_type'], segment)
+            except ValueError as e:
+                raise CommandError(e)
+            self.stdout.write(f"Created fan-out #{job.pk} for {job.total} recipient(s).")
+            self._run(job.pk, options['chunk_size'])
+            return
+
+        if options['job']:
+            # A running job is only taken over once its worker has gone quiet.
+            cutoff = timezone.now() - timedelta(minutes=options['stale_after'])
+            updated = FanoutJob.objects.filter(
+                Q(status='failed') | Q(status='running', heartbeat_at__lt=cutoff), pk=options['job']
+            ).update(status='pending')
+            if not updated:
+                current = FanoutJob.objects.filter(pk=options['job']).values_list('status', flat=True).first()
+                if current == 'running':
+                    raise CommandError(
+                        f"Fan-out #{options['job']} is still running; it can be resumed after "
+                        f"{options['stale_after']} minute(s) without a heartbeat."
+                    )
+                if current != 'pending':
+                    raise CommandError(f"Fan-out #{options['job']} does not exist or is already finished.")
+            self._run(options['job'], options['chunk_size'])
+            return
+
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale fan-out job(s)."))
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if not options['loop']:
+                    return
+                time.sleep(options['interval'])
+                continue
+            self._report(run_job(job, options['chunk_size'], progress=self._progress))
+
+    def _run(self, job_id, chunk_size):
+        if not claim_job(job_id):
+            raise CommandError(f"Fan-out #{job_id} was claimed by another worker.")
+        job = FanoutJob.objects.get(pk=job_id)
+        self._report(run_job(job, chunk_size, progress=self._progress))
+
+    def _progress(self, job):
+        self.stdout.write(f"  #{job.pk}: {job.sent_count}/{job.total} sent")
+
+    def _report(self, job):
+        style = self.style.SUCCESS if job.status == 'done' else self.style.ERROR
+        self.stdout.write(style(f"{job}{' ' + job.error if job.error else ''}"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from notifications.counters import recount_unread
+
+class Command(BaseCommand):
+    help = "Rebuild per-user unread notification counters from the notifications table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        written = recount_unread(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} unread counter(s)."))
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import deliver_pending, requeue_dead
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep running, polling for new mail')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty (with --loop)')
+        parser.add_argument('--requeue-dead', action='store_true', help='Retry dead-lettered emails from scratch first')
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            self.stdout.write(f"Requeued {requeue_dead()} dead email(s).")
+
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_pending(batch_size=options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent + failed < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} email(s); {total_failed} failed."))
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def retry_failed(apps, schema_editor):
+    # 'failed' is gone; those rows get a fresh retry cycle.
+    EmailOutbox = apps.get_model('notifications', 'EmailOutbox')
+    EmailOutbox.objects.filter(status='failed').update(status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emailoutbox',
+            name='notificatio_status_7fdc31_idx',
+        ),
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('dead', 'Dead')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='notificatio_status_1fc719_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['claimed_by'], name='notificatio_claimed_1b0574_idx'),
+        ),
+        migrations.RunPython(retry_failed, migrations.RunPython.noop),
+    ]
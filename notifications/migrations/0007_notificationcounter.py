@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_unread(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationCounter = apps.get_model('notifications', 'NotificationCounter')
+    rows = Notification.objects.filter(is_read=False).order_by().values('recipient_id').annotate(n=models.Count('id'))
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row['recipient_id'], unread=row['n']) for row in rows]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_emailoutbox_retry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at', 'id'], name='notificatio_recipie_f17213_idx'),
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
@@ -21,6 +21,7 @@ class Notification(models.Model):
     )
     message = models.TextField(validators=[MaxLengthValidator(500)])
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_read = models.BooleanField(default=False)
     notification_type = models.CharField(
         max_length=20,
@@ -36,10 +37,97 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', 'is_read']),
-            models.Index(fields=['created_at']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['recipient', 'created_at', 'id']),
         ]
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
 
     def __str__(self):
-        return f"Notification for {self.recipient.email}: {self.message[:50]}"
\ No newline at end of file
+        return f"Notification for {self.recipient.email}: {self.message[:50]}"
+
+class NotificationCounter(models.Model):
+    """Unread notifications per user, kept by notifications.counters so the badge is a PK read."""
+    user = models.OneToOneField(
+        'accounts.CustomUser',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter'
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+
+class FanoutJob(models.Model):
+    """One notification broadcast to a user segment, delivered in chunks by notifications.fanout."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    created_by = models.ForeignKey(
+        'accounts.CustomUser',
+        on_delete=models.SET_NULL,
+        related_name='fanout_jobs',
+        null=True,
+        blank=True
+    )
+    message = models.TextField(validators=[MaxLengthValidator(500)])
+    notification_type = models.CharField(max_length=20, default='info')
+    segment = models.JSONField(default=dict)  # e.g. {"role": "seller", "make": "Tesla", "region": "EU"}
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(null=True, blank=True)  # recipients when the job was created
+    sent_count = models.PositiveIntegerField(default=0)
+    last_user_id = models.BigIntegerField(default=0)  # resume point: recipients are walked in id order
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Fan-out #{self.pk} {self.segment or 'everyone'}: {self.sent_count}/{self.total} ({self.status})"
+
+
+class EmailOutbox(models.Model):
+    """Mail queued by request code and delivered later by `send_outbox`."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),  # gave up after OUTBOX_MAX_ATTEMPTS
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['claimed_by']),
+        ]
+        verbose_name = 'Queued Email'
+        verbose_name_plural = 'Email Outbox'
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
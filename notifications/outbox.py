@@ -0,0 +1,113 @@
+"""
+Transactional email outbox.
+
+Callers enqueue mail as an EmailOutbox row instead of talking to SMTP. The
+row is written on the caller's database connection, so inside an atomic
+block it commits or rolls back together with the change that triggered it,
+and a slow or unreachable mail server never holds up a request.
+
+`python manage.py send_outbox` drains the table: each batch is claimed with
+a single UPDATE (safe with several workers running), sent over one reused
+connection, and failures are retried with exponential backoff until
+OUTBOX_MAX_ATTEMPTS, after which the row is dead-lettered for inspection.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+def enqueue_email(subject, body, to, from_email=None):
+    return enqueue_emails([(subject, body, to)], from_email=from_email)[0]
+
+def enqueue_emails(messages, from_email=None):
+    """Queue (subject, body, [recipients]) tuples with one INSERT. Empty recipient lists are skipped."""
+    rows = [
+        EmailOutbox(subject=subject[:255], body=body, to=list(to), from_email=from_email or settings.DEFAULT_FROM_EMAIL)
+        for subject, body, to in messages
+        if to
+    ]
+    return EmailOutbox.objects.bulk_create(rows)
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_BASE * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX))
+
+def claim_batch(batch_size, now=None):
+    """Mark up to `batch_size` due rows as ours and return them."""
+    now = now or timezone.now()
+    due = (
+        Q(status='pending', next_attempt_at__lte=now)
+        | Q(status='sending', locked_until__lt=now)  # claimed by a worker that died
+    )
+    ids = list(EmailOutbox.objects.filter(due).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # Re-check `due` so a row another worker claimed in the meantime is skipped.
+    EmailOutbox.objects.filter(due, id__in=ids).update(
+        status='sending', claimed_by=token, locked_until=now + timedelta(seconds=settings.OUTBOX_LEASE)
+    )
+    return list(EmailOutbox.objects.filter(claimed_by=token, status='sending').order_by('id'))
+
+def _fail(row, error, now):
+    row.attempts += 1
+    row.last_error = str(error)[:2000]
+    if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        row.status = 'dead'
+        logger.error("Giving up on queued email %s after %s attempts: %s", row.pk, row.attempts, error)
+    else:
+        row.status, row.next_attempt_at = 'pending', now + retry_delay(row.attempts)
+        logger.warning("Queued email %s failed (attempt %s), retrying: %s", row.pk, row.attempts, error)
+
+def deliver_pending(batch_size=None, connection=None):
+    """Claim and send one batch over a single connection. Returns (sent, failed)."""
+    batch = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        connection = None
+        open_error = e
+
+    now = timezone.now()
+    for row in batch:
+        if connection is None:
+            _fail(row, open_error, now)
+            failed += 1
+            continue
+        message = EmailMessage(row.subject, row.body, row.from_email, row.to, connection=connection)
+        try:
+            # One message per call so a rejected recipient only fails its own row.
+            connection.send_messages([message])
+        except Exception as e:
+            _fail(row, e, now)
+            failed += 1
+        else:
+            row.status, row.sent_at, row.attempts, row.last_error = 'sent', timezone.now(), row.attempts + 1, ''
+            sent += 1
+    if connection is not None:
+        connection.close()
+
+    for row in batch:
+        row.claimed_by, row.locked_until = '', None
+    EmailOutbox.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'sent_at', 'last_error', 'claimed_by', 'locked_until']
+    )
+    return sent, failed
+
+def requeue_dead():
+    """Give dead-lettered rows a fresh set of attempts."""
+    return EmailOutbox.objects.filter(status='dead').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(), last_error=''
+    )
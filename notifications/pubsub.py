@@ -0,0 +1,123 @@
+"""
+In-process publish/subscribe for the live event stream (see views.event_stream).
+
+Publishers are ordinary sync code (post_save receivers); subscribers are
+async SSE responses waiting on an asyncio.Queue. The broker class comes from
+the EVENT_BROKER setting so a deployment with several server processes can
+swap in a shared backend (Redis, Postgres LISTEN/NOTIFY, ...) exposing the
+same publish()/subscribe(). InMemoryBroker only reaches subscribers in the
+publishing process, which is what a single ASGI worker and the tests need.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+def vehicle_channel(vehicle_id):
+    return f'vehicle:{vehicle_id}'
+
+class Subscription:
+    """Events for a set of channels, buffered per subscriber. Iterate with `await get(timeout)`."""
+
+    def __init__(self, broker, channels, max_queue):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def deliver(self, event):
+        # Called from any thread; hop onto the subscriber's loop.
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()  # a slow client loses the oldest event, not the newest
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """The next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class InMemoryBroker:
+    def __init__(self, max_queue=None):
+        self.max_queue = max_queue or settings.EVENT_STREAM_QUEUE_SIZE
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, channels):
+        """Must be called from the subscriber's event loop."""
+        subscription = Subscription(self, channels, self.max_queue)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, event_type, data):
+        """Fan `data` out to `channel`'s subscribers. Returns how many received it."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        if not subscribers:
+            return 0
+        event = {'id': next(self._ids), 'event': event_type, 'data': data}
+        for subscription in subscribers:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's loop has shut down; it will never read again.
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.EVENT_BROKER)()
+
+def publish_notifications(notifications):
+    """Push saved Notification rows to their recipients once the transaction commits."""
+    events = [
+        (user_channel(n.recipient_id), {
+            'id': n.pk,
+            'message': n.message,
+            'notification_type': n.notification_type,
+            'vehicle': n.vehicle_id,
+            'created_at': n.created_at,
+        })
+        for n in notifications
+    ]
+
+    def publish():
+        broker = get_broker()
+        for channel, data in events:
+            broker.publish(channel, 'notification', data)
+    transaction.on_commit(publish)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from vehicles.fieldsets import SparseModelSerializer
 from .models import Notification
 from django.conf import settings
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseModelSerializer):
     recipient = serializers.StringRelatedField(read_only=True)
     timestamp = serializers.DateTimeField(read_only=True)
 
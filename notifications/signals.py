@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from accounts.models import CustomUser
 from .models import Notification
+from .counters import adjust_unread
+from .pubsub import publish_notifications
 
 @receiver(post_save, sender=CustomUser)
 def notify_user_creation(sender, instance, created, **kwargs):
@@ -10,3 +12,31 @@ def notify_user_creation(sender, instance, created, **kwargs):
             recipient=instance,
             message=f"Welcome {instance.username}! Your account has been created."
         )
+
+@receiver(pre_save, sender=Notification)
+def remember_unread_state(sender, instance, **kwargs):
+    instance._previous_unread = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list('recipient_id', 'is_read').first()
+        if previous is not None:
+            instance._previous_unread = (previous[0], not previous[1])
+
+@receiver(post_save, sender=Notification)
+def update_unread_counter(sender, instance, created, **kwargs):
+    deltas = {}
+    previous = None if created else getattr(instance, '_previous_unread', None)
+    if previous is not None and previous[1]:
+        deltas[previous[0]] = -1
+    if not instance.is_read:
+        deltas[instance.recipient_id] = deltas.get(instance.recipient_id, 0) + 1
+    adjust_unread(deltas)
+
+@receiver(post_delete, sender=Notification)
+def release_unread_counter(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread({instance.recipient_id: -1})
+
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    if created:
+        publish_notifications([instance])
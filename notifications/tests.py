@@ -1,6 +1,33 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import AsyncRequestFactory, TestCase, override_settings
 from django.contrib.auth import get_user_model
-from notifications.models import Notification
+from django.utils import timezone
+from io import StringIO
+from notifications.counters import notifications_created, unread_count
+from notifications.fanout import _send_chunk, cancel_job, claim_job, create_fanout, run_job, segment_users
+from notifications.models import Notification, NotificationCounter, EmailOutbox, FanoutJob
+from notifications.outbox import enqueue_email, enqueue_emails, deliver_pending, claim_batch
+from notifications.pubsub import InMemoryBroker, get_broker, user_channel
+from notifications.views import StreamTicketView, _authenticate, event_stream, issue_stream_ticket
+from rest_framework_simplejwt.tokens import AccessToken
+from vehicles.models import Vehicle, EVTelemetry, Listing
+from api.views import (
+    NotificationListView, NotificationUnreadCountView, NotificationMarkReadView,
+    FanoutJobListCreateView, FanoutJobCancelView,
+)
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
 import notifications.signals  # ✅ Forces signal connection during test
 
 User = get_user_model()
@@ -9,3 +36,357 @@ class NotificationTests(TestCase):
     def test_notification_created_on_user_creation(self):
         user = User.objects.create_user(username='testuser', password='pass123')
         self.assertTrue(Notification.objects.filter(recipient=user).exists())
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='pw')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        Notification.objects.all().delete()  # drop the welcome notifications
+
+    def _call(self, view, method='get', data=None, user=None):
+        request = getattr(self.factory, method)('/', data, format='json' if method == 'post' else None)
+        force_authenticate(request, user=user or self.user)
+        return view.as_view()(request)
+
+    def test_counter_follows_create_read_delete(self):
+        first = Notification.objects.create(recipient=self.user, message='One')
+        Notification.objects.create(recipient=self.user, message='Two')
+        notifications_created(Notification.objects.bulk_create([Notification(recipient=self.user, message='Three')]))
+        self.assertEqual(unread_count(self.user), 3)
+
+        first.is_read = True
+        first.save()
+        self.assertEqual(unread_count(self.user), 2)
+        Notification.objects.filter(message='Two').get().delete()
+        self.assertEqual(unread_count(self.user), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._call(NotificationUnreadCountView)
+        self.assertEqual(response.data, {'unread': 1})
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        NotificationCounter.objects.update(unread=40)
+        call_command('recount_unread_notifications', stdout=StringIO())
+        self.assertEqual(unread_count(self.user), 1)
+
+    def test_list_is_scoped_and_mark_read_is_one_update(self):
+        mine = [Notification.objects.create(recipient=self.user, message=f'Mine {i}') for i in range(3)]
+        theirs = Notification.objects.create(recipient=self.other, message='Theirs')
+
+        response = self._call(NotificationListView, data={'unread': 1})
+        self.assertEqual([row['id'] for row in response.data['results']], [n.id for n in reversed(mine)])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._call(NotificationMarkReadView, 'post', {'ids': [mine[0].id, theirs.id]})
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "notifications_notification"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(response.data, {'marked': 1, 'unread': 2})
+        self.assertFalse(Notification.objects.get(pk=theirs.pk).is_read)
+
+        response = self._call(NotificationMarkReadView, 'post', {'all': True})
+        self.assertEqual(response.data, {'marked': 2, 'unread': 0})
+        self.assertEqual(unread_count(self.other), 1)
+        self.assertEqual(self._call(NotificationMarkReadView, 'post', {'ids': 'x'}).status_code, 400)
+        self.assertEqual(self._call(NotificationMarkReadView, 'post', {'ids': [True]}).status_code, 400)
+        self.assertEqual(self._call(NotificationMarkReadView, 'post', [mine[1].id]).status_code, 400)
+
+    @override_settings(RESPONSE_CACHE_SHARED=False)
+    def test_mark_read_moves_the_list_etag(self):
+        Notification.objects.create(recipient=self.user, message='Unread')
+        etag = self._call(NotificationListView)['ETag']
+        self._call(NotificationMarkReadView, 'post', {'all': True})
+        self.assertNotEqual(self._call(NotificationListView)['ETag'], etag)
+
+    def test_deleting_a_user_leaves_no_counter_behind(self):
+        Notification.objects.create(recipient=self.other, message='Unread')
+        self.other.delete()
+        self.assertFalse(NotificationCounter.objects.filter(user_id=self.other.pk).exists())
+        connection.check_constraints()
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailOutboxTests(TestCase):
+    def test_enqueue_then_deliver(self):
+        enqueue_emails([
+            ('One', 'Body one', ['a@example.com']),
+            ('Nobody', 'Skipped', []),
+            ('Two', 'Body two', ['b@example.com', 'c@example.com']),
+        ])
+        self.assertEqual(EmailOutbox.objects.filter(status='pending').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual([m.subject for m in mail.outbox], ['One', 'Two'])
+        self.assertEqual(mail.outbox[1].to, ['b@example.com', 'c@example.com'])
+        self.assertFalse(EmailOutbox.objects.exclude(status='sent').exists())
+
+    def test_batch_shares_one_connection(self):
+        enqueue_emails([(f'Mail {i}', 'Body', ['a@example.com']) for i in range(5)])
+        connection = get_connection()
+        with mock.patch.object(connection, 'open', wraps=connection.open) as opened:
+            self.assertEqual(deliver_pending(batch_size=10, connection=connection), (5, 0))
+        opened.assert_called_once()
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE=60)
+    def test_failures_back_off_then_dead_letter(self):
+        row = enqueue_email('Broken', 'Body', ['a@example.com'])
+        good = enqueue_email('Fine', 'Body', ['b@example.com'])
+        connection = get_connection()
+
+        def send_messages(messages):
+            if messages[0].subject == 'Broken':
+                raise OSError('recipient refused')
+            return len(messages)
+
+        with mock.patch.object(connection, 'send_messages', side_effect=send_messages):
+            self.assertEqual(deliver_pending(connection=connection), (1, 1))
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts), ('pending', 1))
+            self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=50))
+            self.assertEqual(deliver_pending(connection=connection), (0, 0))  # not due yet
+
+            EmailOutbox.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_pending(connection=connection), (0, 1))
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'dead')
+        self.assertIn('recipient refused', row.last_error)
+        self.assertEqual(EmailOutbox.objects.get(pk=good.pk).status, 'sent')
+
+        call_command('send_outbox', '--requeue-dead', stdout=StringIO())
+        self.assertEqual(EmailOutbox.objects.get(pk=row.pk).status, 'sent')
+
+    def test_claims_are_exclusive_until_the_lease_expires(self):
+        enqueue_emails([('A', 'Body', ['a@example.com']), ('B', 'Body', ['b@example.com'])])
+        self.assertEqual(len(claim_batch(10)), 2)
+        self.assertEqual(claim_batch(10), [])
+        later = timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE + 1)
+        self.assertEqual(len(claim_batch(10, now=later)), 2)
+
+    def test_vehicle_creation_queues_mail(self):
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        Vehicle.objects.create(owner=owner, make='Audi', model='e-tron', year=2022, vin='WAUZZZGE0NB000001')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.get().to, ['owner@example.com'])
+
+class FanoutTests(TestCase):
+    def setUp(self):
+        self.sellers = [
+            User.objects.create_user(username=f'seller{i}', email=f'seller{i}@example.com', password='pw', role='seller')
+            for i in range(5)
+        ]
+        self.guest = User.objects.create_user(username='guest', email='guest@example.com', password='pw')
+        self.staff = User.objects.create_user(username='staff', email='staff@example.com', password='pw', is_staff=True)
+        Notification.objects.all().delete()
+        NotificationCounter.objects.all().delete()
+
+    def _run(self, job, chunk_size):
+        claim_job(job.pk)
+        job.refresh_from_db()
+        return run_job(job, chunk_size)
+
+    def test_segments(self):
+        Vehicle.objects.create(owner=self.guest, make='Tesla', model='Model 3', year=2021, vin='5YJ3E1EA0MF000001')
+        Vehicle.objects.create(owner=self.sellers[0], make='tesla', model='Model Y', year=2022, vin='5YJYGDEE0MF000002')
+        Vehicle.objects.create(owner=self.sellers[0], make='Tesla', model='Model S', year=2023, vin='5YJSA1E20MF000003')
+        for seller, region in [(self.sellers[1], 'EU'), (self.sellers[2], 'eu'), (self.sellers[3], 'US')]:
+            Listing.objects.create(seller=seller, title='Car', price=1000, currency='EUR', location='X', region=region)
+        Listing.objects.create(seller=self.sellers[4], title='Sold', price=1, currency='EUR', location='X', region='EU', is_active=False)
+        self.sellers[3].is_active = False
+        self.sellers[3].save()
+
+        def ids(segment):
+            return sorted(segment_users(segment).values_list('id', flat=True))
+        self.assertEqual(ids({'role': 'seller'}), sorted(u.pk for u in self.sellers if u.is_active))
+        self.assertEqual(ids({'make': 'TESLA'}), sorted([self.guest.pk, self.sellers[0].pk]))
+        self.assertEqual(ids({'make': 'Tesla', 'role': 'seller'}), [self.sellers[0].pk])
+        self.assertEqual(ids({'region': 'EU'}), [self.sellers[1].pk, self.sellers[2].pk])
+        with self.assertRaises(ValueError):
+            create_fanout('Hi', segment={'country': 'DE'})
+        with self.assertRaises(ValueError):
+            create_fanout('Hi', segment={'role': 'pilot'})
+
+    def test_chunked_delivery_resumes_without_duplicates(self):
+        job = create_fanout('New listing policy', 'warning', {'role': 'seller'}, created_by=self.staff)
+        self.assertEqual(job.total, 5)
+
+        # Simulate a worker that died after committing the first chunk of two.
+        FanoutJob.objects.filter(pk=job.pk).update(
+            status='failed', last_user_id=self.sellers[1].pk, sent_count=2
+        )
+        Notification.objects.bulk_create([Notification(recipient=u, message='New listing policy') for u in self.sellers[:2]])
+
+        FanoutJob.objects.filter(pk=job.pk).update(status='pending')  # what `--job` does before claiming
+        with CaptureQueriesContext(connection) as ctx:
+            job = self._run(job, chunk_size=2)
+        self.assertEqual((job.status, job.sent_count, job.last_user_id), ('done', 5, self.sellers[-1].pk))
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "notifications_notification"')]
+        self.assertEqual(len(inserts), 2)  # one multi-row INSERT per chunk, not one per recipient
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient_id', flat=True)),
+            sorted(u.pk for u in self.sellers),
+        )
+        self.assertEqual(Notification.objects.filter(notification_type='warning').count(), 3)
+        self.assertEqual(unread_count(self.sellers[4]), 1)
+        self.assertEqual(unread_count(self.guest), 0)
+
+    def test_cancel_stops_between_chunks(self):
+        job = create_fanout('Maintenance tonight')
+        claim_job(job.pk)
+        job.refresh_from_db()
+        calls = []
+
+        def cancel_after_first(job):
+            calls.append(job.sent_count)
+            cancel_job(job)
+
+        job = run_job(job, chunk_size=3, progress=cancel_after_first)
+        self.assertEqual(calls, [3])
+        self.assertEqual((job.status, job.sent_count), ('cancelled', 3))
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_resumed_job_stops_the_old_worker(self):
+        job = create_fanout('Maintenance tonight')
+        claim_job(job.pk)
+        job.refresh_from_db()
+
+        others = []
+
+        def taken_over(job):
+            # A second worker requeues and claims the job, and is mid-delivery when the first one wakes up.
+            FanoutJob.objects.filter(pk=job.pk).update(status='pending')
+            claim_job(job.pk)
+            others.append(FanoutJob.objects.get(pk=job.pk))
+            self.assertEqual(_send_chunk(others[0], 3), 3)
+
+        job = run_job(job, chunk_size=3, progress=taken_over)
+        self.assertEqual((job.status, job.sent_count), ('running', 6))
+        job = run_job(others[0], chunk_size=3)
+        self.assertEqual((job.status, job.sent_count), ('done', 7))
+        recipients = list(Notification.objects.values_list('recipient_id', flat=True))
+        self.assertEqual(len(recipients), 7)
+        self.assertEqual(len(set(recipients)), 7)
+
+    def test_job_option_only_resumes_failed_or_stale_jobs(self):
+        job = create_fanout('Maintenance tonight')
+        claim_job(job.pk)
+        with self.assertRaisesMessage(CommandError, 'still running'):
+            call_command('fanout_notifications', job=job.pk, stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 0)
+
+        FanoutJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=11))
+        call_command('fanout_notifications', job=job.pk, stdout=StringIO())
+        self.assertEqual(FanoutJob.objects.get(pk=job.pk).status, 'done')
+        self.assertEqual(Notification.objects.count(), 7)
+
+        with self.assertRaisesMessage(CommandError, 'already finished'):
+            call_command('fanout_notifications', job=job.pk, stdout=StringIO())
+
+    def test_api_queues_and_command_delivers(self):
+        factory = APIRequestFactory()
+        payload = {'message': 'Fees change next month', 'segment': {'role': 'seller'}}
+
+        request = factory.post('/', payload, format='json')
+        force_authenticate(request, user=self.guest)
+        self.assertEqual(FanoutJobListCreateView.as_view()(request).status_code, 403)
+
+        request = factory.post('/', {**payload, 'segment': {'colour': 'red'}}, format='json')
+        force_authenticate(request, user=self.staff)
+        self.assertEqual(FanoutJobListCreateView.as_view()(request).status_code, 400)
+
+        request = factory.post('/', payload, format='json')
+        force_authenticate(request, user=self.staff)
+        response = FanoutJobListCreateView.as_view()(request)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['status'], response.data['total']), ('pending', 5))
+        self.assertEqual(Notification.objects.count(), 0)
+
+        call_command('fanout_notifications', chunk_size=2, stdout=StringIO())
+        job = FanoutJob.objects.get()
+        self.assertEqual((job.status, job.sent_count, job.created_by), ('done', 5, self.staff))
+        self.assertEqual(Notification.objects.count(), 5)
+
+        request = factory.post('/')
+        force_authenticate(request, user=self.staff)
+        self.assertEqual(FanoutJobCancelView.as_view()(request, pk=job.pk).status_code, 409)
+
+        out = StringIO()
+        call_command('fanout_notifications', message='Hello guests', role='guest', stdout=out)
+        self.assertIn('Created fan-out', out.getvalue())
+        self.assertEqual(Notification.objects.filter(recipient=self.guest).count(), 1)
+
+class EventStreamTests(TestCase):
+    async def test_broker_fans_out_across_threads_and_drops_oldest(self):
+        broker = InMemoryBroker(max_queue=2)
+        subscription = broker.subscribe([user_channel(1)])
+        thread = threading.Thread(target=lambda: [broker.publish(user_channel(1), 'notification', {'n': n}) for n in range(3)])
+        thread.start()
+        thread.join()
+        self.assertEqual(broker.publish(user_channel(2), 'notification', {}), 0)
+
+        events = [await subscription.get(timeout=1), await subscription.get(timeout=1)]
+        self.assertEqual([e['data']['n'] for e in events], [1, 2])
+        self.assertEqual(subscription.dropped, 1)
+        self.assertIsNone(await subscription.get(timeout=0.01))
+
+        subscription.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def _create(self, model, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return model.objects.create(**fields)
+
+    @override_settings(EVENT_STREAM_HEARTBEAT=0.05, EVENT_STREAM_MAX_AGE=1)
+    async def test_stream_pushes_own_notifications_and_telemetry(self):
+        user = await sync_to_async(User.objects.create_user)(username='live', email='live@example.com', password='pw')
+        stranger = await sync_to_async(User.objects.create_user)(username='far', email='far@example.com', password='pw')
+        mine = await Vehicle.objects.acreate(owner=user, make='BYD', model='Dolphin', year=2024, vin='LGXCE4CB0R0000001')
+        theirs = await Vehicle.objects.acreate(owner=stranger, make='BYD', model='Seal', year=2024, vin='LGXCE4CB0R0000002')
+        create = sync_to_async(self._create)
+        telemetry = {'battery_level': 55, 'range_estimate_km': 220, 'location_lat': 1, 'location_lon': 2, 'speed_kph': 30}
+
+        self.assertEqual((await event_stream(AsyncRequestFactory().get('/'))).status_code, 401)
+        # the access token is not accepted in the URL
+        request = AsyncRequestFactory().get('/', {'token': str(AccessToken.for_user(user))})
+        self.assertEqual((await event_stream(request)).status_code, 401)
+
+        ticket_request = APIRequestFactory().post('/')
+        force_authenticate(ticket_request, user=user)
+        ticket = (await sync_to_async(StreamTicketView.as_view())(ticket_request)).data['ticket']
+        request = AsyncRequestFactory().get('/', {'ticket': ticket}, HTTP_ACCEPT_ENCODING='gzip')
+        response = await event_stream(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertNotIn('HTTP_ACCEPT_ENCODING', request.META)
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')  # subscribed from here on
+
+        await create(Notification, recipient=stranger, message='Not yours')
+        await create(EVTelemetry, vehicle=theirs, **telemetry)
+        await create(Notification, recipient=user, message='Charging complete')
+        chunk = (await anext(stream)).decode()
+        self.assertIn('event: notification', chunk)
+        self.assertEqual(json.loads(chunk.split('data: ')[1])['message'], 'Charging complete')
+
+        await create(EVTelemetry, vehicle=mine, **telemetry)
+        chunk = (await anext(stream)).decode()
+        self.assertIn('event: telemetry', chunk)
+        self.assertEqual(json.loads(chunk.split('data: ')[1])['vehicle'], mine.pk)
+
+        # only keep-alives until EVENT_STREAM_MAX_AGE ends the response and unsubscribes
+        self.assertEqual({chunk async for chunk in stream}, {b': keep-alive\n\n'})
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+    async def test_stream_tickets_expire_and_cannot_be_forged(self):
+        user = await sync_to_async(User.objects.create_user)(username='tix', email='tix@example.com', password='pw')
+        ticket = issue_stream_ticket(user)
+        self.assertEqual((await _authenticate(AsyncRequestFactory().get('/', {'ticket': ticket}))).pk, user.pk)
+
+        user_id, _, stamp_and_signature = ticket.partition(':')
+        forged = f'{user_id}1:{stamp_and_signature}'
+        self.assertIsNone(await _authenticate(AsyncRequestFactory().get('/', {'ticket': forged})))
+        with override_settings(EVENT_STREAM_TICKET_TTL=-1):
+            self.assertIsNone(await _authenticate(AsyncRequestFactory().get('/', {'ticket': ticket})))
+
+        # Authorization headers stay out of access logs, so the JWT is fine there
+        request = AsyncRequestFactory().get('/', headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'})
+        self.assertEqual((await _authenticate(request)).pk, user.pk)
@@ -1,9 +1,12 @@
 from django.urls import path
 from django.http import HttpResponse
+from .views import StreamTicketView, event_stream
 
 def notifications_home(request):
     return HttpResponse("🔔 Notifications module is wired.")
 
 urlpatterns = [
     path('', notifications_home, name='notifications-home'),
+    path('stream/', event_stream, name='event-stream'),  # 📡 SSE
+    path('stream/ticket/', StreamTicketView.as_view(), name='event-stream-ticket'),
 ]
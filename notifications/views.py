@@ -1,3 +1,91 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from vehicles.models import Vehicle
+from .pubsub import get_broker, user_channel, vehicle_channel
+
+User = get_user_model()
+
+STREAM_TICKET_SALT = 'notifications.event_stream'
+
+def format_event(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+def issue_stream_ticket(user):
+    return signing.TimestampSigner(salt=STREAM_TICKET_SALT).sign(str(user.pk))
+
+def _ticket_user_id(ticket):
+    try:
+        return int(signing.TimestampSigner(salt=STREAM_TICKET_SALT).unsign(ticket, max_age=settings.EVENT_STREAM_TICKET_TTL))
+    except (signing.BadSignature, ValueError):
+        return None
+
+async def _authenticate(request):
+    # EventSource cannot send headers, so browsers pass a stream ticket as
+    # ?ticket=; the access JWT itself is never accepted in the URL, where it
+    # would end up in server and proxy logs.
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = _ticket_user_id(ticket)
+        return await User.objects.filter(pk=user_id, is_active=True).afirst() if user_id else None
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        try:
+            return await User.objects.aget(pk=AccessToken(header[len('Bearer '):])['user_id'], is_active=True)
+        except Exception:
+            return None
+    # Session auth: resolving the lazy request.user hits the database.
+    user = await sync_to_async(lambda: getattr(request, 'user', None))()
+    return user if user is not None and user.is_authenticated else None
+
+async def _events(channels, heartbeat, max_age):
+    subscription = get_broker().subscribe(channels)
+    loop = subscription.loop
+    deadline = loop.time() + max_age
+    try:
+        yield 'retry: 3000\n\n'
+        # Django 4.2 does not cancel a streaming response when the client goes
+        # away, so every stream ends after `max_age` and the browser reconnects.
+        while (remaining := deadline - loop.time()) > 0:
+            event = await subscription.get(timeout=min(heartbeat, remaining))
+            yield ': keep-alive\n\n' if event is None else format_event(event)
+    finally:
+        subscription.close()
+
+# 🎟️ Short-lived ticket for opening the event stream from a browser
+class StreamTicketView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Only good for ?ticket= on the stream, and only for EVENT_STREAM_TICKET_TTL
+        # seconds: fetch a new one for every (re)connect.
+        return Response({'ticket': issue_stream_ticket(request.user), 'expires_in': settings.EVENT_STREAM_TICKET_TTL})
+
+# 📡 Live notifications and telemetry for the user's vehicles (Server-Sent Events, ASGI only)
+async def event_stream(request):
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    channels = [user_channel(user.pk)]
+    channels += [vehicle_channel(pk) async for pk in Vehicle.objects.filter(owner=user).values_list('pk', flat=True)]
+    response = StreamingHttpResponse(
+        _events(channels, settings.EVENT_STREAM_HEARTBEAT, settings.EVENT_STREAM_MAX_AGE),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # GZipMiddleware holds chunks in its compressor until it fills, which would stall events.
+    request.META.pop('HTTP_ACCEPT_ENCODING', None)
+    response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    return response
@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     Vehicle, Part, Listing, SellerProfile, BuyRequest, AuctionBid, SellerFeedback,
     EVTelemetry, ADASCalibration, FuseBox, WiringDiagram, SensorReading, OBDDiagnostic,
-    Sensor, Acronym, LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback
+    Sensor, Acronym, LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback,
+    Trip
 )
 
 @admin.register(Vehicle)
@@ -148,4 +149,12 @@ class LegacySellerFeedbackAdmin(admin.ModelAdmin):
     list_filter = ('rating',)
     search_fields = ('seller__email', 'reviewer__email', 'comment')
     readonly_fields = ('timestamp',)
-    list_per_page = 25
\ No newline at end of file
+    list_per_page = 25
+
+@admin.register(Trip)
+class TripAdmin(admin.ModelAdmin):
+    list_display = ('vehicle', 'started_at', 'ended_at', 'distance_km', 'reading_count', 'is_open')
+    list_filter = ('is_open',)
+    search_fields = ('vehicle__vin',)
+    list_select_related = ('vehicle',)
+    list_per_page = 25
@@ -0,0 +1,72 @@
+"""
+Low-battery alerting on telemetry writes.
+
+Each vehicle has a BatteryAlertState. An alert fires only when the level
+crosses below LOW_BATTERY_THRESHOLD, and the state re-arms only once the
+level climbs back to LOW_BATTERY_CLEAR or above (hysteresis), so a car
+hovering around the threshold or reporting every few seconds while low
+produces one alert, not one per row. LOW_BATTERY_COOLDOWN additionally caps
+alerts per vehicle; a crossing that lands inside the cooldown is remembered
+(alert_pending) and alerted on the first still-low reading after it ends.
+Mail is queued in the notifications outbox, never sent
+inline.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from notifications.outbox import enqueue_emails
+
+from .models import BatteryAlertState, Vehicle
+
+def _crossings(state, readings, threshold, clear, cooldown):
+    """Advance `state` through time-ordered readings; returns the readings that alert."""
+    alerts = []
+    for reading in readings:
+        if state.last_reading_at is not None and reading.timestamp < state.last_reading_at:
+            continue  # late arrival; the state already reflects newer data
+        level = reading.battery_level
+        if not state.is_low and level < threshold:
+            state.is_low = state.alert_pending = True
+        elif state.is_low and level >= clear:
+            state.is_low = state.alert_pending = False
+        if state.alert_pending and (state.last_alert_at is None or reading.timestamp - state.last_alert_at >= cooldown):
+            state.alert_pending = False
+            state.last_alert_at = reading.timestamp
+            alerts.append(reading)
+        state.last_level, state.last_reading_at = level, reading.timestamp
+    return alerts
+
+def _alert_email(vehicle, reading):
+    subject = f'Low Battery Alert for {vehicle}'
+    message = f'Your vehicle {vehicle.make} {vehicle.model} has a battery level of {reading.battery_level}%. Please charge soon.'
+    return subject, message, [vehicle.owner.email] if vehicle.owner and vehicle.owner.email else []
+
+def evaluate_battery_alerts(readings):
+    """Update alert state for saved EVTelemetry rows and queue any alerts. Returns alerts queued."""
+    by_vehicle = defaultdict(list)
+    for reading in readings:
+        by_vehicle[reading.vehicle_id].append(reading)
+    if not by_vehicle:
+        return 0
+
+    threshold, clear = settings.LOW_BATTERY_THRESHOLD, settings.LOW_BATTERY_CLEAR
+    cooldown = timedelta(seconds=settings.LOW_BATTERY_COOLDOWN)
+    with transaction.atomic():
+        BatteryAlertState.objects.bulk_create(
+            [BatteryAlertState(vehicle_id=vehicle_id) for vehicle_id in by_vehicle], ignore_conflicts=True
+        )
+        states = list(BatteryAlertState.objects.select_for_update().filter(vehicle_id__in=by_vehicle))
+
+        alerts = []
+        for state in states:
+            ordered = sorted(by_vehicle[state.vehicle_id], key=lambda r: (r.timestamp, r.pk))
+            alerts.extend(_crossings(state, ordered, threshold, clear, cooldown))
+        BatteryAlertState.objects.bulk_update(states, ['is_low', 'alert_pending', 'last_level', 'last_reading_at', 'last_alert_at'])
+
+        if alerts:
+            vehicles = Vehicle.objects.select_related('owner').in_bulk({r.vehicle_id for r in alerts})
+            enqueue_emails(_alert_email(vehicles[r.vehicle_id], r) for r in alerts)
+    return len(alerts)
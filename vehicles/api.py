@@ -33,7 +33,9 @@ class OBDDiagnosticViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def export(self, request):
         fields = ['dtc_code', 'description', 'severity']
-        return export_queryset_to_csv(self.get_queryset(), fields, filename='obd_diagnostics.csv')
+        return export_queryset_to_csv(
+            self.get_queryset(), fields, filename='obd_diagnostics.csv', request=request
+        )
 
     @action(detail=False, methods=['get'])
     def chart(self, request):
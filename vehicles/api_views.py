@@ -1,18 +1,31 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.http import HttpResponse
+from django.db import transaction
 from django.db.models import Avg
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.pdfgen import canvas
-import csv
 from datetime import datetime
 
-from .pagination import StandardResultsSetPagination
+from .downsample import downsample, parse_threshold
+from .pagination import StandardResultsSetPagination, KeysetPagination, StartedAtKeysetPagination
+from .parsers import NDJSONParser
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseQuerysetMixin
+from .fastpath import FastListMixin
+from .renderers import SERIES_RENDERERS
+from .response_cache import CachedResponseMixin
+from .ingest import ingest_rows
+from . import rollups
+from .utils import parse_vehicle_id
+from .export import export_queryset_to_csv, write_vehicle_pdf
 from .models import (
     Vehicle, Part, Listing, SellerProfile, BuyRequest, AuctionBid, SellerFeedback,
     EVTelemetry, ADASCalibration, FuseBox, WiringDiagram, SensorReading, OBDDiagnostic,
-    Sensor, Acronym, LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback
+    Sensor, Acronym, LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback,
+    Trip
 )
 from .serializers import (
     VehicleSerializer, PartSerializer, ListingSerializer, SellerProfileSerializer,
@@ -21,7 +34,9 @@ from .serializers import (
     WiringDiagramSerializer, SensorReadingSerializer, OBDDiagnosticSerializer,
     SensorSerializer, AcronymSerializer,
     LegacyDiagnosticCodeSerializer, LegacyGuestBlogSerializer,
-    LegacyCarListingSerializer, LegacySellerFeedbackSerializer
+    LegacyCarListingSerializer, LegacySellerFeedbackSerializer,
+    EVTelemetryIngestSerializer, SensorReadingIngestSerializer,
+    TripSerializer
 )
 from .filters import (
     VehicleFilter, PartFilter, ListingFilter, SellerProfileFilter, BuyRequestFilter,
@@ -29,7 +44,8 @@ from .filters import (
     FuseBoxFilter, WiringDiagramFilter, SensorReadingFilter, OBDDiagnosticFilter,
     SensorFilter, AcronymFilter,
     LegacyDiagnosticCodeFilter, LegacyGuestBlogFilter,
-    LegacyCarListingFilter, LegacySellerFeedbackFilter
+    LegacyCarListingFilter, LegacySellerFeedbackFilter,
+    TripFilter
 )
 
 class VehicleMetadataView(APIView):
@@ -46,10 +62,29 @@ class FuseBoxLookupView(APIView):
         data = FuseBox.objects.values('vehicle__vin', 'location', 'make', 'model', 'year').distinct()
         return Response(list(data))
 
-class SensorChartView(APIView):
+class SensorChartView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    etag_append_only = True
+
+    def get_etag_queryset(self):
+        try:
+            vehicle_id = parse_vehicle_id(self.request.query_params.get('vehicle'))
+        except ValueError:
+            return None  # get() answers 400
+        readings = SensorReading.objects.all()
+        if vehicle_id is not None:
+            readings = readings.filter(vehicle_id=vehicle_id)
+        return readings
 
     def get(self, request):
+        try:
+            threshold = parse_threshold(request.query_params.get('downsample'))
+            vehicle_id = parse_vehicle_id(request.query_params.get('vehicle'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if threshold is not None:
+            return self.series(request, threshold, vehicle_id)
+
         data = (
             SensorReading.objects
             .values('sensor_type')
@@ -62,20 +97,32 @@ class SensorChartView(APIView):
         }
         return Response(chart_data)
 
+    def series(self, request, threshold, vehicle_id):
+        # ?downsample=N&sensor_type=...[&vehicle=]: one time series, at most N points
+        sensor_type = request.query_params.get('sensor_type')
+        if not sensor_type:
+            return Response({"error": "sensor_type is required with downsample"}, status=status.HTTP_400_BAD_REQUEST)
+        readings = SensorReading.objects.filter(sensor_type=sensor_type)
+        if vehicle_id is not None:
+            readings = readings.filter(vehicle_id=vehicle_id)
+
+        rows = downsample(list(readings.order_by('timestamp', 'id').values_list('timestamp', 'value')), threshold)
+        return Response({
+            "labels": [ts.isoformat() for ts, _ in rows],
+            "values": [value for _, value in rows],
+        })
+
 class ExportCSVView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="vehicles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Make', 'Model', 'Year', 'VIN'])
-
-        for vehicle in Vehicle.objects.all():
-            writer.writerow([vehicle.make, vehicle.model, vehicle.year, vehicle.vin])
-
-        return response
+        return export_queryset_to_csv(
+            Vehicle.objects.all(),
+            ['make', 'model', 'year', 'vin'],
+            filename=f'vehicles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+            header=['Make', 'Model', 'Year', 'VIN'],
+            request=request,
+        )
 
 class ExportPDFView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -84,51 +131,90 @@ class ExportPDFView(APIView):
         response = HttpResponse(content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="vehicles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
 
-        p = canvas.Canvas(response)
-        p.setFont("Helvetica", 12)
-        p.drawString(100, 800, "Vehicle Export")
-
-        y = 780
-        for vehicle in Vehicle.objects.all():
-            line = f"{vehicle.make} {vehicle.model} ({vehicle.year}) - VIN: {vehicle.vin}"
-            p.drawString(100, y, line)
-            y -= 20
-            if y < 50:
-                p.showPage()
-                p.setFont("Helvetica", 12)
-                y = 800
-
-        p.save()
+        write_vehicle_pdf(response)
         return response
 
-class BaseViewSet(viewsets.ModelViewSet):
+# Nested serializers read related rows; SparseQuerysetMixin loads them with the page.
+class BaseViewSet(SparseQuerysetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     pagination_class = StandardResultsSetPagination
 
+    # Rows written by post_save receivers (e.g. queued emails) commit with the object.
+    @transaction.atomic
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
-        model_name = self.get_serializer().Meta.model.__name__.lower()
-        user = self.request.user
-        serializer.save(
-            owner=user if model_name == 'vehicle' else None,
-            seller=user if model_name in ['part', 'listing', 'legacycarlisting'] else None,
-            bidder=user if model_name == 'auctionbid' else None,
-            reviewer=user if model_name in ['sellerfeedback', 'legacysellerfeedback'] else None,
-            buyer=user if model_name == 'buyrequest' else None,
-            calibrated_by=user if model_name == 'adascalibration' else None
-        )
-
-
-class VehicleViewSet(BaseViewSet):
+            model_name = self.get_serializer().Meta.model.__name__.lower()
+            user = self.request.user
+            serializer.save(
+                owner=user if model_name == 'vehicle' else None,
+                seller=user if model_name in ['part', 'listing', 'legacycarlisting'] else None,
+                bidder=user if model_name == 'auctionbid' else None,
+                reviewer=user if model_name in ['sellerfeedback', 'legacysellerfeedback'] else None,
+                buyer=user if model_name == 'buyrequest' else None,
+                calibrated_by=user if model_name == 'adascalibration' else None
+            )
+
+class BulkIngestMixin:
+    # POST <route>/bulk/ with a JSON array or NDJSON body of flat rows.
+    ingest_serializer_class = None
+    bulk_max_rows = 10000
+
+    @action(
+        detail=False, methods=['post'], url_path='bulk',
+        parser_classes=[JSONParser, NDJSONParser],
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def bulk(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'Expected a JSON array or NDJSON body.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.bulk_max_rows:
+            return Response(
+                {'error': f'Batch too large: {len(rows)} rows (max {self.bulk_max_rows}).'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        # Staff may write for any vehicle, everyone else only for their own.
+        vehicles = Vehicle.objects.all() if request.user.is_staff else Vehicle.objects.filter(owner=request.user)
+        result = ingest_rows(self.model, self.ingest_serializer_class, rows, vehicles=vehicles)
+        code = status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=code)
+
+
+class RollupRefreshMixin:
+    # Rollups only fold readings in on insert; edits and deletes through the
+    # API rebuild the days they touch (see vehicles.rollups).
+    @transaction.atomic
+    def perform_update(self, serializer):
+        before = (serializer.instance.vehicle_id, serializer.instance.timestamp)
+        super().perform_update(serializer)
+        rollups.refresh_days([before, (serializer.instance.vehicle_id, serializer.instance.timestamp)])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        point = (instance.vehicle_id, instance.timestamp)
+        super().perform_destroy(instance)
+        rollups.refresh_days([point])
+
+
+class VehicleViewSet(CachedResponseMixin, BaseViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
     filterset_class = VehicleFilter
     model = Vehicle
+    cache_actions = ('dropdown',)
+    cache_per_user = True  # owners only see their own vehicles
+
+    # id/make/model/year for frontend filters
+    @action(detail=False, methods=['get'])
+    def dropdown(self, request):
+        vehicles = self.get_queryset().order_by('make', 'model', 'year', 'id').values('id', 'make', 'model', 'year')
+        return Response(list(vehicles))
 
     def get_queryset(self):
         if self.request.user.is_authenticated and not self.request.user.is_staff:
-            return Vehicle.objects.filter(owner=self.request.user)
+            return super().get_queryset().filter(owner=self.request.user)
         return super().get_queryset()
 
 class PartViewSet(BaseViewSet):
@@ -151,7 +237,7 @@ class SellerProfileViewSet(BaseViewSet):
 
     def get_queryset(self):
         if self.request.user.is_authenticated and not self.request.user.is_staff:
-            return SellerProfile.objects.filter(user=self.request.user)
+            return super().get_queryset().filter(user=self.request.user)
         return super().get_queryset()
 
 class BuyRequestViewSet(BaseViewSet):
@@ -172,11 +258,30 @@ class SellerFeedbackViewSet(BaseViewSet):
     filterset_class = SellerFeedbackFilter
     model = SellerFeedback
 
-class EVTelemetryViewSet(BaseViewSet):
+class EVTelemetryViewSet(RollupRefreshMixin, FastListMixin, BulkIngestMixin, BaseViewSet):
     queryset = EVTelemetry.objects.all()
     serializer_class = EVTelemetrySerializer
+    ingest_serializer_class = EVTelemetryIngestSerializer
     filterset_class = EVTelemetryFilter
     model = EVTelemetry
+    pagination_class = KeysetPagination
+    renderer_classes = SERIES_RENDERERS  # + ?format=columnar / msgpack
+    etag_append_only = True
+
+class TripViewSet(viewsets.ReadOnlyModelViewSet):
+    # Trips are derived from telemetry by the segment_trips command; read-only here.
+    queryset = Trip.objects.all()
+    serializer_class = TripSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TripFilter
+    pagination_class = StartedAtKeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(vehicle__owner=self.request.user)
+        return queryset
 
 class ADASCalibrationViewSet(BaseViewSet):
     queryset = ADASCalibration.objects.all()
@@ -184,7 +289,7 @@ class ADASCalibrationViewSet(BaseViewSet):
     filterset_class = ADASCalibrationFilter
     model = ADASCalibration
 
-class FuseBoxViewSet(BaseViewSet):
+class FuseBoxViewSet(CachedResponseMixin, BaseViewSet):
     queryset = FuseBox.objects.all()
     serializer_class = FuseBoxSerializer
     filterset_class = FuseBoxFilter
@@ -196,11 +301,15 @@ class WiringDiagramViewSet(BaseViewSet):
     filterset_class = WiringDiagramFilter
     model = WiringDiagram
 
-class SensorReadingViewSet(BaseViewSet):
+class SensorReadingViewSet(RollupRefreshMixin, FastListMixin, BulkIngestMixin, BaseViewSet):
     queryset = SensorReading.objects.all()
     serializer_class = SensorReadingSerializer
+    ingest_serializer_class = SensorReadingIngestSerializer
     filterset_class = SensorReadingFilter
     model = SensorReading
+    pagination_class = KeysetPagination
+    renderer_classes = SERIES_RENDERERS  # + ?format=columnar / msgpack
+    etag_append_only = True
 
 class OBDDiagnosticViewSet(BaseViewSet):
     queryset = OBDDiagnostic.objects.all()
@@ -208,19 +317,19 @@ class OBDDiagnosticViewSet(BaseViewSet):
     filterset_class = OBDDiagnosticFilter
     model = OBDDiagnostic
 
-class SensorViewSet(BaseViewSet):
+class SensorViewSet(CachedResponseMixin, BaseViewSet):
     queryset = Sensor.objects.all()
     serializer_class = SensorSerializer
     filterset_class = SensorFilter
     model = Sensor
 
-class AcronymViewSet(BaseViewSet):
+class AcronymViewSet(CachedResponseMixin, BaseViewSet):
     queryset = Acronym.objects.all()
     serializer_class = AcronymSerializer
     filterset_class = AcronymFilter
     model = Acronym
 
-class LegacyDiagnosticCodeViewSet(BaseViewSet):
+class LegacyDiagnosticCodeViewSet(CachedResponseMixin, BaseViewSet):
     queryset = LegacyDiagnosticCode.objects.all()
     serializer_class = LegacyDiagnosticCodeSerializer
     filterset_class = LegacyDiagnosticCodeFilter
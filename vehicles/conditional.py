@@ -0,0 +1,194 @@
+"""
+Conditional GET (ETag / If-None-Match) for API views.
+
+The ETag is derived from what the response is built from instead of from the
+rendered body: one aggregate over the filtered queryset giving MAX(pk),
+COUNT(*) and the newest `auto_now` timestamp (updated_at) of the rows and of
+every forward relation the serializer nests, so inserts, deletes and in-place
+edits all move it, plus the requesting user, the query string and the
+negotiated media type (responses vary on Accept). Append-only telemetry
+tables use MIN(pk)/MAX(pk) instead: no COUNT(*) scan, and no delete
+receivers that would stop Django from fast-deleting their rows on cascade.
+A matching If-None-Match is answered with 304 from initial(), before the
+handler runs, so an unchanged page costs the aggregate and no serialization.
+
+Writes that skip auto_now (QuerySet.update()) set updated_at themselves.
+With RESPONSE_CACHE_SHARED the response-cache generations of the models
+are part of the tag as well, which also covers append-only tables edited in
+place and models without an updated_at. They are left out otherwise: a
+per-process LocMemCache would give every worker its own tags, and a view
+whose models have no updated_at then sends no ETag rather than a stale one.
+
+MAX(updated_at) does not move when rows are deleted, so it is no honest
+Last-Modified and none is sent; clients revalidate with the ETag.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.utils.cache import parse_etags, patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .eager import eager_paths
+from .response_cache import generations, invalidate, track
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+def related_models(serializer_class):
+    """The serializer's model plus every model its nested fields read."""
+    model = serializer_class.Meta.model
+    found = [model]
+    select, prefetch = eager_paths(serializer_class)
+    for path in select + prefetch:
+        current = model
+        for part in path.split('__'):
+            current = current._meta.get_field(part).related_model
+            if current not in found:
+                found.append(current)
+    return tuple(found)
+
+def updated_field(model):
+    """Name of the model's auto_now timestamp, or None."""
+    return next((field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)), None)
+
+def marker_paths(model, serializer_class=None):
+    """(lookup prefix, model) for `model` and each forward relation the serializer nests; None for to-many."""
+    found = [('', model)]
+    if serializer_class is None or serializer_class.Meta.model is not model:
+        return found
+    select, prefetch = eager_paths(serializer_class)
+    if prefetch:
+        return None  # the join would multiply the row count
+    for path in select:
+        current, prefix = model, ''
+        for part in path.split('__'):
+            current = current._meta.get_field(part).related_model
+            prefix = f'{prefix}__{part}' if prefix else part
+            if (prefix, current) not in found:
+                found.append((prefix, current))
+    return found
+
+def _strip_weak(tag):
+    return tag[2:] if tag.startswith('W/') else tag
+
+class ConditionalGetMixin:
+    """
+    Add ETags to GET responses and answer If-None-Match with 304.
+
+    Generic views work out of the box. Plain APIViews override
+    get_etag_queryset() (and set `etag_models` if the response reads more
+    than that queryset's model, extending get_etag_markers() to cover it);
+    returning None disables the ETag.
+    Set `etag_append_only` on views over insert-mostly tables: inserts move
+    MAX(pk), pruning moves MIN(pk), and edits made through the API bump the
+    generation in perform_update/perform_destroy.
+    """
+    etag_models = None
+    etag_append_only = False
+    etag_actions = ('list', 'retrieve')
+
+    def get_etag_queryset(self):
+        if getattr(self, 'queryset', None) is None or not hasattr(self, 'filter_queryset'):
+            return None
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        if lookup in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup]})
+        return queryset
+
+    def get_etag_models(self, queryset):
+        if self.etag_models is not None:
+            return tuple(self.etag_models)
+        serializer_class = getattr(self, 'serializer_class', None)
+        if serializer_class is not None and serializer_class.Meta.model is queryset.model:
+            return related_models(serializer_class)
+        return (queryset.model,)
+
+    def get_etag_markers(self, queryset, models):
+        """
+        {alias: aggregate} whose values move when a row the response reads is
+        edited in place, or None when some model in `models` has no marker.
+        """
+        paths = marker_paths(queryset.model, getattr(self, 'serializer_class', None))
+        if paths is None or set(models) - {model for _, model in paths}:
+            return None
+        markers = {}
+        for i, (prefix, model) in enumerate(paths):
+            field = updated_field(model)
+            if field is None:
+                return None
+            markers[f'updated_{i}'] = Max(f'{prefix}__{field}' if prefix else field)
+        return markers
+
+    def get_etag(self, request):
+        queryset = self.get_etag_queryset()
+        if queryset is None:
+            return None
+        shared = settings.RESPONSE_CACHE_SHARED
+        models = self.get_etag_models(queryset)
+        if self.etag_append_only:
+            aggregates = {'first': Min('pk'), 'last': Max('pk')}
+        else:
+            markers = self.get_etag_markers(queryset, models)
+            if markers is None and not shared:
+                return None
+            aggregates = {'last': Max('pk'), 'count': Count('pk'), **(markers or {})}
+        state = queryset.order_by().aggregate(**aggregates)
+        gens = []
+        if shared:
+            track(*[model for model in models if not (self.etag_append_only and model is queryset.model)])
+            current = generations(models)
+            gens = [current[model] for model in models]
+        parts = [
+            type(self).__name__, getattr(self, 'action', None), request.path,
+            sorted(request.query_params.lists()), getattr(request, 'accepted_media_type', None), request.user.pk,
+            sorted(state.items()), gens,
+        ]
+        return 'W/"%s"' % hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+    def _wants_etag(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        action = getattr(self, 'action', None)
+        return action is None or action in self.etag_actions
+
+    def initial(self, request, *args, **kwargs):
+        self._etag = None
+        super().initial(request, *args, **kwargs)
+        if self._wants_etag(request):
+            self._etag = self.get_etag(request)
+            if self._etag is None:
+                return
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match:
+                tags = parse_etags(if_none_match)
+                if '*' in tags or _strip_weak(self._etag) in {_strip_weak(tag) for tag in tags}:
+                    raise NotModified()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        if self.etag_append_only:
+            invalidate(serializer.Meta.model)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        if self.etag_append_only:
+            invalidate(type(instance))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag and response.status_code in (200, 304) and not response.has_header('ETag'):
+            response['ETag'] = etag
+            # Browsers revalidate on every use; the tag is per user, so keep shared caches out.
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Accept'])  # JSON, columnar and msgpack share a URL
+        return response
@@ -0,0 +1,67 @@
+"""
+Largest-Triangle-Three-Buckets downsampling (Steinarsson, 2013).
+
+Keeps the first and last point and, for each of the `threshold - 2` buckets
+in between, the point forming the largest triangle with the previously kept
+point and the average of the next bucket. Unlike averaging, spikes survive.
+Bucket boundaries and next-bucket averages are computed up front with NumPy;
+the remaining loop is one vectorised argmax per output point.
+"""
+import numpy as np
+
+MIN_THRESHOLD = 3
+MAX_THRESHOLD = 10000
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points to keep, ascending. `x` must be sorted."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    threshold = max(threshold, MIN_THRESHOLD)
+
+    every = (n - 2) / (threshold - 2)
+    # edges[i]:edges[i + 1] is interior bucket i; edges[-1] == n - 1
+    edges = (np.floor(np.arange(threshold - 1) * every) + 1).astype(np.int64)
+    edges[-1] = n - 1
+
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    starts, ends = edges[1:-1], edges[2:]
+    counts = ends - starts
+    next_x = np.append((cx[ends] - cx[starts]) / counts, x[-1])
+    next_y = np.append((cy[ends] - cy[starts]) / counts, y[-1])
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def downsample(rows, threshold):
+    """
+    `rows` is a time-ordered list of (timestamp, value, ...) tuples, e.g.
+    from values_list(); returns at most `threshold` of them.
+    """
+    if len(rows) <= threshold:
+        return rows
+    x = np.fromiter((row[0].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    y = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    return [rows[i] for i in lttb_indices(x, y, threshold)]
+
+def parse_threshold(value):
+    """`?downsample=` -> int, or None when absent. ValueError when out of range."""
+    if value in (None, ''):
+        return None
+    threshold = int(value)
+    if not MIN_THRESHOLD <= threshold <= MAX_THRESHOLD:
+        raise ValueError(f"downsample must be between {MIN_THRESHOLD} and {MAX_THRESHOLD}")
+    return threshold
@@ -0,0 +1,127 @@
+"""
+Derive select_related / prefetch_related paths from a serializer's readable
+fields, so list endpoints load nested objects in a fixed number of queries.
+
+    nested serializer on a forward FK / one-to-one   -> select_related
+    nested serializer with many=True, reverse or m2m -> prefetch_related
+    StringRelatedField / SlugRelatedField            -> same rules
+    PrimaryKeyRelatedField on a forward FK           -> nothing (reads <name>_id)
+
+Anything under a prefetched relation is prefetched too, so the paths compose.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+def _relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+def _walk(serializer, model, prefix, under_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        current_model = model
+        path = prefix
+        many = under_prefetch
+        relation = None
+        for part in field.source.split('.'):
+            relation = _relation(current_model, part)
+            if relation is None:
+                break
+            path = f'{path}__{part}' if path else part
+            many = many or relation.many_to_many or relation.one_to_many
+            current_model = relation.related_model
+        if relation is None:
+            continue
+
+        if isinstance(field, ManyRelatedField):
+            child = field.child_relation
+            if isinstance(child, PrimaryKeyRelatedField):
+                prefetch.add(path)
+                continue
+            field, many = child, True
+
+        if isinstance(field, serializers.ListSerializer):
+            field, many = field.child, True
+
+        if isinstance(field, PrimaryKeyRelatedField):
+            continue
+        if isinstance(field, (RelatedField, serializers.BaseSerializer)):
+            (prefetch if many else select).add(path)
+        if isinstance(field, serializers.BaseSerializer):
+            _walk(field, current_model, path, many, select, prefetch)
+
+@lru_cache(maxsize=None)
+def eager_paths(serializer_class):
+    """(select_related paths, prefetch_related paths) for `serializer_class`."""
+    select, prefetch = set(), set()
+    _walk(serializer_class(), serializer_class.Meta.model, '', False, select, prefetch)
+    # select_related('a__b') already covers 'a'
+    select = {path for path in select if not any(other.startswith(f'{path}__') for other in select)}
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+def eager_load(queryset, serializer_class):
+    select, prefetch = eager_paths(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+def _all_columns(model, prefix):
+    return {f'{prefix}{field.name}' for field in model._meta.concrete_fields}
+
+def _columns(serializer, model, prefix, out):
+    """Add the only() paths `serializer` reads from `model` (rows joined at `prefix`)."""
+    names = {f'{prefix}{model._meta.pk.name}'}
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            out |= _all_columns(model, prefix)
+            return
+        relation = _relation(model, field.source)
+        if relation is None:
+            try:
+                names.add(f'{prefix}{model._meta.get_field(field.source).name}')
+            except FieldDoesNotExist:
+                # A property or method; it may read any column.
+                out |= _all_columns(model, prefix)
+                return
+            continue
+        if relation.many_to_many or relation.one_to_many or not relation.concrete:
+            continue  # prefetched separately
+        names.add(f'{prefix}{relation.name}')
+        path = f'{prefix}{relation.name}__'
+        if isinstance(field, serializers.BaseSerializer):
+            _columns(field, relation.related_model, path, out)
+        elif isinstance(field, RelatedField) and not isinstance(field, PrimaryKeyRelatedField):
+            out |= _all_columns(relation.related_model, path)  # str()/slug of the related row
+    out |= names
+
+def load_for_serializer(queryset, serializer, extra_columns=()):
+    """
+    eager_load() for one serializer instance (after ?fields=/?expand= are
+    applied), restricted with only() to the columns it renders plus
+    `extra_columns` (e.g. the paginator's ordering field).
+    """
+    select, prefetch = set(), set()
+    _walk(serializer, serializer.Meta.model, '', False, select, prefetch)
+    select = {path for path in select if not any(other.startswith(f'{path}__') for other in select)}
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*sorted(prefetch))
+
+    columns = set()
+    _columns(serializer, serializer.Meta.model, '', columns)
+    if columns != _all_columns(serializer.Meta.model, '') or select:
+        queryset = queryset.only(*sorted(columns | set(extra_columns)))
+    return queryset
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.utils import timezone
+
+from .models import VinMetadataCache
+from .response_cache import bump
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_METADATA = {
+    "engine": None,
+    "transmission": None,
+    "country_of_origin": None,
+}
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `failure_threshold` consecutive
+    failures the breaker opens and calls are refused for `reset_timeout`
+    seconds; then a single probe call is let through (half-open) and its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.probing = False
+
+_session = None
+_breaker = None
+_init_lock = threading.Lock()
+
+def get_session():
+    global _session
+    with _init_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.VIN_METADATA_CONCURRENCY)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['Accept'] = 'application/json'
+            _session = session
+        return _session
+
+def get_breaker():
+    global _breaker
+    with _init_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(settings.VIN_METADATA_BREAKER_THRESHOLD, settings.VIN_METADATA_BREAKER_RESET)
+        return _breaker
+
+def _fetch(vin):
+    """Returns ('ok', payload), ('negative', None) or ('error', None). No DB access: runs in worker threads."""
+    breaker = get_breaker()
+    if not breaker.allow():
+        return 'error', None
+
+    url = settings.VIN_METADATA_URL.format(vin=vin)
+    try:
+        response = get_session().get(url, timeout=settings.VIN_METADATA_TIMEOUT)
+        payload = response.json() if response.status_code == 200 else None
+    except requests.RequestException as e:
+        logger.error(f"Metadata fetch error for VIN {vin}: {e}")
+        breaker.record_failure()
+        return 'error', None
+
+    if response.status_code == 200:
+        breaker.record_success()
+        return 'ok', payload
+    if response.status_code == 404:
+        breaker.record_success()
+        return 'negative', None
+
+    logger.warning(f"Metadata fetch failed for VIN {vin}: {response.status_code}")
+    if response.status_code >= 500:
+        breaker.record_failure()
+    return 'error', None
+
+def enrich_vins(vins):
+    """
+    Return {vin: metadata} for `vins`, reading the VIN cache table first and
+    fetching only expired or unknown VINs, concurrently and through the
+    circuit breaker. Upstream errors fall back to the last cached payload
+    (even if expired) or FALLBACK_METADATA, and are not cached.
+    """
+    vins = list(dict.fromkeys(vins))
+    now = timezone.now()
+    cached = {entry.vin: entry for entry in VinMetadataCache.objects.filter(vin__in=vins)}
+
+    result = {}
+    misses = []
+    for vin in vins:
+        entry = cached.get(vin)
+        if entry and entry.expires_at > now:
+            result[vin] = FALLBACK_METADATA if entry.is_negative else entry.payload
+        else:
+            misses.append(vin)
+
+    if not misses:
+        return result
+
+    if get_breaker().state == 'open':
+        outcomes = [('error', None)] * len(misses)
+    else:
+        workers = min(settings.VIN_METADATA_CONCURRENCY, len(misses))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(_fetch, misses))
+
+    fresh = []
+    for vin, (outcome, payload) in zip(misses, outcomes):
+        if outcome == 'ok':
+            ttl = settings.VIN_METADATA_TTL
+        elif outcome == 'negative':
+            ttl = settings.VIN_METADATA_NEGATIVE_TTL
+        else:
+            stale = cached.get(vin)
+            result[vin] = stale.payload if stale and not stale.is_negative else FALLBACK_METADATA
+            continue
+
+        result[vin] = payload if outcome == 'ok' else FALLBACK_METADATA
+        fresh.append(VinMetadataCache(
+            vin=vin,
+            payload=payload or {},
+            is_negative=outcome == 'negative',
+            fetched_at=now,
+            expires_at=now + timedelta(seconds=ttl),
+        ))
+
+    if fresh:
+        VinMetadataCache.objects.bulk_create(
+            fresh,
+            update_conflicts=True,
+            unique_fields=['vin'],
+            update_fields=['payload', 'is_negative', 'fetched_at', 'expires_at'],
+        )
+        bump(VinMetadataCache)  # bulk_create sends no post_save
+    return result
@@ -1,15 +1,107 @@
 import csv
-from django.http import HttpResponse
+import zlib
+from django.http import StreamingHttpResponse
+from reportlab.pdfgen import canvas
 
-def export_queryset_to_csv(queryset, fields, filename='export.csv'):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+from .models import Vehicle, SensorReading
+
+EXPORT_CHUNK_SIZE = 2000
+
+class Echo:
+    """File-like object whose write() hands the formatted line back to csv.writer."""
+    def write(self, value):
+        return value
+
+def wants_gzip(request):
+    return request.GET.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+def iter_csv(queryset, fields, header=None, formatters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the CSV for `queryset` in text chunks of up to `chunk_size` rows.
+
+    Rows are read with values_list().iterator() so no model instances are
+    built and the result set is never held in memory as a whole.
+    """
+    writer = csv.writer(Echo())
+    formatters = formatters or {}
+    format_at = [(fields.index(name), fn) for name, fn in formatters.items()]
 
-    writer = csv.writer(response)
-    writer.writerow(fields)
+    yield writer.writerow(header or fields)
 
-    for obj in queryset:
-        row = [getattr(obj, field) for field in fields]
-        writer.writerow(row)
+    buffer = []
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        if format_at:
+            row = list(row)
+            for index, fn in format_at:
+                if row[index] is not None:
+                    row[index] = fn(row[index])
+        buffer.append(writer.writerow(row))
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
 
+def gzip_chunks(chunks, encoding='utf-8'):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode(encoding))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_queryset_to_csv(queryset, fields, filename='export.csv', header=None, formatters=None, request=None):
+    # ?gzip=1 downloads a .csv.gz (application/gzip, no Content-Encoding).
+    chunks = iter_csv(queryset, fields, header=header, formatters=formatters)
+    if request is not None and wants_gzip(request):
+        # The body is the gzip file itself; keep GZipMiddleware from
+        # compressing it a second time for Accept-Encoding: gzip clients.
+        request.META.pop('HTTP_ACCEPT_ENCODING', None)
+        response = StreamingHttpResponse(gzip_chunks(chunks), content_type='application/gzip')
+        filename = f'{filename}.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
+
+# --- PDF reports ---
+# `target` is a filename or a binary file-like object, as accepted by
+# reportlab's Canvas.
+def _draw_lines(p, lines, top=780):
+    y = top
+    for line in lines:
+        p.drawString(100, y, line)
+        y -= 20
+        if y < 50:
+            p.showPage()
+            p.setFont("Helvetica", 12)
+            y = 800
+
+def write_vehicle_pdf(target):
+    p = canvas.Canvas(target)
+    p.setFont("Helvetica", 12)
+    p.drawString(100, 800, "Vehicle Export")
+    rows = Vehicle.objects.values_list('make', 'model', 'year', 'vin').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    _draw_lines(p, (f"{make} {model} ({year}) - VIN: {vin}" for make, model, year, vin in rows))
+    p.save()
+
+def write_sensor_pdf(target):
+    p = canvas.Canvas(target)
+    p.setTitle("Sensor Report")
+    p.setFont("Helvetica", 12)
+    p.drawString(100, 800, "Sensor Report")
+    rows = SensorReading.objects.values_list('timestamp', 'sensor_type', 'value').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    _draw_lines(p, (f"{ts.strftime('%Y-%m-%d %H:%M:%S')} - {sensor}: {value}" for ts, sensor, value in rows))
+    p.showPage()
+    p.save()
+
+def write_diagnostics_pdf(target, user, generated_at):
+    p = canvas.Canvas(target)
+    p.setTitle("Diagnostics Report")
+    p.setFont("Helvetica", 12)
+    p.drawString(100, 750, f"Hello {user.username}, your diagnostics report is ready.")
+    p.drawString(100, 730, f"Role: {user.role}")
+    p.drawString(100, 710, "This PDF was generated dynamically using ReportLab.")
+    p.drawString(100, 690, f"Generated on: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    p.showPage()
+    p.save()
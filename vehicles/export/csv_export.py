@@ -1,14 +1,11 @@
-import csv
-from django.http import HttpResponse
+from vehicles.export import export_queryset_to_csv
 from vehicles.models import Vehicle
 
 def export_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="vehicles.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Make', 'Model', 'Year', 'VIN'])
-
-    for v in Vehicle.objects.all():
-        writer.writerow([v.make, v.model, v.year, v.vin])
-
-    return response
+    return export_queryset_to_csv(
+        Vehicle.objects.all(),
+        ['make', 'model', 'year', 'vin'],
+        filename='vehicles.csv',
+        header=['Make', 'Model', 'Year', 'VIN'],
+        request=request,
+    )
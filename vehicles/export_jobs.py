@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .export import iter_csv, write_vehicle_pdf, write_sensor_pdf, write_diagnostics_pdf
+from .models import ExportJob, Vehicle, SensorReading, OBDDiagnostic
+
+logger = logging.getLogger(__name__)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+READ_BLOCK_SIZE = 64 * 1024
+HEARTBEAT_INTERVAL = 30  # seconds between liveness updates while a job renders
+
+# --- Renderers: write the artifact for a job to `path` ---
+def _write_csv(path, queryset, fields, header=None, formatters=None):
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        for chunk in iter_csv(queryset, fields, header=header, formatters=formatters):
+            fh.write(chunk)
+
+def render_vehicles_csv(path, job):
+    _write_csv(path, Vehicle.objects.all(), ['make', 'model', 'year', 'vin'], header=['Make', 'Model', 'Year', 'VIN'])
+
+def render_vehicles_pdf(path, job):
+    write_vehicle_pdf(path)
+
+def render_sensor_csv(path, job):
+    _write_csv(
+        path, SensorReading.objects.all(), ['timestamp', 'sensor_type', 'value'],
+        header=['Timestamp', 'Sensor', 'Value'], formatters={'timestamp': lambda ts: ts.isoformat()},
+    )
+
+def render_sensor_pdf(path, job):
+    write_sensor_pdf(path)
+
+def render_obd_csv(path, job):
+    _write_csv(path, OBDDiagnostic.objects.all(), ['dtc_code', 'description', 'severity'])
+
+def render_diagnostics_pdf(path, job):
+    write_diagnostics_pdf(path, job.requested_by, timezone.localtime(job.created_at))
+
+# kind -> (extension, content type, renderer)
+EXPORT_KINDS = {
+    'vehicles_csv': ('csv', 'text/csv', render_vehicles_csv),
+    'vehicles_pdf': ('pdf', 'application/pdf', render_vehicles_pdf),
+    'sensor_csv': ('csv', 'text/csv', render_sensor_csv),
+    'sensor_pdf': ('pdf', 'application/pdf', render_sensor_pdf),
+    'obd_csv': ('csv', 'text/csv', render_obd_csv),
+    'diagnostics_pdf': ('pdf', 'application/pdf', render_diagnostics_pdf),
+}
+
+# Kinds whose content depends on who asked; their artifacts are never shared.
+PER_USER_KINDS = {'diagnostics_pdf'}
+
+def export_fingerprint(kind, user):
+    key = {'kind': kind}
+    if kind in PER_USER_KINDS:
+        key['user'] = user.pk
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def find_cached_artifact(fingerprint):
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TTL)
+    job = (
+        ExportJob.objects
+        .filter(fingerprint=fingerprint, status='done', finished_at__gte=cutoff)
+        .order_by('-finished_at')
+        .first()
+    )
+    if job and job.file and default_storage.exists(job.file.name):
+        return job
+    return None
+
+def request_export(user, kind):
+    """
+    Queue an export for `user` and return (job, reused).
+
+    A finished artifact with the same fingerprint younger than
+    EXPORT_JOB_TTL is reused without rendering; an identical job the user
+    already has in flight is returned as-is.
+    """
+    fingerprint = export_fingerprint(kind, user)
+
+    cached = find_cached_artifact(fingerprint)
+    if cached:
+        job = ExportJob.objects.create(
+            requested_by=user, kind=kind, fingerprint=fingerprint,
+            status='done', file=cached.file.name, size=cached.size,
+            started_at=timezone.now(), finished_at=cached.finished_at,
+        )
+        return job, True
+
+    in_flight = ExportJob.objects.filter(
+        fingerprint=fingerprint, requested_by=user, status__in=['pending', 'running']
+    ).first()
+    if in_flight:
+        return in_flight, True
+
+    job = ExportJob.objects.create(requested_by=user, kind=kind, fingerprint=fingerprint)
+    return job, False
+
+def claim_next_job():
+    # The conditional UPDATE is the lock: only one worker can move a given
+    # row out of 'pending', so no SELECT ... FOR UPDATE is needed (SQLite).
+    while True:
+        job_id = ExportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = ExportJob.objects.filter(pk=job_id, status='pending').update(status='running', started_at=now, heartbeat_at=now)
+        if claimed:
+            return ExportJob.objects.select_related('requested_by').get(pk=job_id)
+
+def requeue_stale_jobs(older_than):
+    # A job is only abandoned once its worker stops beating; a slow render
+    # that is still alive keeps heartbeat_at fresh and is left alone.
+    cutoff = timezone.now() - older_than
+    return (
+        ExportJob.objects
+        .filter(status='running', heartbeat_at__lt=cutoff)
+        .update(status='pending', started_at=None, heartbeat_at=None)
+    )
+
+def _beat(job_id, stop):
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            ExportJob.objects.filter(pk=job_id, status='running').update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+def purge_expired_artifacts(older_than=None):
+    """
+    Delete export files that finished more than EXPORT_ARTIFACT_RETENTION
+    seconds ago and mark their jobs 'expired'. Jobs reusing an artifact
+    share its finished_at, so they all expire together.
+    """
+    if older_than is None:
+        older_than = timedelta(seconds=settings.EXPORT_ARTIFACT_RETENTION)
+    cutoff = timezone.now() - older_than
+    expired = ExportJob.objects.filter(status='done', finished_at__lt=cutoff).exclude(file='')
+    names = set(expired.values_list('file', flat=True))
+    for name in names:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+    expired.update(status='expired', file='')
+    return len(names)
+
+def run_job(job):
+    cached = find_cached_artifact(job.fingerprint)
+    if cached:
+        job.file.name = cached.file.name
+        job.size = cached.size
+        job.status = 'done'
+        job.finished_at = cached.finished_at
+        job.save(update_fields=['file', 'size', 'status', 'finished_at'])
+        return job
+
+    extension, _, renderer = EXPORT_KINDS[job.kind]
+    name = f"exports/{job.kind}_{job.pk}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    path = default_storage.path(name)
+    tmp_path = f'{path}.part'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_beat, args=(job.pk, stop), daemon=True)
+    heartbeat.start()
+    try:
+        renderer(tmp_path, job)
+        os.replace(tmp_path, path)
+    except Exception as exc:
+        logger.exception("Export job %s failed", job.pk)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job.status = 'failed'
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    job.file.name = name
+    job.size = os.path.getsize(path)
+    job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'size', 'status', 'finished_at'])
+    return job
+
+# --- Downloads ---
+def _read_range(fh, length):
+    try:
+        while length > 0:
+            block = fh.read(min(READ_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        fh.close()
+
+def ranged_file_response(request, path, filename, content_type, etag=None):
+    """
+    Serve `path` as an attachment, honouring a single-range `Range` header
+    (206 / 416) so interrupted downloads can resume. Multi-range requests
+    and stale `If-Range` validators get the full file.
+    """
+    # Byte ranges, Content-Length and the strong ETag all describe the file as
+    # stored; GZipMiddleware re-encoding the body (and weakening the ETag)
+    # would break resumption, so keep it away from these responses.
+    request.META.pop('HTTP_ACCEPT_ENCODING', None)
+    size = os.path.getsize(path)
+    match = RANGE_RE.match(request.headers.get('Range', '').strip())
+    # If-Range uses the strong comparison (RFC 7233 3.2): a weak validator
+    # never matches, so the client gets the whole file again.
+    if_range = request.headers.get('If-Range', '').strip()
+    if if_range and etag and if_range != etag:
+        match = None
+
+    if not match or not any(match.groups()):
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+    else:
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        fh = open(path, 'rb')
+        fh.seek(start)
+        response = StreamingHttpResponse(_read_range(fh, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+    return response
@@ -0,0 +1,152 @@
+"""
+Read-only fast path for large list endpoints.
+
+ListPlan compiles a serializer's readable fields (after ?fields=/?expand=)
+into a values() projection and a spec that turns each row dict straight into
+the output dict: no model instances, no per-row attribute lookups through
+field objects. Leaf values still go through the field's own
+to_representation (or the builtin it reduces to; ISO datetimes repeat its
+steps with the format and timezone looked up once), so the JSON rendered by
+FastJSONRenderer is byte-for-byte what the serializer would produce.
+
+Supported: model columns, PrimaryKeyRelatedField and nested serializers on
+forward foreign keys, and StringRelatedField (one in_bulk() per page). A
+serializer with anything else (method fields, properties, files, to-many
+relations) compiles to None and the view serves the normal path.
+
+Views opt in with FastListMixin; FAST_LIST_ENABLED turns it off globally.
+`manage.py benchmark_serialization` compares both paths.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, fields, serializers
+from rest_framework.relations import PrimaryKeyRelatedField, StringRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .renderers import DEFAULT_RENDERERS
+
+# to_representation() of these reduces to the builtin for database values.
+_BUILTINS = {fields.IntegerField: int, fields.FloatField: float, fields.CharField: str, fields.BooleanField: bool}
+# These are safe to call on a values() value directly.
+_REPRESENTABLE = (
+    fields.IntegerField, fields.FloatField, fields.CharField, fields.BooleanField, fields.DecimalField,
+    fields.DateTimeField, fields.DateField, fields.TimeField, fields.DurationField, fields.ChoiceField,
+    fields.UUIDField, fields.JSONField, fields.ReadOnlyField,
+)
+
+VALUE, PK, STR, NESTED = range(4)
+
+def _datetime_converter(field):
+    """DateTimeField.to_representation with its format and timezone looked up once."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+def _converter(field):
+    if type(field) is fields.DateTimeField:
+        return _datetime_converter(field)
+    return _BUILTINS.get(type(field), field.to_representation)
+
+class Unsupported(Exception):
+    pass
+
+def _compile(serializer, model, prefix, columns, lookups):
+    specs = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            raise Unsupported(name)
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise Unsupported(name)
+        key = f'{prefix}{model_field.name}'
+        columns.append(key)
+
+        if not model_field.is_relation:
+            if isinstance(field, (serializers.BaseSerializer, serializers.RelatedField)) or not isinstance(field, _REPRESENTABLE):
+                raise Unsupported(name)
+            specs.append((VALUE, name, key, _converter(field)))
+            continue
+
+        if not model_field.concrete or not (model_field.many_to_one or model_field.one_to_one):
+            raise Unsupported(name)
+        if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+            specs.append((PK, name, key, None))
+        elif isinstance(field, StringRelatedField):
+            lookups[key] = model_field.related_model
+            specs.append((STR, name, key, None))
+        elif isinstance(field, serializers.Serializer):
+            specs.append((NESTED, name, key, _compile(field, model_field.related_model, f'{key}__', columns, lookups)))
+        else:
+            raise Unsupported(name)
+    return specs
+
+def _to_dict(specs, row, related):
+    out = {}
+    for kind, name, key, extra in specs:
+        value = row[key]
+        if value is None:
+            out[name] = None
+        elif kind == VALUE:
+            out[name] = extra(value)
+        elif kind == PK:
+            out[name] = value
+        elif kind == STR:
+            out[name] = str(related[key][value])
+        else:
+            out[name] = _to_dict(extra, row, related)
+    return out
+
+class ListPlan:
+    def __init__(self, specs, columns, lookups):
+        self.specs = specs
+        self.columns = columns
+        self.lookups = lookups
+
+    @classmethod
+    def compile(cls, serializer):
+        """A plan for `serializer`, or None when a field needs the normal path."""
+        columns, lookups = [], {}
+        try:
+            specs = _compile(serializer, serializer.Meta.model, '', columns, lookups)
+        except Unsupported:
+            return None
+        return cls(specs, columns, lookups)
+
+    def values(self, queryset, extra_columns=()):
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.columns, *extra_columns]))
+
+    def to_data(self, rows):
+        related = {
+            key: model._base_manager.in_bulk({row[key] for row in rows} - {None})
+            for key, model in self.lookups.items()
+        }
+        return [_to_dict(self.specs, row, related) for row in rows]
+
+class FastListMixin:
+    """Serve list() through a ListPlan whenever the request's serializer compiles to one."""
+    renderer_classes = DEFAULT_RENDERERS
+
+    def list(self, request, *args, **kwargs):
+        plan = ListPlan.compile(self.get_serializer()) if settings.FAST_LIST_ENABLED else None
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        # Keyset pagination reads its position off the row dicts.
+        ordering = getattr(self.paginator, 'ordering_field', None)
+        queryset = plan.values(self.filter_queryset(self.get_queryset()), ['id', ordering] if ordering else ())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.to_data(page))
+        return Response(plan.to_data(list(queryset)))
@@ -0,0 +1,78 @@
+"""
+Sparse fieldsets and shallow expansion for API serializers.
+
+    ?fields=id,vehicle,battery_level     only these fields
+    ?expand=vehicle                      nested vehicle object instead of its id
+    ?expand=vehicle.owner                ... and the owner inside it
+    ?fields=id,vehicle.make&expand=vehicle   dotted names narrow expanded objects
+
+Nested serializers render as primary keys unless expanded, so a reading no
+longer drags its vehicle and the vehicle's owner along by default. Only
+declared nested serializers can be expanded. `fields` applies to safe
+(read) requests; writable fields are never dropped from writes. Serializers
+used without a request in their context (exports, internal callers) keep
+their full nesting.
+
+SparseQuerysetMixin turns the resulting field set into select_related /
+prefetch_related paths and an only() column list for the view's queryset.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from .eager import eager_load, load_for_serializer
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+def requested_fieldset(request):
+    """(fields or None for all, expand paths) from the query string."""
+    params = request.query_params
+    fields = _split(params.get('fields')) if request.method in SAFE_METHODS and params.get('fields') else None
+    return fields, _split(params.get('expand'))
+
+def _below(paths, name):
+    if paths is None:
+        return None
+    prefix = f'{name}.'
+    return {path[len(prefix):] for path in paths if path.startswith(prefix)}
+
+class SparseFieldsMixin:
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None:
+            return fields
+
+        fieldset = getattr(self, '_fieldset', None)
+        only, expand = fieldset if fieldset is not None else requested_fieldset(request)
+        if only is not None:
+            keep = {path.split('.', 1)[0] for path in only}
+            fields = {name: field for name, field in fields.items() if name in keep or field.write_only}
+        expanded = {path.split('.', 1)[0] for path in expand}
+
+        for name, field in list(fields.items()):
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer) or field.write_only:
+                continue
+            if name in expanded:
+                below = _below(only, name)
+                nested._fieldset = (below or None, _below(expand, name))
+            else:
+                kwargs = {'source': field.source} if field.source else {}
+                fields[name] = PrimaryKeyRelatedField(read_only=True, many=many, **kwargs)
+        return fields
+
+class SparseModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    pass
+
+class SparseQuerysetMixin:
+    """Load only the relations and columns the request's fieldset renders."""
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return eager_load(queryset, self.get_serializer_class())
+        # Keyset pagination reads its ordering column off every row.
+        ordering = getattr(self.paginator, 'ordering_field', None)
+        return load_for_serializer(queryset, self.get_serializer(), [ordering] if ordering else ())
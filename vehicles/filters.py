@@ -1,5 +1,10 @@
 import django_filters
-from .models import FuseBox, Vehicle
+from .models import (
+    FuseBox, Vehicle, Part, Listing, SellerProfile, BuyRequest, AuctionBid, SellerFeedback,
+    EVTelemetry, ADASCalibration, WiringDiagram, SensorReading, OBDDiagnostic,
+    Sensor, Acronym, LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback,
+    Trip
+)
 
 class FuseBoxFilter(django_filters.FilterSet):
     make = django_filters.CharFilter(lookup_expr='icontains')
@@ -18,3 +23,130 @@ class VehicleFilter(django_filters.FilterSet):
     class Meta:
         model = Vehicle
         fields = ['make', 'model', 'year']
+
+class PartFilter(django_filters.FilterSet):
+    name = django_filters.CharFilter(lookup_expr='icontains')
+    vehicle_make = django_filters.CharFilter(lookup_expr='icontains')
+    vehicle_model = django_filters.CharFilter(lookup_expr='icontains')
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+
+    class Meta:
+        model = Part
+        fields = ['name', 'vehicle_make', 'vehicle_model', 'vehicle_year']
+
+class ListingFilter(django_filters.FilterSet):
+    title = django_filters.CharFilter(lookup_expr='icontains')
+    location = django_filters.CharFilter(lookup_expr='icontains')
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+
+    class Meta:
+        model = Listing
+        fields = ['title', 'location', 'region', 'currency', 'is_active']
+
+class SellerProfileFilter(django_filters.FilterSet):
+    company_name = django_filters.CharFilter(lookup_expr='icontains')
+    min_rating = django_filters.NumberFilter(field_name='rating', lookup_expr='gte')
+
+    class Meta:
+        model = SellerProfile
+        fields = ['company_name']
+
+class BuyRequestFilter(django_filters.FilterSet):
+    class Meta:
+        model = BuyRequest
+        fields = ['listing', 'buyer', 'is_approved']
+
+class AuctionBidFilter(django_filters.FilterSet):
+    class Meta:
+        model = AuctionBid
+        fields = ['listing', 'bidder']
+
+class SellerFeedbackFilter(django_filters.FilterSet):
+    class Meta:
+        model = SellerFeedback
+        fields = ['seller', 'reviewer', 'rating']
+
+class EVTelemetryFilter(django_filters.FilterSet):
+    since = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='lt')
+
+    class Meta:
+        model = EVTelemetry
+        fields = ['vehicle']
+
+class TripFilter(django_filters.FilterSet):
+    since = django_filters.IsoDateTimeFilter(field_name='started_at', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='started_at', lookup_expr='lt')
+    min_distance_km = django_filters.NumberFilter(field_name='distance_km', lookup_expr='gte')
+
+    class Meta:
+        model = Trip
+        fields = ['vehicle', 'is_open']
+
+class ADASCalibrationFilter(django_filters.FilterSet):
+    class Meta:
+        model = ADASCalibration
+        fields = ['vehicle', 'sensor_type', 'is_compliant']
+
+class WiringDiagramFilter(django_filters.FilterSet):
+    title = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = WiringDiagram
+        fields = ['vehicle', 'system', 'title']
+
+class SensorReadingFilter(django_filters.FilterSet):
+    since = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='lt')
+
+    class Meta:
+        model = SensorReading
+        fields = ['vehicle', 'sensor_type']
+
+class OBDDiagnosticFilter(django_filters.FilterSet):
+    class Meta:
+        model = OBDDiagnostic
+        fields = ['vehicle', 'dtc_code', 'severity']
+
+class SensorFilter(django_filters.FilterSet):
+    name = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = Sensor
+        fields = ['name', 'type']
+
+class AcronymFilter(django_filters.FilterSet):
+    short_form = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = Acronym
+        fields = ['short_form']
+
+class LegacyDiagnosticCodeFilter(django_filters.FilterSet):
+    code = django_filters.CharFilter(lookup_expr='istartswith')
+
+    class Meta:
+        model = LegacyDiagnosticCode
+        fields = ['code']
+
+class LegacyGuestBlogFilter(django_filters.FilterSet):
+    title = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = LegacyGuestBlog
+        fields = ['title', 'author']
+
+class LegacyCarListingFilter(django_filters.FilterSet):
+    title = django_filters.CharFilter(lookup_expr='icontains')
+    location = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = LegacyCarListing
+        fields = ['seller', 'title', 'location']
+
+class LegacySellerFeedbackFilter(django_filters.FilterSet):
+    class Meta:
+        model = LegacySellerFeedback
+        fields = ['seller', 'reviewer', 'rating']
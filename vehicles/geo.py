@@ -0,0 +1,171 @@
+"""
+Geohash cells and distance maths for EVTelemetry locations, no GIS needed.
+
+A geohash interleaves longitude and latitude bits, so every point inside a
+cell shares the cell's prefix. A region query is answered in two steps:
+
+1. prune: cover the region's bounding box with at most MAX_COVER_CELLS cells
+   and turn each into a `geohash >= prefix AND geohash < prefix || '~'` range,
+   which any B-tree index (SQLite included) can scan;
+2. refine: compute exact haversine distances for the candidates with NumPy.
+"""
+import math
+
+import numpy as np
+from django.db.models import Q
+
+GEOHASH_PRECISION = 9  # ~4.8 m x 4.8 m cells
+MAX_COVER_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_BASE32_ARRAY = np.array(list(_BASE32))
+
+def _bits(precision):
+    total = 5 * precision
+    return (total + 1) // 2, total // 2  # (longitude bits, latitude bits)
+
+def cell_size(precision):
+    """(lat degrees, lon degrees) spanned by one cell at `precision`."""
+    lon_bits, lat_bits = _bits(precision)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def encode_many(lats, lons, precision=GEOHASH_PRECISION):
+    """Vectorised geohash encoding; returns a list of strings."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if lats.size == 0:
+        return []
+    lon_bits, lat_bits = _bits(precision)
+    lat_q = np.clip(((lats + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+    lon_q = np.clip(((lons + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+
+    # Bits alternate lon, lat, lon, ... most significant first.
+    codes = np.zeros(lats.shape, dtype=np.int64)
+    lon_i, lat_i = lon_bits, lat_bits
+    for position in range(5 * precision):
+        if position % 2 == 0:
+            lon_i -= 1
+            bit = (lon_q >> lon_i) & 1
+        else:
+            lat_i -= 1
+            bit = (lat_q >> lat_i) & 1
+        codes = (codes << 1) | bit
+
+    shifts = np.arange(precision - 1, -1, -1) * 5
+    digits = (codes[:, None] >> shifts) & 31
+    return [''.join(row) for row in _BASE32_ARRAY[digits]]
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    return encode_many([lat], [lon], precision)[0]
+
+def haversine_km(lat, lon, lats, lons):
+    """Distances in km from (lat, lon) to each of `lats`/`lons`."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def split_bbox(west, south, east, north):
+    """One or two non-wrapping boxes; west > east means the box crosses 180°."""
+    if west <= east:
+        return [(west, south, east, north)]
+    return [(west, south, 180.0, north), (-180.0, south, east, north)]
+
+def radius_bbox(lat, lon, radius_km):
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if cos_lat < 1e-6 or radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180.0:
+        return -180.0, south, 180.0, north
+    dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    west = (lon - dlon + 180.0) % 360.0 - 180.0
+    east = (lon + dlon + 180.0) % 360.0 - 180.0
+    return west, south, east, north
+
+def covering_prefixes(west, south, east, north, max_cells=MAX_COVER_CELLS):
+    """The finest set of at most `max_cells` geohash prefixes covering the box."""
+    prefixes = set()
+    for box_west, box_south, box_east, box_north in split_bbox(west, south, east, north):
+        for precision in range(GEOHASH_PRECISION, 0, -1):
+            lat_step, lon_step = cell_size(precision)
+            lat_cells = np.arange(math.floor((box_south + 90.0) / lat_step), math.floor((box_north + 90.0) / lat_step) + 1)
+            lon_cells = np.arange(math.floor((box_west + 180.0) / lon_step), math.floor((box_east + 180.0) / lon_step) + 1)
+            if len(lat_cells) * len(lon_cells) <= max_cells:
+                lat_centres = np.minimum((lat_cells + 0.5) * lat_step - 90.0, 90.0)
+                lon_centres = np.minimum((lon_cells + 0.5) * lon_step - 180.0, 180.0)
+                grid_lat, grid_lon = np.meshgrid(lat_centres, lon_centres)
+                prefixes.update(encode_many(grid_lat.ravel(), grid_lon.ravel(), precision))
+                break
+        else:
+            return ['']
+    return sorted(prefixes)
+
+def prefix_filter(prefixes, field='geohash'):
+    """Q object matching any of `prefixes` with index-friendly range lookups."""
+    if prefixes == ['']:
+        return Q()
+    condition = Q()
+    for prefix in prefixes:
+        condition |= Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + '~'})
+    return condition
+
+# --- Queries over any queryset with location_lat / location_lon / geohash ---
+CANDIDATE_FIELDS = ('id', 'vehicle_id', 'location_lat', 'location_lon', 'timestamp')
+MAX_SEARCH_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+def _bbox_condition(west, south, east, north):
+    condition = Q()
+    for box_west, box_south, box_east, box_north in split_bbox(west, south, east, north):
+        condition |= Q(
+            location_lat__gte=box_south, location_lat__lte=box_north,
+            location_lon__gte=box_west, location_lon__lte=box_east,
+        )
+    return condition
+
+def within_bbox(queryset, west, south, east, north):
+    return queryset.filter(prefix_filter(covering_prefixes(west, south, east, north))).filter(
+        _bbox_condition(west, south, east, north)
+    )
+
+def _rows(queryset):
+    return [dict(zip(CANDIDATE_FIELDS, row)) for row in queryset.values_list(*CANDIDATE_FIELDS)]
+
+def within_radius(queryset, lat, lon, radius_km):
+    """Candidate rows within `radius_km` of (lat, lon), closest first, with `distance_km`."""
+    rows = _rows(within_bbox(queryset, *radius_bbox(lat, lon, radius_km)))
+    if not rows:
+        return []
+    distances = haversine_km(lat, lon, [r['location_lat'] for r in rows], [r['location_lon'] for r in rows])
+    order = np.argsort(distances, kind='stable')
+    result = []
+    for i in order:
+        if distances[i] > radius_km:
+            break
+        rows[i]['distance_km'] = float(distances[i])
+        result.append(rows[i])
+    return result
+
+def closest_per_vehicle(rows):
+    seen = set()
+    result = []
+    for row in rows:
+        if row['vehicle_id'] not in seen:
+            seen.add(row['vehicle_id'])
+            result.append(row)
+    return result
+
+def nearest_vehicles(queryset, lat, lon, k, start_radius_km=1.0):
+    """The `k` vehicles with a reading closest to (lat, lon), widening the search until found."""
+    radius = start_radius_km
+    while True:
+        vehicles = closest_per_vehicle(within_radius(queryset, lat, lon, radius))
+        if len(vehicles) >= k or radius >= MAX_SEARCH_RADIUS_KM:
+            return vehicles[:k]
+        radius = min(radius * 4, MAX_SEARCH_RADIUS_KM)
+
+def latest_per_vehicle_in_bbox(queryset, west, south, east, north):
+    rows = _rows(within_bbox(queryset, west, south, east, north).order_by('-timestamp', '-id'))
+    return closest_per_vehicle(rows)
@@ -0,0 +1,58 @@
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import Vehicle
+from .signals import telemetry_ingested
+
+BULK_BATCH_SIZE = 1000
+
+def ingest_rows(model, row_serializer_class, rows, batch_size=BULK_BATCH_SIZE, vehicles=None):
+    """
+    Validate and insert a batch of readings for `model` in one transaction.
+
+    Rows are validated one by one against a flat row serializer, vehicle ids
+    are resolved with a single query for the whole batch, and the valid rows
+    are written with bulk_create. Invalid rows are reported by index and do
+    not prevent the rest of the batch from being stored.
+
+    `vehicles` limits which vehicles rows may reference (default: any);
+    rows for other vehicles fail exactly like unknown ids.
+    """
+    child = row_serializer_class()
+    errors = []
+    valid = []
+
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object.']}})
+            continue
+        try:
+            valid.append((index, child.run_validation(row)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+
+    vehicle_ids = {data['vehicle_id'] for _, data in valid}
+    if vehicles is None:
+        vehicles = Vehicle.objects.all()
+    known_ids = set(vehicles.filter(id__in=vehicle_ids).values_list('id', flat=True))
+
+    objs = []
+    for index, data in valid:
+        if data['vehicle_id'] not in known_ids:
+            errors.append({
+                'index': index,
+                'errors': {'vehicle_id': [f"Invalid pk \"{data['vehicle_id']}\" - object does not exist."]},
+            })
+            continue
+        objs.append(model(**data))
+
+    if objs:
+        # Models can fill derived columns for the batch (bulk_create skips save()).
+        if hasattr(model, 'prepare_bulk_create'):
+            model.prepare_bulk_create(objs)
+        with transaction.atomic():
+            created = model.objects.bulk_create(objs, batch_size=batch_size)
+            telemetry_ingested.send(sender=model, instances=created)
+
+    errors.sort(key=lambda e: e['index'])
+    return {'created': len(objs), 'failed': len(errors), 'errors': errors}
@@ -0,0 +1,72 @@
+"""
+VehicleLiveState: the latest telemetry reading per vehicle, kept current on
+every write so the fleet view never has to find max(timestamp) per vehicle.
+"""
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import EVTelemetry, VehicleLiveState
+
+STATE_FIELDS = ('battery_level', 'range_estimate_km', 'location_lat', 'location_lon', 'speed_kph')
+
+def _upsert_sql():
+    qn = connection.ops.quote_name
+    table = qn(VehicleLiveState._meta.db_table)
+    columns = ('vehicle_id', 'telemetry_id', *STATE_FIELDS, 'recorded_at')
+    updates = ', '.join(f'{qn(c)} = excluded.{qn(c)}' for c in columns[1:])
+    recorded_at, telemetry_id = qn('recorded_at'), qn('telemetry_id')
+    # Only move forward: a late-arriving older reading must not replace a newer one.
+    return (
+        f'INSERT INTO {table} ({", ".join(qn(c) for c in columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({qn("vehicle_id")}) DO UPDATE SET {updates} '
+        f'WHERE excluded.{recorded_at} > {table}.{recorded_at} '
+        f'OR (excluded.{recorded_at} = {table}.{recorded_at} AND excluded.{telemetry_id} > {table}.{telemetry_id})'
+    )
+
+def update_live_state(readings):
+    """Upsert the newest of `readings` (saved EVTelemetry rows) for each vehicle."""
+    latest = {}
+    for reading in readings:
+        current = latest.get(reading.vehicle_id)
+        if current is None or (reading.timestamp, reading.pk) > (current.timestamp, current.pk):
+            latest[reading.vehicle_id] = reading
+    if not latest:
+        return
+
+    field = VehicleLiveState._meta.get_field('recorded_at')
+    params = [
+        (
+            reading.vehicle_id, reading.pk,
+            *(getattr(reading, name) for name in STATE_FIELDS),
+            field.get_db_prep_value(reading.timestamp, connection),
+        )
+        for reading in latest.values()
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+
+def rebuild_live_state(batch_size=1000):
+    """Recompute every vehicle's live state from EVTelemetry. Returns rows written."""
+    newest = EVTelemetry.objects.filter(vehicle_id=OuterRef('vehicle_id')).order_by('-timestamp', '-id').values('id')[:1]
+    ids = (
+        EVTelemetry.objects.order_by()
+        .values('vehicle_id').distinct()
+        .annotate(latest_id=Subquery(newest))
+        .values_list('latest_id', flat=True)
+    )
+    written = 0
+    with transaction.atomic():
+        VehicleLiveState.objects.all().delete()
+        ids = list(ids)
+        for offset in range(0, len(ids), batch_size):
+            readings = EVTelemetry.objects.filter(id__in=ids[offset:offset + batch_size])
+            VehicleLiveState.objects.bulk_create([
+                VehicleLiveState(
+                    vehicle_id=r.vehicle_id, telemetry_id=r.pk, recorded_at=r.timestamp,
+                    **{name: getattr(r, name) for name in STATE_FIELDS},
+                )
+                for r in readings
+            ])
+            written += len(readings)
+    return written
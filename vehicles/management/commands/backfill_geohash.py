@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from vehicles.geo import encode_many
+from vehicles.models import EVTelemetry
+from vehicles.response_cache import invalidate
+
+class Command(BaseCommand):
+    help = "Compute the geohash column for EVTelemetry rows written before it existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(
+                EVTelemetry.objects.filter(geohash='', id__gt=last_id)
+                .order_by('id')
+                .only('id', 'location_lat', 'location_lon')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            for obj, geohash in zip(batch, encode_many([o.location_lat for o in batch], [o.location_lon for o in batch])):
+                obj.geohash = geohash
+            EVTelemetry.objects.bulk_update(batch, ['geohash'])
+            updated += len(batch)
+            last_id = batch[-1].id
+        if updated:
+            invalidate(EVTelemetry)  # bulk_update sends no post_save
+        self.stdout.write(self.style.SUCCESS(f"Backfilled geohash for {updated} telemetry row(s)."))
@@ -0,0 +1,64 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.serializers import EVTelemetrySerializer
+from vehicles.ingest import ingest_rows
+from vehicles.models import EVTelemetry, Vehicle
+from vehicles.serializers import EVTelemetryIngestSerializer
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = "Compare rows/second of per-row telemetry creation against the bulk ingest path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Rows to write per path')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(
+            username=f'bench-{tag}', email=f'bench-{tag}@example.com', password=uuid.uuid4().hex
+        )
+        vehicle = Vehicle.objects.create(owner=user, make='Bench', model='Ingest', year=2024, vin=f'BENCH{tag.upper()}0000'[:17])
+
+        try:
+            payload = [self._row(vehicle.id) for _ in range(rows)]
+
+            # Per-row path: one serializer pass, pk lookup, INSERT and post_save per reading.
+            start = time.perf_counter()
+            for row in payload:
+                serializer = EVTelemetrySerializer(data={**row, 'vehicle': row['vehicle_id']})
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            per_row = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = ingest_rows(EVTelemetry, EVTelemetryIngestSerializer, payload)
+            bulk = time.perf_counter() - start
+
+            if result['failed']:
+                self.stdout.write(self.style.ERROR(f"Bulk path rejected {result['failed']} rows"))
+                return
+
+            per_row_rate = rows / per_row
+            bulk_rate = rows / bulk
+            self.stdout.write(f"per-row: {per_row_rate:,.0f} rows/s ({per_row:.2f}s)")
+            self.stdout.write(f"bulk:    {bulk_rate:,.0f} rows/s ({bulk:.2f}s)")
+            self.stdout.write(self.style.SUCCESS(f"speedup: {bulk_rate / per_row_rate:.1f}x"))
+        finally:
+            user.delete()
+
+    def _row(self, vehicle_id):
+        return {
+            'vehicle_id': vehicle_id,
+            'battery_level': round(random.uniform(5, 100), 1),
+            'range_estimate_km': round(random.uniform(10, 450), 1),
+            'location_lat': round(random.uniform(-60, 60), 6),
+            'location_lon': round(random.uniform(-150, 150), 6),
+            'speed_kph': round(random.uniform(0, 130), 1),
+        }
@@ -0,0 +1,113 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.serializers import AuditLogSerializer
+from audit.models import AuditLog
+from vehicles.eager import load_for_serializer
+from vehicles.fastpath import ListPlan
+from vehicles.models import EVTelemetry, SensorReading, Vehicle
+from vehicles.renderers import FastJSONRenderer
+from vehicles.serializers import EVTelemetrySerializer, SensorReadingSerializer
+
+User = get_user_model()
+
+SERIALIZERS = {
+    'evtelemetry': EVTelemetrySerializer,
+    'sensorreading': SensorReadingSerializer,
+    'auditlog': AuditLogSerializer,
+}
+
+class Command(BaseCommand):
+    help = "Compare rows/second of the serializer list path against the values() fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(SERIALIZERS), default='evtelemetry')
+        parser.add_argument('--rows', type=int, default=5000, help='Rows to serialize per pass')
+        parser.add_argument('--repeat', type=int, default=3, help='Passes per path; the best one counts')
+        parser.add_argument('--fields', default='', help='Same as ?fields= on the API')
+        parser.add_argument('--expand', default='', help='Same as ?expand= on the API')
+
+    def handle(self, *args, **options):
+        rows, model_name = options['rows'], options['model']
+        serializer_class = SERIALIZERS[model_name]
+        # Everything the run creates (user, vehicle, seeded rows and whatever
+        # their post_save receivers queue) is rolled back at the end.
+        with transaction.atomic():
+            tag = uuid.uuid4().hex[:8]
+            user = User.objects.create_user(
+                username=f'bench-{tag}', email=f'bench-{tag}@example.com', password=uuid.uuid4().hex
+            )
+            vehicle = Vehicle.objects.create(owner=user, make='Bench', model='Serialize', year=2024, vin=f'BENCH{tag.upper()}0000'[:17])
+
+            queryset = self._seed(model_name, rows, user, vehicle)
+            params = QueryDict(mutable=True)
+            params.update({key: options[key] for key in ('fields', 'expand') if options[key]})
+            http_request = HttpRequest()
+            http_request.method, http_request.GET = 'GET', params
+            context = {'request': Request(http_request)}
+
+            plan = ListPlan.compile(serializer_class(context=context))
+            if plan is None:
+                raise CommandError("This field set needs the serializer path (method fields or properties).")
+            slow_queryset = load_for_serializer(queryset, serializer_class(context=context))
+            fast_queryset = plan.values(queryset)
+
+            def slow():
+                return JSONRenderer().render(serializer_class(slow_queryset.all(), many=True, context=context).data)
+
+            def fast():
+                return FastJSONRenderer().render(plan.to_data(list(fast_queryset.all())))
+
+            slow_time, slow_body = self._time(slow, options['repeat'])
+            fast_time, fast_body = self._time(fast, options['repeat'])
+            if slow_body != fast_body:
+                raise CommandError("Fast path output differs from the serializer output.")
+
+            slow_rate, fast_rate = rows / slow_time, rows / fast_time
+            self.stdout.write(f"serializer: {slow_rate:,.0f} rows/s ({slow_time:.3f}s, {len(slow_body):,} bytes)")
+            self.stdout.write(f"fast path:  {fast_rate:,.0f} rows/s ({fast_time:.3f}s, identical output)")
+            self.stdout.write(self.style.SUCCESS(f"speedup: {fast_rate / slow_rate:.1f}x"))
+            transaction.set_rollback(True)
+
+    def _time(self, func, repeat):
+        best, body = None, None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            body = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, body
+
+    def _seed(self, model_name, rows, user, vehicle):
+        now = timezone.now()
+        if model_name == 'evtelemetry':
+            EVTelemetry.objects.bulk_create([
+                EVTelemetry(
+                    vehicle=vehicle, battery_level=round(random.uniform(5, 100), 1),
+                    range_estimate_km=round(random.uniform(10, 450), 1),
+                    location_lat=round(random.uniform(-60, 60), 6), location_lon=round(random.uniform(-150, 150), 6),
+                    speed_kph=round(random.uniform(0, 130), 1),
+                )
+                for _ in range(rows)
+            ], batch_size=1000)
+            return EVTelemetry.objects.filter(vehicle=vehicle)
+        if model_name == 'sensorreading':
+            SensorReading.objects.bulk_create([
+                SensorReading(vehicle=vehicle, sensor_type='oxygen', value=round(random.uniform(0, 1), 4))
+                for _ in range(rows)
+            ], batch_size=1000)
+            return SensorReading.objects.filter(vehicle=vehicle)
+        AuditLog.objects.bulk_create([
+            AuditLog(user=user, path=f'/api/vehicles/{i}/', method='GET', status_code=200, timestamp=now)
+            for i in range(rows)
+        ], batch_size=1000)
+        return AuditLog.objects.filter(user=user)
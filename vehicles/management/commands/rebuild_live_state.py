@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from vehicles.live_state import rebuild_live_state
+
+class Command(BaseCommand):
+    help = "Recompute the per-vehicle live state table from the latest EVTelemetry rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_live_state(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt live state for {written} vehicle(s)."))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from vehicles.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = "Recompute minute/hour/day telemetry rollups from the raw sensor and telemetry tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, action='append', dest='vehicles', help='Only this vehicle id (repeatable)')
+        parser.add_argument('--days', type=int, help='Only rebuild the last N days (default: everything)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        written = rebuild_rollups(vehicle_ids=options['vehicles'], since=since, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup row(s)."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from vehicles.ratings import drifted_profiles, reconcile_ratings
+
+class Command(BaseCommand):
+    help = "Rebuild SellerProfile rating totals from SellerFeedback and LegacySellerFeedback"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', type=int, action='append', dest='sellers', help='Only this seller user id (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many profiles are out of date')
+
+    def handle(self, *args, **options):
+        drifted = drifted_profiles(options['sellers']).count()
+        if options['dry_run']:
+            self.stdout.write(f"{drifted} seller profile(s) out of date.")
+            return
+        updated = reconcile_ratings(options['sellers'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {updated} seller profile(s); {drifted} had drifted."))
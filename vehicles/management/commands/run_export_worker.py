@@ -0,0 +1,62 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from vehicles.export_jobs import claim_next_job, purge_expired_artifacts, requeue_stale_jobs, run_job
+
+class Command(BaseCommand):
+    help = "Render queued export jobs to MEDIA_ROOT with a fixed number of worker threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.EXPORT_WORKER_CONCURRENCY)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+        parser.add_argument('--stale-after', type=int, default=30, help='Requeue running jobs whose heartbeat is older than this many minutes')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale export job(s)."))
+        purged = purge_expired_artifacts()
+        if purged:
+            self.stdout.write(f"Deleted {purged} expired export artifact(s).")
+
+        concurrency = max(options['concurrency'], 1)
+        if concurrency == 1:
+            self._work(options['once'], options['poll_interval'])
+            return
+
+        threads = [
+            threading.Thread(target=self._work_in_thread, args=(options['once'], options['poll_interval']), daemon=True)
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping export worker.")
+
+    def _work_in_thread(self, once, poll_interval):
+        try:
+            self._work(once, poll_interval)
+        finally:
+            connection.close()
+
+    def _work(self, once, poll_interval):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+            job = run_job(job)
+            style = self.style.SUCCESS if job.status == 'done' else self.style.ERROR
+            self.stdout.write(style(f"{job} {job.file.name or job.error}"))
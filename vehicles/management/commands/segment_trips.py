@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from vehicles.trips import segment_trips
+
+class Command(BaseCommand):
+    help = "Fold telemetry received since the last run into per-vehicle trips"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, action='append', dest='vehicles', help='Only this vehicle id (repeatable)')
+        parser.add_argument('--rebuild', action='store_true', help='Drop existing trips and checkpoints and start over')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        totals = segment_trips(vehicle_ids=options['vehicles'], rebuild=options['rebuild'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {totals['readings']} reading(s) for {totals['vehicles']} vehicle(s); closed {totals['closed']} trip(s)."
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0007_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VinMetadataCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vin', models.CharField(max_length=17, unique=True)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('is_negative', models.BooleanField(default=False)),
+                ('fetched_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'VIN Metadata Cache Entry',
+                'verbose_name_plural': 'VIN Metadata Cache',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='vinmetadatacache',
+            index=models.Index(fields=['expires_at'], name='vehicles_vi_expires_fdb0a7_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0008_vinmetadatacache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evtelemetry',
+            index=models.Index(fields=['timestamp', 'id'], name='vehicles_ev_timesta_9d8fb3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensorreading',
+            index=models.Index(fields=['timestamp', 'id'], name='vehicles_se_timesta_063312_idx'),
+        ),
+    ]
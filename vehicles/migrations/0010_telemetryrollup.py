@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0009_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('sensor', 'Sensor reading'), ('telemetry', 'EV telemetry')], max_length=10)),
+                ('metric', models.CharField(max_length=50)),
+                ('interval', models.CharField(choices=[('1m', 'Minute'), ('1h', 'Hour'), ('1d', 'Day')], max_length=2)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('sum', models.FloatField(default=0.0)),
+                ('min', models.FloatField()),
+                ('max', models.FloatField()),
+            ],
+            options={
+                'ordering': ['bucket'],
+            },
+        ),
+        migrations.AddField(
+            model_name='telemetryrollup',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_rollups', to='vehicles.vehicle'),
+        ),
+        migrations.AddConstraint(
+            model_name='telemetryrollup',
+            constraint=models.UniqueConstraint(fields=('vehicle', 'source', 'metric', 'interval', 'bucket'), name='unique_telemetry_rollup_bucket'),
+        ),
+    ]
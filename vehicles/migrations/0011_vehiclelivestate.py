@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0010_telemetryrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleLiveState',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_state', serialize=False, to='vehicles.vehicle')),
+                ('telemetry_id', models.BigIntegerField()),
+                ('battery_level', models.FloatField()),
+                ('range_estimate_km', models.FloatField()),
+                ('location_lat', models.FloatField()),
+                ('location_lon', models.FloatField()),
+                ('speed_kph', models.FloatField()),
+                ('recorded_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Vehicle Live State',
+                'verbose_name_plural': 'Vehicle Live States',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='vehiclelivestate',
+            index=models.Index(fields=['location_lat', 'location_lon'], name='vehicles_ve_locatio_927159_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclelivestate',
+            index=models.Index(fields=['recorded_at'], name='vehicles_ve_recorde_c6398e_idx'),
+        ),
+    ]
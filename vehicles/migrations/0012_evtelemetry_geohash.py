@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0011_vehiclelivestate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evtelemetry',
+            name='geohash',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='evtelemetry',
+            index=models.Index(fields=['geohash', 'timestamp'], name='vehicles_ev_geohash_547499_idx'),
+        ),
+    ]
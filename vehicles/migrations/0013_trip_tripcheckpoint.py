@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0012_evtelemetry_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('start_lat', models.FloatField()),
+                ('start_lon', models.FloatField()),
+                ('end_lat', models.FloatField()),
+                ('end_lon', models.FloatField()),
+                ('start_battery', models.FloatField()),
+                ('end_battery', models.FloatField()),
+                ('distance_km', models.FloatField(default=0.0)),
+                ('max_speed_kph', models.FloatField(default=0.0)),
+                ('reading_count', models.PositiveIntegerField(default=0)),
+                ('is_open', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TripCheckpoint',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trip_checkpoint', serialize=False, to='vehicles.vehicle')),
+                ('last_timestamp', models.DateTimeField()),
+                ('last_telemetry_id', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to='vehicles.vehicle'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['vehicle', 'started_at'], name='vehicles_tr_vehicle_f011bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['started_at', 'id'], name='vehicles_tr_started_28e070_idx'),
+        ),
+    ]
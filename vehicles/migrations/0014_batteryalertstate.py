@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0013_trip_tripcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatteryAlertState',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='battery_alert_state', serialize=False, to='vehicles.vehicle')),
+                ('is_low', models.BooleanField(default=False)),
+                ('last_level', models.FloatField(blank=True, null=True)),
+                ('last_reading_at', models.DateTimeField(blank=True, null=True)),
+                ('last_alert_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+def backfill_totals(apps, schema_editor):
+    SellerProfile = apps.get_model('vehicles', 'SellerProfile')
+    totals = {}
+    for model_name in ('SellerFeedback', 'LegacySellerFeedback'):
+        model = apps.get_model('vehicles', model_name)
+        rows = model.objects.order_by().values('seller_id').annotate(total=models.Sum('rating'), n=models.Count('id'))
+        for row in rows:
+            total, count = totals.get(row['seller_id'], (0, 0))
+            totals[row['seller_id']] = (total + row['total'], count + row['n'])
+    for profile in SellerProfile.objects.filter(user_id__in=totals):
+        profile.rating_sum, profile.rating_count = totals[profile.user_id]
+        profile.rating = round(profile.rating_sum / profile.rating_count, 2)
+        profile.save(update_fields=['rating', 'rating_sum', 'rating_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0014_batteryalertstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0017_exportjob_heartbeat_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batteryalertstate',
+            name='alert_pending',
+            field=models.BooleanField(default=False),
+        ),
+    ]
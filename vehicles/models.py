@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.utils.text import slugify
@@ -12,6 +12,7 @@ class Vehicle(models.Model):
     year = models.PositiveSmallIntegerField()
     vin = models.CharField(max_length=17, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -29,6 +30,7 @@ class Part(models.Model):
     vehicle_model = models.CharField(max_length=50)
     vehicle_year = models.PositiveSmallIntegerField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -47,6 +49,7 @@ class Listing(models.Model):
     region = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -60,8 +63,11 @@ class SellerProfile(models.Model):
     company_name = models.CharField(max_length=100, blank=True)
     contact_number = models.CharField(max_length=15, blank=True)
     address = models.TextField(blank=True)
-    rating = models.FloatField(default=0.0)
+    rating = models.FloatField(default=0.0)  # rating_sum / rating_count, kept by vehicles.ratings
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     website = models.URLField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Seller Profile'
@@ -77,6 +83,7 @@ class BuyRequest(models.Model):
     offer_price = models.DecimalField(max_digits=10, decimal_places=2)
     timestamp = models.DateTimeField(auto_now_add=True)
     is_approved = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -90,6 +97,7 @@ class AuctionBid(models.Model):
     bidder = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='auction_bids')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -98,12 +106,19 @@ class AuctionBid(models.Model):
     def __str__(self):
         return f"Bid of {self.amount} on {self.listing.title} by {self.bidder.email}"
 
-class SellerFeedback(models.Model):
+class RatingSnapshotMixin:
+    """Save in one transaction, so the seller-rating signals read the old row and apply their delta atomically."""
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+class SellerFeedback(RatingSnapshotMixin, models.Model):
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='feedback_received')
     reviewer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='feedback_given')
     rating = models.PositiveSmallIntegerField()
     comment = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -119,15 +134,33 @@ class EVTelemetry(models.Model):
     location_lat = models.FloatField()
     location_lon = models.FloatField()
     speed_kph = models.FloatField()
+    geohash = models.CharField(max_length=12, blank=True, default='')  # see vehicles.geo
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-timestamp']
-        indexes = [models.Index(fields=['vehicle', 'timestamp'])]
+        indexes = [
+            models.Index(fields=['vehicle', 'timestamp']),
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['geohash', 'timestamp']),
+        ]
 
     def __str__(self):
         return f"Telemetry for {self.vehicle.vin} at {self.timestamp}"
 
+    def save(self, *args, **kwargs):
+        from .geo import encode
+        self.geohash = encode(self.location_lat, self.location_lon)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def prepare_bulk_create(cls, objs):
+        # bulk_create skips save(); encode the whole batch at once instead
+        from .geo import encode_many
+        hashes = encode_many([o.location_lat for o in objs], [o.location_lon for o in objs])
+        for obj, geohash in zip(objs, hashes):
+            obj.geohash = geohash
+
 class ADASCalibration(models.Model):
     SENSOR_TYPES = [
         ('radar', 'Radar'),
@@ -141,6 +174,7 @@ class ADASCalibration(models.Model):
     calibration_date = models.DateTimeField()
     notes = models.TextField(blank=True)
     is_compliant = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-calibration_date']
@@ -157,6 +191,7 @@ class FuseBox(models.Model):
     location = models.CharField(max_length=100)
     diagram_url = models.URLField(blank=True, default='1')  # ✅ Add default
     notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=['make', 'model', 'year'])]
@@ -180,6 +215,7 @@ class WiringDiagram(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     diagram_file = models.FileField(upload_to='diagrams/files/', blank=True, null=True)
     system = models.CharField(max_length=20, choices=SYSTEM_TYPES, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-uploaded_at']
@@ -196,7 +232,7 @@ class SensorReading(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
-        indexes = [models.Index(fields=['vehicle', 'sensor_type'])]
+        indexes = [models.Index(fields=['vehicle', 'sensor_type']), models.Index(fields=['timestamp', 'id'])]
 
     def __str__(self):
         return f"{self.sensor_type} Reading for {self.vehicle.vin}: {self.value}"
@@ -212,6 +248,7 @@ class OBDDiagnostic(models.Model):
     description = models.TextField()
     severity = models.CharField(max_length=10, choices=SEVERITY_LEVELS)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -231,6 +268,7 @@ class Sensor(models.Model):
     name = models.CharField(max_length=100)
     type = models.CharField(max_length=20, choices=SENSOR_TYPES)
     location = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=['type'])]
@@ -241,6 +279,7 @@ class Sensor(models.Model):
 class Acronym(models.Model):
     short_form = models.CharField(max_length=20, unique=True)
     full_form = models.CharField(max_length=200)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=['short_form'])]
@@ -252,6 +291,7 @@ class LegacyDiagnosticCode(models.Model):
     code = models.CharField(max_length=10, unique=True, default='1')  # ✅ Add default
     description = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -267,6 +307,7 @@ class LegacyGuestBlog(models.Model):
     author = models.CharField(max_length=100)
     content = models.TextField()
     published_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-published_date']
@@ -295,6 +336,7 @@ class LegacyCarListing(models.Model):
     title = models.CharField(max_length=200)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     location = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=['seller'])]
@@ -302,12 +344,13 @@ class LegacyCarListing(models.Model):
     def __str__(self):
         return f"{self.title} - {self.price}"
 
-class LegacySellerFeedback(models.Model):
+class LegacySellerFeedback(RatingSnapshotMixin, models.Model):
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='legacy_feedback_received')
     reviewer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='legacy_feedback_given')
     rating = models.PositiveSmallIntegerField()
     comment = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -316,12 +359,13 @@ class LegacySellerFeedback(models.Model):
     def __str__(self):
         return f"Legacy Feedback for {self.seller.email} by {self.reviewer.email} ({self.rating})"
     
-class LegacySellerFeedback(models.Model):
+class LegacySellerFeedback(RatingSnapshotMixin, models.Model):
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='legacy_feedback_received')
     reviewer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='legacy_feedback_given', default=1)  # ✅ Add default
     rating = models.PositiveSmallIntegerField()
     comment = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-timestamp']
@@ -329,3 +373,172 @@ class LegacySellerFeedback(models.Model):
 
     def __str__(self):
         return f"Legacy Feedback for {self.seller.email} by {self.reviewer.email} ({self.rating})"
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),
+    ]
+    KIND_CHOICES = [
+        ('vehicles_csv', 'Vehicles CSV'),
+        ('vehicles_pdf', 'Vehicles PDF'),
+        ('sensor_csv', 'Sensor readings CSV'),
+        ('sensor_pdf', 'Sensor report PDF'),
+        ('obd_csv', 'OBD diagnostics CSV'),
+        ('diagnostics_pdf', 'Diagnostics report PDF'),
+    ]
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='exports/', blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['fingerprint', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} export #{self.pk} ({self.status})"
+
+class VinMetadataCache(models.Model):
+    vin = models.CharField(max_length=17, unique=True)
+    payload = models.JSONField(default=dict, blank=True)
+    is_negative = models.BooleanField(default=False)  # upstream had no record for this VIN
+    fetched_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'VIN Metadata Cache Entry'
+        verbose_name_plural = 'VIN Metadata Cache'
+        indexes = [models.Index(fields=['expires_at'])]
+
+    def __str__(self):
+        return f"{self.vin} ({'negative' if self.is_negative else 'cached'} until {self.expires_at})"
+
+class TelemetryRollup(models.Model):
+    SOURCE_CHOICES = [
+        ('sensor', 'Sensor reading'),
+        ('telemetry', 'EV telemetry'),
+    ]
+    INTERVAL_CHOICES = [
+        ('1m', 'Minute'),
+        ('1h', 'Hour'),
+        ('1d', 'Day'),
+    ]
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='telemetry_rollups')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    metric = models.CharField(max_length=50)  # sensor_type, or an EVTelemetry field name
+    interval = models.CharField(max_length=2, choices=INTERVAL_CHOICES)
+    bucket = models.DateTimeField()  # UTC start of the bucket
+    count = models.PositiveIntegerField(default=0)
+    sum = models.FloatField(default=0.0)
+    min = models.FloatField()
+    max = models.FloatField()
+
+    class Meta:
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['vehicle', 'source', 'metric', 'interval', 'bucket'], name='unique_telemetry_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.interval} @ {self.bucket:%Y-%m-%d %H:%M} for vehicle {self.vehicle_id}"
+
+    @property
+    def avg(self):
+        return self.sum / self.count if self.count else None
+
+class VehicleLiveState(models.Model):
+    # Latest EVTelemetry reading per vehicle, upserted on every telemetry write.
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, primary_key=True, related_name='live_state')
+    telemetry_id = models.BigIntegerField()
+    battery_level = models.FloatField()
+    range_estimate_km = models.FloatField()
+    location_lat = models.FloatField()
+    location_lon = models.FloatField()
+    speed_kph = models.FloatField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Vehicle Live State'
+        verbose_name_plural = 'Vehicle Live States'
+        indexes = [
+            models.Index(fields=['location_lat', 'location_lon']),
+            models.Index(fields=['recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"Vehicle {self.vehicle_id}: {self.battery_level}% at {self.recorded_at}"
+
+class Trip(models.Model):
+    # One driving segment derived from EVTelemetry by vehicles.trips.
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='trips')
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    start_lat = models.FloatField()
+    start_lon = models.FloatField()
+    end_lat = models.FloatField()
+    end_lon = models.FloatField()
+    start_battery = models.FloatField()
+    end_battery = models.FloatField()
+    distance_km = models.FloatField(default=0.0)
+    max_speed_kph = models.FloatField(default=0.0)
+    reading_count = models.PositiveIntegerField(default=0)
+    is_open = models.BooleanField(default=True)  # may still be extended by newer readings
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['vehicle', 'started_at']),
+            models.Index(fields=['started_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Trip for vehicle {self.vehicle_id} at {self.started_at}: {self.distance_km:.1f} km"
+
+    @property
+    def duration_seconds(self):
+        return (self.ended_at - self.started_at).total_seconds()
+
+    @property
+    def battery_used(self):
+        return self.start_battery - self.end_battery
+
+    @property
+    def avg_speed_kph(self):
+        hours = self.duration_seconds / 3600
+        return self.distance_km / hours if hours else None
+
+class TripCheckpoint(models.Model):
+    # Last EVTelemetry reading already segmented into trips, per vehicle.
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, primary_key=True, related_name='trip_checkpoint')
+    last_timestamp = models.DateTimeField()
+    last_telemetry_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Trips for vehicle {self.vehicle_id} segmented up to {self.last_timestamp}"
+
+class BatteryAlertState(models.Model):
+    # Low-battery alert state per vehicle; see vehicles.alerts.
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, primary_key=True, related_name='battery_alert_state')
+    is_low = models.BooleanField(default=False)
+    alert_pending = models.BooleanField(default=False)  # crossed below while in cooldown
+    last_level = models.FloatField(null=True, blank=True)
+    last_reading_at = models.DateTimeField(null=True, blank=True)
+    last_alert_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Vehicle {self.vehicle_id}: {'low' if self.is_low else 'ok'} ({self.last_level}%)"
@@ -1,6 +1,136 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 25
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination on (`ordering_field`, id).
+
+    Each page is a `WHERE (ts, id) < (last ts, last id) ORDER BY ts DESC, id
+    DESC LIMIT n` range scan, so page 10,000 costs the same as page 1 and
+    there is no COUNT(*). Cursors are opaque base64 tokens in `?cursor=`.
+    Requests with `?page=` (or paginating a plain list) fall back to
+    StandardResultsSetPagination for callers that need totals.
+    """
+    ordering_field = 'timestamp'
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.fallback = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'page' in request.query_params or not isinstance(queryset, QuerySet):
+            if isinstance(queryset, QuerySet):
+                queryset = queryset.order_by(f'-{self.ordering_field}', '-id')
+            self.fallback = StandardResultsSetPagination()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        field = self.ordering_field
+        if reverse:
+            queryset = queryset.order_by(field, 'id')
+        else:
+            queryset = queryset.order_by(f'-{field}', '-id')
+        if position is not None:
+            value, pk = position
+            op = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk}))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Moving forward there is a previous page whenever we came from a
+        # cursor; moving backward there is always a next page.
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self.position_of(rows[-1])
+            if position is not None and (has_more or not reverse):
+                self.previous_position = self.position_of(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.fallback:
+            return self.fallback.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def position_of(self, obj):
+        if isinstance(obj, dict):  # values() rows from vehicles.fastpath
+            return obj[self.ordering_field], obj['id']
+        return getattr(obj, self.ordering_field), obj.pk
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_position, False))
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.previous_position, True))
+
+    def encode_cursor(self, position, reverse):
+        value, pk = position
+        token = json.dumps({'v': value.isoformat(), 'i': pk, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            position = (datetime.fromisoformat(token['v']), int(token['i']))
+            return position, bool(token.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    ordering_field = 'created_at'
+
+class StartedAtKeysetPagination(KeysetPagination):
+    ordering_field = 'started_at'
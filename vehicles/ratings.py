@@ -0,0 +1,69 @@
+"""
+Seller ratings kept as a running sum and count on SellerProfile.
+
+Each feedback create/update/delete turns into one UPDATE of the seller's
+profile with F() expressions, so the cost does not grow with the number of
+reviews and concurrent reviews never overwrite each other. Feedback written
+with bulk_create() or raw SQL bypasses the signals; reconcile_ratings()
+recomputes every profile from the feedback tables in a single statement.
+"""
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+from .models import SellerFeedback, LegacySellerFeedback, SellerProfile
+from .response_cache import invalidate
+
+def _average(total, count):
+    return Coalesce(Round(Cast(total, FloatField()) / NullIf(count, Value(0)), 2), Value(0.0))
+
+def apply_rating_delta(seller_id, rating_delta, count_delta):
+    """Shift one seller's running totals; a seller without a profile is skipped."""
+    total = F('rating_sum') + rating_delta
+    count = F('rating_count') + count_delta
+    invalidate(SellerProfile)  # QuerySet.update() sends no post_save
+    profiles = SellerProfile.objects.filter(user_id=seller_id)
+    shrinking = rating_delta < 0 or count_delta < 0
+    if shrinking:
+        # Feedback that bypassed the signals was never counted, so removing it
+        # would drive the totals below zero; recompute this seller instead.
+        profiles = profiles.filter(rating_sum__gte=-rating_delta, rating_count__gte=-count_delta)
+    updated = profiles.update(
+        rating_sum=total, rating_count=count, rating=_average(total, count), updated_at=timezone.now()
+    )
+    if not updated and shrinking:
+        return reconcile_ratings([seller_id])
+    return updated
+
+def _grouped(model, aggregate):
+    rows = (
+        model.objects.filter(seller_id=OuterRef('user_id'))
+        .order_by().values('seller_id')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+def _expected():
+    total = _grouped(SellerFeedback, Sum('rating')) + _grouped(LegacySellerFeedback, Sum('rating'))
+    count = _grouped(SellerFeedback, Count('id')) + _grouped(LegacySellerFeedback, Count('id'))
+    return total, count
+
+def drifted_profiles(seller_ids=None):
+    """Profiles whose stored totals disagree with the feedback tables."""
+    total, count = _expected()
+    profiles = SellerProfile.objects.annotate(expected_sum=total, expected_count=count)
+    if seller_ids is not None:
+        profiles = profiles.filter(user_id__in=seller_ids)
+    return profiles.exclude(rating_sum=F('expected_sum'), rating_count=F('expected_count'))
+
+def reconcile_ratings(seller_ids=None):
+    """Recompute rating_sum/rating_count/rating from the feedback tables. Returns profiles updated."""
+    total, count = _expected()
+    profiles = SellerProfile.objects.all()
+    if seller_ids is not None:
+        profiles = profiles.filter(user_id__in=seller_ids)
+    invalidate(SellerProfile)
+    return profiles.update(
+        rating_sum=total, rating_count=count, rating=_average(total, count), updated_at=timezone.now()
+    )
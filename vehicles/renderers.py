@@ -0,0 +1,84 @@
+"""
+Renderers for the list endpoints.
+
+FastJSONRenderer is what FastListMixin views answer application/json with.
+Telemetry and sensor series also offer (SERIES_RENDERERS), chosen with Accept or ?format=:
+
+    application/vnd.columnar+json  ?format=columnar  {"results": {"timestamp": [...], "battery_level": [...]}}
+    application/msgpack            ?format=msgpack   the usual payload as MessagePack (needs the msgpack package)
+
+The columnar shape names each field once instead of once per row; nested
+(expanded) objects stay objects inside their column. Pagination keys are
+unchanged, and payloads that are not row lists (errors) pass through as is.
+"""
+import json
+
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # optional; without it the msgpack format is simply not offered
+    msgpack = None
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer with one prebuilt encoder and no circular-reference check,
+    for payloads that are already plain dicts, lists, strings and numbers
+    (see vehicles.fastpath). Produces the same bytes as JSONRenderer. Anything
+    else (lazy strings, Decimals, indented output) goes through JSONRenderer.
+    """
+    def __init__(self):
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=self.ensure_ascii, allow_nan=not self.strict, check_circular=False,
+            separators=SHORT_SEPARATORS if self.compact else LONG_SEPARATORS,
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = self._encoder.encode(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+def to_columns(rows):
+    """[{'a': 1, 'b': 2}, {'a': 3, 'b': 4}] -> {'a': [1, 3], 'b': [2, 4]}; missing keys become None."""
+    names = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    return {name: [row.get(name) for row in rows] for name in names}
+
+def _is_rows(value):
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if _is_rows(data):
+            data = to_columns(data)
+        elif isinstance(data, dict) and _is_rows(data.get('results')):
+            data = {**data, 'results': to_columns(data['results'])}
+        return super().render(data, accepted_media_type, renderer_context)
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Datetimes, Decimals, lazy strings: the same coercions as the JSON output.
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+
+DEFAULT_RENDERERS = [FastJSONRenderer] + [
+    renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES if renderer is not JSONRenderer
+]
+SERIES_RENDERERS = DEFAULT_RENDERERS + [ColumnarJSONRenderer] + ([MessagePackRenderer] if msgpack else [])
@@ -0,0 +1,181 @@
+"""
+Generation-keyed response cache for read-heavy, rarely written endpoints.
+
+Every tracked model has a generation counter in the cache. A cached response
+is stored under the current generations of the models it was built from, so
+a write never has to find and delete stale entries: the post_save/post_delete
+receivers just bump the counter and later reads miss into a fresh key, while
+the orphaned entries age out via their timeout. Counters are bumped when the
+write happens and again once it commits, so a reader racing an open
+transaction cannot pin the old rows under the new generation.
+
+The backend is the RESPONSE_CACHE_ALIAS entry of CACHES (locmem, file or
+Redis). LocMemCache counters live in one process, so deployments with several
+workers need a shared backend for writes in one worker to reach the others.
+Writes that skip model signals (bulk_create, QuerySet.update) call invalidate().
+
+Views opt in with CachedResponseMixin. Hit/miss counts and handler latency
+are kept per process and served by ResponseCacheMetricsView.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.response import Response
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+def generation_key(model):
+    return f'gen:{model._meta.label_lower}'
+
+def _seed():
+    # Counters start from the clock, so a counter lost to eviction or a cache
+    # restart never comes back at a value whose responses are still stored.
+    return time.time_ns()
+
+def generations(models):
+    """{model: current generation}, creating missing counters."""
+    cache = _cache()
+    keys = {generation_key(model): model for model in models}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, _seed(), timeout=None)
+        found[key] = cache.get(key)
+    return {model: found[key] for key, model in keys.items()}
+
+def bump(*models):
+    cache = _cache()
+    for model in models:
+        key = generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _seed(), timeout=None)
+
+def invalidate(*models):
+    """bump() now and again once the current transaction commits."""
+    bump(*models)
+    transaction.on_commit(lambda: bump(*models))
+
+def _bump_on_write(sender, **kwargs):
+    invalidate(sender)
+
+_tracked = set()
+
+def track(*models):
+    """Bump `models`' generations whenever an instance is saved or deleted. Idempotent."""
+    for model in models:
+        if model in _tracked:
+            continue
+        _tracked.add(model)
+        uid = f'response-cache:{model._meta.label_lower}'
+        post_save.connect(_bump_on_write, sender=model, dispatch_uid=uid, weak=False)
+        post_delete.connect(_bump_on_write, sender=model, dispatch_uid=uid, weak=False)
+
+def tracked_generations():
+    return {model._meta.label_lower: gen for model, gen in generations(sorted(_tracked, key=str)).items()}
+
+_metrics = defaultdict(lambda: {'hits': 0, 'misses': 0, 'hit_seconds': 0.0, 'miss_seconds': 0.0})
+_metrics_lock = threading.Lock()
+
+def record(name, hit, seconds):
+    with _metrics_lock:
+        entry = _metrics[name]
+        entry['hits' if hit else 'misses'] += 1
+        entry['hit_seconds' if hit else 'miss_seconds'] += seconds
+
+def metrics():
+    """Per-view hit ratio and mean latency (ms) since this process started."""
+    with _metrics_lock:
+        snapshot = {name: dict(entry) for name, entry in _metrics.items()}
+    report = {}
+    for name, entry in sorted(snapshot.items()):
+        hits, misses = entry['hits'], entry['misses']
+        report[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+            'avg_hit_ms': round(entry['hit_seconds'] * 1000 / hits, 3) if hits else None,
+            'avg_miss_ms': round(entry['miss_seconds'] * 1000 / misses, 3) if misses else None,
+        }
+    return report
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+class CachedResponseMixin:
+    """
+    Serve GET responses from the generation-keyed cache.
+
+    `cache_models` lists every model the response is built from (defaults to
+    the queryset's model). Viewsets cache the actions in `cache_actions`;
+    plain APIViews cache every GET. Set `cache_per_user` when the payload
+    depends on who is asking.
+    """
+    cache_models = None
+    cache_actions = ('list', 'retrieve')
+    cache_per_user = False
+    cache_timeout = None
+
+    def get_cache_models(self):
+        if self.cache_models is not None:
+            return tuple(self.cache_models)
+        return (self.queryset.model,)
+
+    def get_cache_name(self):
+        name = f'{type(self).__module__}.{type(self).__name__}'
+        action = getattr(self, 'action', None)
+        return f'{name}.{action}' if action else name
+
+    def get_cache_key(self, request):
+        models = self.get_cache_models()
+        track(*models)
+        gens = generations(models)
+        vary = [request.path, sorted(request.query_params.lists())]
+        if self.cache_per_user:
+            vary.append(request.user.pk)
+        digest = hashlib.md5(repr(vary).encode(), usedforsecurity=False).hexdigest()
+        stamp = '.'.join(str(gens[model]) for model in models)
+        return f'resp:{self.get_cache_name()}:{stamp}:{digest}'
+
+    def _should_cache(self, request):
+        if request.method != 'GET' or not settings.RESPONSE_CACHE_ENABLED:
+            return False
+        action = getattr(self, 'action', None)
+        return action is None or action in self.cache_actions
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Runs after authentication and permission checks; dispatch() looks
+        # the handler up afterwards, so wrapping it here covers viewset
+        # actions and APIView.get alike. The view instance is per request.
+        if self._should_cache(request):
+            self.get = self._cached(self.get)
+
+    def _cached(self, handler):
+        def cached_handler(request, *args, **kwargs):
+            started = time.perf_counter()
+            cache = _cache()
+            key = self.get_cache_key(request)
+            data = cache.get(key)
+            if data is not None:
+                record(self.get_cache_name(), True, time.perf_counter() - started)
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200 and getattr(response, 'data', None) is not None:
+                timeout = self.cache_timeout if self.cache_timeout is not None else settings.RESPONSE_CACHE_TIMEOUT
+                cache.set(key, response.data, timeout)
+                response['X-Cache'] = 'MISS'
+            record(self.get_cache_name(), False, time.perf_counter() - started)
+            return response
+        return cached_handler
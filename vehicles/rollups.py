@@ -0,0 +1,209 @@
+"""
+Minute / hour / day rollups of sensor readings and EV telemetry.
+
+Every stored reading is folded into one TelemetryRollup row per interval
+(count, sum, min, max) as it is written; a chart over 30 days then reads
+30 daily or 720 hourly rows instead of every raw reading. rebuild_rollups()
+recomputes a range from the raw tables with the bucketing done in SQL.
+
+min/max cannot be un-applied, so edits and deletes made through the API
+rebuild the day each affected reading falls in (refresh_days). Changes made
+any other way (admin, shell, queryset.update/delete) leave the rollups stale
+until `manage.py rebuild_rollups --vehicle <id> --days <n>` is run.
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Trunc
+
+from .models import EVTelemetry, SensorReading, TelemetryRollup
+
+INTERVALS = {
+    '1m': 'minute',
+    '1h': 'hour',
+    '1d': 'day',
+}
+TELEMETRY_METRICS = ('battery_level', 'speed_kph', 'range_estimate_km')
+AGGREGATES = ('avg', 'min', 'max', 'count')
+
+def bucket_start(ts, interval):
+    ts = ts.astimezone(dt_timezone.utc)
+    if interval == '1m':
+        return ts.replace(second=0, microsecond=0)
+    if interval == '1h':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def points_for(instances):
+    """(vehicle_id, source, metric, timestamp, value) for saved readings of either model."""
+    for obj in instances:
+        if isinstance(obj, SensorReading):
+            yield obj.vehicle_id, 'sensor', obj.sensor_type, obj.timestamp, obj.value
+        elif isinstance(obj, EVTelemetry):
+            for metric in TELEMETRY_METRICS:
+                yield obj.vehicle_id, 'telemetry', metric, obj.timestamp, getattr(obj, metric)
+
+def accumulate(points):
+    """Fold points into {(vehicle_id, source, metric, interval, bucket): [count, sum, min, max]}."""
+    deltas = {}
+    for vehicle_id, source, metric, ts, value in points:
+        if value is None or ts is None:
+            continue
+        for interval in INTERVALS:
+            key = (vehicle_id, source, metric, interval, bucket_start(ts, interval))
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = [1, value, value, value]
+            else:
+                delta[0] += 1
+                delta[1] += value
+                delta[2] = min(delta[2], value)
+                delta[3] = max(delta[3], value)
+    return deltas
+
+def _upsert_sql():
+    qn = connection.ops.quote_name
+    table = qn(TelemetryRollup._meta.db_table)
+    key = ', '.join(qn(c) for c in ('vehicle_id', 'source', 'metric', 'interval', 'bucket'))
+    count, total, low, high = (qn(c) for c in ('count', 'sum', 'min', 'max'))
+    least, greatest = ('LEAST', 'GREATEST') if connection.vendor == 'postgresql' else ('MIN', 'MAX')
+    return (
+        f'INSERT INTO {table} ({key}, {count}, {total}, {low}, {high}) '
+        f'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) '
+        f'ON CONFLICT ({key}) DO UPDATE SET '
+        f'{count} = {table}.{count} + excluded.{count}, '
+        f'{total} = {table}.{total} + excluded.{total}, '
+        f'{low} = {least}({table}.{low}, excluded.{low}), '
+        f'{high} = {greatest}({table}.{high}, excluded.{high})'
+    )
+
+def apply_deltas(deltas):
+    # One upsert per bucket touched; the increment happens in the database so
+    # concurrent writers never overwrite each other's counts.
+    if not deltas:
+        return
+    field = TelemetryRollup._meta.get_field('bucket')
+    params = [
+        (vehicle_id, source, metric, interval, field.get_db_prep_value(bucket, connection), *delta)
+        for (vehicle_id, source, metric, interval, bucket), delta in deltas.items()
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+
+def record(instances):
+    apply_deltas(accumulate(points_for(instances)))
+
+# --- Rebuild from raw rows ---
+def _raw_buckets(source, interval, filters):
+    kind = INTERVALS[interval]
+    if source == 'sensor':
+        rows = (
+            SensorReading.objects.filter(**filters)
+            .annotate(bucket=Trunc('timestamp', kind, tzinfo=dt_timezone.utc))
+            .values('vehicle_id', 'sensor_type', 'bucket')
+            .annotate(n=Count('id'), total=Sum('value'), low=Min('value'), high=Max('value'))
+            .order_by()
+        )
+        for row in rows.iterator():
+            yield row['vehicle_id'], row['sensor_type'], row
+        return
+
+    for metric in TELEMETRY_METRICS:
+        rows = (
+            EVTelemetry.objects.filter(**filters)
+            .annotate(bucket=Trunc('timestamp', kind, tzinfo=dt_timezone.utc))
+            .values('vehicle_id', 'bucket')
+            .annotate(n=Count('id'), total=Sum(metric), low=Min(metric), high=Max(metric))
+            .order_by()
+        )
+        for row in rows.iterator():
+            yield row['vehicle_id'], metric, row
+
+def rebuild_rollups(vehicle_ids=None, since=None, until=None, batch_size=2000):
+    """
+    Recompute rollups from the raw tables, for `vehicle_ids` (all if None)
+    and from `since` onwards (everything if None), up to `until`
+    (exclusive, open-ended if None). Both bounds are rounded down to
+    midnight UTC so day buckets are never rebuilt from a partial day.
+    Returns the number of rollup rows written.
+    """
+    filters = {}
+    rollup_filters = {}
+    if vehicle_ids is not None:
+        filters['vehicle_id__in'] = rollup_filters['vehicle_id__in'] = list(vehicle_ids)
+    if since is not None:
+        since = bucket_start(since, '1d')
+        filters['timestamp__gte'] = rollup_filters['bucket__gte'] = since
+    if until is not None:
+        until = bucket_start(until, '1d')
+        filters['timestamp__lt'] = rollup_filters['bucket__lt'] = until
+
+    written = 0
+    with transaction.atomic():
+        TelemetryRollup.objects.filter(**rollup_filters).delete()
+        for source in ('sensor', 'telemetry'):
+            for interval in INTERVALS:
+                batch = []
+                for vehicle_id, metric, row in _raw_buckets(source, interval, filters):
+                    batch.append(TelemetryRollup(
+                        vehicle_id=vehicle_id, source=source, metric=metric, interval=interval,
+                        bucket=row['bucket'], count=row['n'], sum=row['total'], min=row['low'], max=row['high'],
+                    ))
+                    if len(batch) >= batch_size:
+                        TelemetryRollup.objects.bulk_create(batch)
+                        written += len(batch)
+                        batch = []
+                TelemetryRollup.objects.bulk_create(batch)
+                written += len(batch)
+    return written
+
+def refresh_days(points):
+    """Rebuild the UTC day of each (vehicle_id, timestamp) pair, e.g. before and after an edit."""
+    days = {(vehicle_id, bucket_start(ts, '1d')) for vehicle_id, ts in points if vehicle_id and ts}
+    for vehicle_id, day in sorted(days):
+        rebuild_rollups([vehicle_id], since=day, until=day + timedelta(days=1))
+
+# --- Queries ---
+def _format(bucket, count, total, low, high, aggs):
+    point = {'bucket': bucket}
+    if 'avg' in aggs:
+        point['avg'] = total / count if count else None
+    if 'min' in aggs:
+        point['min'] = low
+    if 'max' in aggs:
+        point['max'] = high
+    if 'count' in aggs:
+        point['count'] = count
+    return point
+
+def aggregate_series(vehicle_id, source, metric, interval, start=None, end=None, aggs=AGGREGATES):
+    """Buckets from the rollup table, oldest first."""
+    queryset = TelemetryRollup.objects.filter(vehicle_id=vehicle_id, source=source, metric=metric, interval=interval)
+    if start is not None:
+        queryset = queryset.filter(bucket__gte=bucket_start(start, interval))
+    if end is not None:
+        queryset = queryset.filter(bucket__lt=end)
+    return [
+        _format(bucket, count, total, low, high, aggs)
+        for bucket, count, total, low, high in queryset.order_by('bucket').values_list('bucket', 'count', 'sum', 'min', 'max')
+    ]
+
+def aggregate_series_raw(vehicle_id, source, metric, interval, start=None, end=None, aggs=AGGREGATES):
+    """Same shape as aggregate_series(), bucketed with Trunc over the raw rows."""
+    if source == 'sensor':
+        queryset, field = SensorReading.objects.filter(vehicle_id=vehicle_id, sensor_type=metric), 'value'
+    else:
+        queryset, field = EVTelemetry.objects.filter(vehicle_id=vehicle_id), metric
+    if start is not None:
+        queryset = queryset.filter(timestamp__gte=bucket_start(start, interval))
+    if end is not None:
+        queryset = queryset.filter(timestamp__lt=end)
+    rows = (
+        queryset
+        .annotate(bucket=Trunc('timestamp', INTERVALS[interval], tzinfo=dt_timezone.utc))
+        .values('bucket')
+        .annotate(n=Count('id'), total=Sum(field), low=Min(field), high=Max(field))
+        .order_by('bucket')
+    )
+    return [_format(row['bucket'], row['n'], row['total'], row['low'], row['high'], aggs) for row in rows]
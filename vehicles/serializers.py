@@ -1,29 +1,36 @@
 from rest_framework import serializers
+from .fieldsets import SparseModelSerializer
 from .models import (
     Vehicle, Part, Listing, SellerProfile, BuyRequest, AuctionBid, SellerFeedback,
     EVTelemetry, ADASCalibration, FuseBox, WiringDiagram, SensorReading, OBDDiagnostic,
-    Sensor, Acronym, LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback
+    Sensor, Acronym, LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback,
+    ExportJob, Trip
 )
 from accounts.models import CustomUser
 from django.core.validators import FileExtensionValidator
+from django.urls import reverse
+from .vin import decode_vin, is_north_american, vin_errors
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(SparseModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'email', 'get_full_name', 'role']
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(SparseModelSerializer):
     owner = CustomUserSerializer(read_only=True)
-    image = serializers.ImageField(required=False, validators=[FileExtensionValidator(['jpg', 'jpeg', 'png'])])
 
     class Meta:
         model = Vehicle
-        fields = ['id', 'owner', 'make', 'model', 'year', 'vin', 'image', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'owner', 'make', 'model', 'year', 'vin', 'created_at']
+        read_only_fields = ['created_at']
 
     def validate_vin(self, value):
-        if len(value) != 17:
-            raise serializers.ValidationError("VIN must be exactly 17 characters.")
+        value = value.strip().upper()
+        errors = vin_errors(value)
+        if errors:
+            raise serializers.ValidationError(errors[0])
+        if is_north_american(value) and not decode_vin(value)['check_digit_valid']:
+            raise serializers.ValidationError("VIN check digit (position 9) does not match.")
         if Vehicle.objects.filter(vin=value).exists():
             raise serializers.ValidationError("A vehicle with this VIN already exists.")
         return value
@@ -33,125 +40,137 @@ class VehicleSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Only sellers can create or update vehicles.")
         return data
 
-class PartSerializer(serializers.ModelSerializer):
+class PartSerializer(SparseModelSerializer):
     seller = CustomUserSerializer(read_only=True)
 
     class Meta:
         model = Part
-        fields = ['id', 'seller', 'name', 'description', 'price', 'vehicle_make', 'vehicle_model', 'vehicle_year', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'seller', 'name', 'description', 'price', 'vehicle_make', 'vehicle_model', 'vehicle_year', 'timestamp']
+        read_only_fields = ['timestamp']
 
     def validate_price(self, value):
         if value <= 0:
             raise serializers.ValidationError("Price must be greater than zero.")
         return value
 
-class ListingSerializer(serializers.ModelSerializer):
+class ListingSerializer(SparseModelSerializer):
     seller = CustomUserSerializer(read_only=True)
-    vehicle = VehicleSerializer(read_only=True)
-    vehicle_id = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), source='vehicle', write_only=True)
 
     class Meta:
         model = Listing
-        fields = ['id', 'seller', 'vehicle', 'vehicle_id', 'title', 'description', 'price', 'currency', 'location', 'is_active', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'seller', 'title', 'description', 'price', 'currency', 'location', 'region', 'is_active', 'timestamp']
+        read_only_fields = ['timestamp']
 
     def validate(self, data):
         if self.context['request'].user.is_authenticated and not self.context['request'].user.is_seller():
             raise serializers.ValidationError("Only sellers can create or update listings.")
         return data
 
-class SellerProfileSerializer(serializers.ModelSerializer):
+class SellerProfileSerializer(SparseModelSerializer):
     user = CustomUserSerializer(read_only=True)
 
     class Meta:
         model = SellerProfile
-        fields = ['id', 'user', 'bio', 'rating', 'created_at', 'updated_at']
-        read_only_fields = ['rating', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'company_name', 'contact_number', 'address', 'rating', 'rating_count', 'website']
+        read_only_fields = ['rating', 'rating_count']
 
-class BuyRequestSerializer(serializers.ModelSerializer):
+class BuyRequestSerializer(SparseModelSerializer):
     buyer = CustomUserSerializer(read_only=True)
     listing = ListingSerializer(read_only=True)
     listing_id = serializers.PrimaryKeyRelatedField(queryset=Listing.objects.all(), source='listing', write_only=True)
 
     class Meta:
         model = BuyRequest
-        fields = ['id', 'buyer', 'listing', 'listing_id', 'message', 'status', 'created_at', 'updated_at']
-        read_only_fields = ['status', 'created_at', 'updated_at']
+        fields = ['id', 'buyer', 'listing', 'listing_id', 'message', 'offer_price', 'is_approved', 'timestamp']
+        read_only_fields = ['is_approved', 'timestamp']
 
     def validate(self, data):
         if self.context['request'].user.is_authenticated and not self.context['request'].user.is_buyer():
             raise serializers.ValidationError("Only buyers can create buy requests.")
         return data
 
-class AuctionBidSerializer(serializers.ModelSerializer):
+class AuctionBidSerializer(SparseModelSerializer):
     bidder = CustomUserSerializer(read_only=True)
     listing = ListingSerializer(read_only=True)
     listing_id = serializers.PrimaryKeyRelatedField(queryset=Listing.objects.all(), source='listing', write_only=True)
 
     class Meta:
         model = AuctionBid
-        fields = ['id', 'bidder', 'listing', 'listing_id', 'amount', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'bidder', 'listing', 'listing_id', 'amount', 'timestamp']
+        read_only_fields = ['timestamp']
 
     def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("Bid amount must be greater than zero.")
         return value
 
-class SellerFeedbackSerializer(serializers.ModelSerializer):
+class SellerFeedbackSerializer(SparseModelSerializer):
     reviewer = CustomUserSerializer(read_only=True)
     seller = CustomUserSerializer(read_only=True)
     seller_id = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), source='seller', write_only=True)
 
     class Meta:
         model = SellerFeedback
-        fields = ['id', 'reviewer', 'seller', 'seller_id', 'rating', 'comment', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'reviewer', 'seller', 'seller_id', 'rating', 'comment', 'timestamp']
+        read_only_fields = ['timestamp']
 
     def validate_rating(self, value):
         if not 1 <= value <= 5:
             raise serializers.ValidationError("Rating must be between 1 and 5.")
         return value
 
-class EVTelemetrySerializer(serializers.ModelSerializer):
+class EVTelemetrySerializer(SparseModelSerializer):
     vehicle = VehicleSerializer(read_only=True)
     vehicle_id = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), source='vehicle', write_only=True)
 
     class Meta:
         model = EVTelemetry
-        fields = ['id', 'vehicle', 'vehicle_id', 'battery_level', 'range_remaining', 'timestamp']
+        fields = ['id', 'vehicle', 'vehicle_id', 'battery_level', 'range_estimate_km', 'location_lat', 'location_lon', 'speed_kph', 'timestamp']
 
-class ADASCalibrationSerializer(serializers.ModelSerializer):
+class TripSerializer(SparseModelSerializer):
+    duration_seconds = serializers.FloatField(read_only=True)
+    battery_used = serializers.FloatField(read_only=True)
+    avg_speed_kph = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Trip
+        fields = [
+            'id', 'vehicle', 'started_at', 'ended_at', 'duration_seconds',
+            'start_lat', 'start_lon', 'end_lat', 'end_lon', 'distance_km',
+            'start_battery', 'end_battery', 'battery_used', 'avg_speed_kph', 'max_speed_kph',
+            'reading_count', 'is_open',
+        ]
+        read_only_fields = fields
+
+class ADASCalibrationSerializer(SparseModelSerializer):
     vehicle = VehicleSerializer(read_only=True)
     vehicle_id = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), source='vehicle', write_only=True)
     calibrated_by = CustomUserSerializer(read_only=True)
 
     class Meta:
         model = ADASCalibration
-        fields = ['id', 'vehicle', 'vehicle_id', 'sensor_type', 'calibration_data', 'calibrated_by', 'timestamp']
+        fields = ['id', 'vehicle', 'vehicle_id', 'sensor_type', 'calibrated_by', 'calibration_date', 'notes', 'is_compliant']
 
-class FuseBoxSerializer(serializers.ModelSerializer):
+class FuseBoxSerializer(SparseModelSerializer):
     class Meta:
         model = FuseBox
-        fields = ['id', 'make', 'model', 'year', 'fuse_layout', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'vehicle', 'make', 'model', 'year', 'location', 'diagram_url', 'notes']
 
-class WiringDiagramSerializer(serializers.ModelSerializer):
+class WiringDiagramSerializer(SparseModelSerializer):
     vehicle = VehicleSerializer(read_only=True)
     vehicle_id = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), source='vehicle', write_only=True)
 
     class Meta:
         model = WiringDiagram
-        fields = ['id', 'vehicle', 'vehicle_id', 'system', 'diagram_file', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'vehicle', 'vehicle_id', 'title', 'system', 'description', 'image', 'diagram_file', 'uploaded_at']
+        read_only_fields = ['uploaded_at']
 
     def validate_diagram_file(self, value):
         validator = FileExtensionValidator(['pdf', 'png', 'jpg', 'jpeg'])
         validator(value)
         return value
 
-class SensorReadingSerializer(serializers.ModelSerializer):
+class SensorReadingSerializer(SparseModelSerializer):
     vehicle = VehicleSerializer(read_only=True)
     vehicle_id = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), source='vehicle', write_only=True)
 
@@ -159,52 +178,80 @@ class SensorReadingSerializer(serializers.ModelSerializer):
         model = SensorReading
         fields = ['id', 'vehicle', 'vehicle_id', 'sensor_type', 'value', 'timestamp']
 
-class OBDDiagnosticSerializer(serializers.ModelSerializer):
+class OBDDiagnosticSerializer(SparseModelSerializer):
     vehicle = VehicleSerializer(read_only=True)
     vehicle_id = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), source='vehicle', write_only=True)
 
     class Meta:
         model = OBDDiagnostic
-        fields = ['id', 'vehicle', 'vehicle_id', 'dtc_code', 'description', 'timestamp']
+        fields = ['id', 'vehicle', 'vehicle_id', 'dtc_code', 'description', 'severity', 'timestamp']
 
-class SensorSerializer(serializers.ModelSerializer):
+class SensorSerializer(SparseModelSerializer):
     class Meta:
         model = Sensor
-        fields = ['id', 'type', 'description', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'name', 'type', 'location']
 
-class AcronymSerializer(serializers.ModelSerializer):
+class AcronymSerializer(SparseModelSerializer):
     class Meta:
         model = Acronym
-        fields = ['id', 'short_form', 'full_form', 'description', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'short_form', 'full_form']
 
-class LegacyDiagnosticCodeSerializer(serializers.ModelSerializer):
+class LegacyDiagnosticCodeSerializer(SparseModelSerializer):
     class Meta:
         model = LegacyDiagnosticCode
-        fields = ['id', 'code', 'description', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'code', 'description', 'timestamp']
+        read_only_fields = ['timestamp']
 
-class LegacyGuestBlogSerializer(serializers.ModelSerializer):
+class LegacyGuestBlogSerializer(SparseModelSerializer):
     class Meta:
         model = LegacyGuestBlog
-        fields = ['id', 'title', 'content', 'author', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'title', 'slug', 'content', 'author', 'published_date']
+        read_only_fields = ['published_date']
 
-class LegacyCarListingSerializer(serializers.ModelSerializer):
+class LegacyCarListingSerializer(SparseModelSerializer):
     seller = CustomUserSerializer(read_only=True)
 
     class Meta:
         model = LegacyCarListing
-        fields = ['id', 'seller', 'title', 'description', 'price', 'location', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'seller', 'title', 'price', 'location']
 
-class LegacySellerFeedbackSerializer(serializers.ModelSerializer):
+class LegacySellerFeedbackSerializer(SparseModelSerializer):
     reviewer = CustomUserSerializer(read_only=True)
     seller = CustomUserSerializer(read_only=True)
     seller_id = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), source='seller', write_only=True)
 
     class Meta:
         model = LegacySellerFeedback
-        fields = ['id', 'reviewer', 'seller', 'seller_id', 'rating', 'comment', 'created_at']
-        read_only_fields = ['created_at']
\ No newline at end of file
+        fields = ['id', 'reviewer', 'seller', 'seller_id', 'rating', 'comment', 'timestamp']
+        read_only_fields = ['timestamp']
+# --- Bulk ingestion rows ---
+# Flat row serializers for the bulk ingest endpoints: vehicle ids are checked
+# once per batch by vehicles.ingest instead of per row.
+class EVTelemetryIngestSerializer(serializers.Serializer):
+    vehicle_id = serializers.IntegerField(min_value=1)
+    battery_level = serializers.FloatField(min_value=0, max_value=100)
+    range_estimate_km = serializers.FloatField(min_value=0)
+    location_lat = serializers.FloatField(min_value=-90, max_value=90)
+    location_lon = serializers.FloatField(min_value=-180, max_value=180)
+    speed_kph = serializers.FloatField(min_value=0)
+
+class SensorReadingIngestSerializer(serializers.Serializer):
+    vehicle_id = serializers.IntegerField(min_value=1)
+    sensor_type = serializers.CharField(max_length=50)
+    value = serializers.FloatField()
+
+# --- Background exports ---
+class ExportJobSerializer(SparseModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'kind', 'status', 'size', 'error', 'created_at', 'started_at', 'finished_at', 'download_url']
+        read_only_fields = ['status', 'size', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
+        url = reverse('export-job-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
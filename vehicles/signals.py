@@ -1,43 +1,121 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import SellerFeedback, SellerProfile, Vehicle, EVTelemetry
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver, Signal
+from .models import (
+    SellerFeedback, LegacySellerFeedback, SellerProfile, Vehicle, EVTelemetry, SensorReading,
+    FuseBox, Sensor, Acronym, LegacyDiagnosticCode, VinMetadataCache,
+)
+from . import ratings, response_cache, rollups
+from .live_state import update_live_state
+from .alerts import evaluate_battery_alerts
+from notifications.outbox import enqueue_email
+from notifications.pubsub import get_broker, vehicle_channel
+from django.db import transaction
+
+# Sent once per bulk ingest batch (bulk_create skips post_save) with
+# sender=<model class> and instances=<list of created rows>.
+telemetry_ingested = Signal()
+
+# Models behind cached responses; tracked here as well as by the views so a
+# write from a worker or management command still moves their generation.
+response_cache.track(Vehicle, FuseBox, Sensor, Acronym, LegacyDiagnosticCode, VinMetadataCache)
+
+@receiver(pre_save, sender=SellerFeedback)
+@receiver(pre_save, sender=LegacySellerFeedback)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        # save() runs in a transaction (RatingSnapshotMixin); the lock keeps a
+        # concurrent edit from changing the row between snapshot and delta.
+        instance._previous_rating = (
+            sender.objects.select_for_update().filter(pk=instance.pk).values_list('seller_id', 'rating').first()
+        )
 
 @receiver(post_save, sender=SellerFeedback)
+@receiver(post_save, sender=LegacySellerFeedback)
 def update_seller_rating(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        ratings.apply_rating_delta(instance.seller_id, instance.rating, 1)
+    elif previous[0] != instance.seller_id:
+        ratings.apply_rating_delta(previous[0], -previous[1], -1)
+        ratings.apply_rating_delta(instance.seller_id, instance.rating, 1)
+    elif previous[1] != instance.rating:
+        ratings.apply_rating_delta(instance.seller_id, instance.rating - previous[1], 0)
+
+@receiver(post_delete, sender=SellerFeedback)
+@receiver(post_delete, sender=LegacySellerFeedback)
+def remove_seller_rating(sender, instance, **kwargs):
+    ratings.apply_rating_delta(instance.seller_id, -instance.rating, -1)
+
+@receiver(post_save, sender=SellerProfile)
+def seed_seller_rating(sender, instance, created, **kwargs):
+    # Feedback can exist before the seller sets up a profile.
     if created:
-        seller = instance.seller
-        profile = SellerProfile.objects.get(user=seller)
-        feedbacks = SellerFeedback.objects.filter(seller=seller)
-        avg_rating = feedbacks.aggregate(models.Avg('rating'))['rating__avg'] or 0.0
-        profile.rating = round(avg_rating, 2)
-        profile.save()
+        ratings.reconcile_ratings([instance.user_id])
+        instance.refresh_from_db(fields=['rating', 'rating_sum', 'rating_count'])
 
 @receiver(post_save, sender=Vehicle)
 def notify_vehicle_added(sender, instance, created, **kwargs):
-    if created and instance.owner:
+    if created and instance.owner and instance.owner.email:
         subject = f'New Vehicle Added: {instance}'
         message = f'Your vehicle {instance.make} {instance.model} ({instance.year}) has been added to the Cars Platform.'
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [instance.owner.email],
-            fail_silently=True,
-        )
+        enqueue_email(subject, message, [instance.owner.email])
 
 @receiver(post_save, sender=EVTelemetry)
 def notify_low_battery(sender, instance, created, **kwargs):
-    if created and instance.battery_level < 20:
-        vehicle = instance.vehicle
-        if vehicle.owner:
-            subject = f'Low Battery Alert for {vehicle}'
-            message = f'Your vehicle {vehicle.make} {vehicle.model} has a battery level of {instance.battery_level}%. Please charge soon.'
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [vehicle.owner.email],
-                fail_silently=True,
-            )
\ No newline at end of file
+    if created:
+        evaluate_battery_alerts([instance])
+
+@receiver(telemetry_ingested, sender=EVTelemetry)
+def notify_low_battery_for_batch(sender, instances, **kwargs):
+    evaluate_battery_alerts(instances)
+
+@receiver(post_save, sender=EVTelemetry)
+@receiver(post_save, sender=SensorReading)
+def update_rollups(sender, instance, created, **kwargs):
+    if created:
+        rollups.record([instance])
+
+@receiver(telemetry_ingested)
+def update_rollups_for_batch(sender, instances, **kwargs):
+    rollups.record(instances)
+
+@receiver(post_save, sender=EVTelemetry)
+def update_vehicle_live_state(sender, instance, created, **kwargs):
+    if created:
+        update_live_state([instance])
+
+@receiver(telemetry_ingested, sender=EVTelemetry)
+def update_vehicle_live_state_for_batch(sender, instances, **kwargs):
+    update_live_state(instances)
+
+def _publish_telemetry(readings):
+    # Live subscribers only need each vehicle's newest reading from a batch.
+    latest = {}
+    for reading in readings:
+        current = latest.get(reading.vehicle_id)
+        if current is None or (reading.timestamp, reading.pk) > (current.timestamp, current.pk):
+            latest[reading.vehicle_id] = reading
+    events = [
+        (vehicle_channel(vehicle_id), {
+            'id': r.pk, 'vehicle': vehicle_id, 'battery_level': r.battery_level,
+            'range_estimate_km': r.range_estimate_km, 'location_lat': r.location_lat,
+            'location_lon': r.location_lon, 'speed_kph': r.speed_kph, 'timestamp': r.timestamp,
+        })
+        for vehicle_id, r in latest.items()
+    ]
+
+    def publish():
+        broker = get_broker()
+        for channel, data in events:
+            broker.publish(channel, 'telemetry', data)
+    transaction.on_commit(publish)
+
+@receiver(post_save, sender=EVTelemetry)
+def publish_telemetry(sender, instance, created, **kwargs):
+    if created:
+        _publish_telemetry([instance])
+
+@receiver(telemetry_ingested, sender=EVTelemetry)
+def publish_telemetry_for_batch(sender, instances, **kwargs):
+    _publish_telemetry(instances)
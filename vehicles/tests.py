@@ -1,3 +1,1316 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notifications.models import EmailOutbox
+from vehicles import enrichment
+from vehicles.models import (
+    Vehicle, Part, Listing, SellerProfile, BuyRequest, AuctionBid, SellerFeedback, EVTelemetry,
+    ADASCalibration, FuseBox, WiringDiagram, SensorReading, OBDDiagnostic, Sensor, Acronym,
+    LegacyDiagnosticCode, LegacyGuestBlog, LegacyCarListing, LegacySellerFeedback,
+    ExportJob, VinMetadataCache, TelemetryRollup, VehicleLiveState, Trip, TripCheckpoint,
+    BatteryAlertState,
+)
+from vehicles.api_views import (
+    EVTelemetryViewSet, SensorReadingViewSet, ExportCSVView, TripViewSet, AcronymViewSet, OBDDiagnosticViewSet,
+    SensorChartView as SensorChartAPIView,
+)
+from vehicles.downsample import lttb_indices
+from vehicles.eager import eager_paths
+from vehicles.geo import covering_prefixes, encode, haversine_km
+from vehicles.export import export_queryset_to_csv
+from vehicles.ingest import ingest_rows
+from vehicles.trips import segment_trips, segment_vehicle
+from vehicles.rollups import aggregate_series, aggregate_series_raw
+from vehicles.serializers import SensorReadingIngestSerializer, EVTelemetryIngestSerializer
+from vehicles.pagination import KeysetPagination
+from vehicles.serializers import VehicleSerializer, OBDDiagnosticSerializer, SensorReadingSerializer, EVTelemetrySerializer, TripSerializer, AcronymSerializer
+from vehicles.vin import decode_vins
+from vehicles import renderers, response_cache
+from vehicles.export_jobs import claim_next_job, purge_expired_artifacts, request_export, requeue_stale_jobs
+from vehicles.views import (
+    ExportJobDownloadView, TelemetryAggregateView, SensorChartView, FleetStatusView, TelemetryGeoView,
+    FuseBoxLookupView, VehicleMetadataView, ResponseCacheMetricsView,
+)
+from vehicles.urls import router
+
+User = get_user_model()
+
+class BulkIngestTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='ingest', email='ingest@example.com', password='pass12345')
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Tesla', model='Model 3', year=2022, vin='5YJ3E1EA7KF317000')
+
+    def _post(self, viewset, body, content_type):
+        request = self.factory.post('/bulk/', body, content_type=content_type)
+        force_authenticate(request, user=self.user)
+        return viewset.as_view({'post': 'bulk'}, **viewset.bulk.kwargs)(request)
+
+    def test_json_array_with_row_errors(self):
+        rows = [
+            {'vehicle_id': self.vehicle.id, 'battery_level': 80, 'range_estimate_km': 300,
+             'location_lat': 52.5, 'location_lon': 13.4, 'speed_kph': 50},
+            {'vehicle_id': 999999, 'battery_level': 70, 'range_estimate_km': 250,
+             'location_lat': 52.5, 'location_lon': 13.4, 'speed_kph': 40},
+            {'vehicle_id': self.vehicle.id, 'battery_level': 'full'},
+        ]
+        response = self._post(EVTelemetryViewSet, json.dumps(rows), 'application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2])
+        self.assertEqual(EVTelemetry.objects.count(), 1)
+
+    def test_rows_for_other_owners_vehicles_are_rejected(self):
+        stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='pass12345')
+        theirs = Vehicle.objects.create(owner=stranger, make='Kia', model='EV6', year=2023, vin='KNDC3DLC5P5000009')
+        rows = [
+            {'vehicle_id': theirs.id, 'sensor_type': 'oxygen', 'value': 1.0},
+            {'vehicle_id': self.vehicle.id, 'sensor_type': 'oxygen', 'value': 2.0},
+        ]
+        response = self._post(SensorReadingViewSet, json.dumps(rows), 'application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([e['index'] for e in response.data['errors']], [0])
+        self.assertFalse(SensorReading.objects.filter(vehicle=theirs).exists())
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self._post(SensorReadingViewSet, json.dumps(rows[:1]), 'application/json').data['created'], 1)
+
+    def test_ndjson_body(self):
+        lines = [
+            json.dumps({'vehicle_id': self.vehicle.id, 'sensor_type': 'oxygen', 'value': i / 10})
+            for i in range(50)
+        ]
+        response = self._post(SensorReadingViewSet, '\n'.join(lines) + '\n', 'application/x-ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 50)
+        self.assertEqual(SensorReading.objects.filter(vehicle=self.vehicle).count(), 50)
+
+    def test_query_count_independent_of_batch_size(self):
+        counts = []
+        for size in (10, 200):
+            rows = [{'vehicle_id': self.vehicle.id, 'sensor_type': 'speed', 'value': i} for i in range(size)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self._post(SensorReadingViewSet, json.dumps(rows), 'application/json')
+            self.assertEqual(response.data['created'], size)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='export', email='export@example.com', password='pass12345')
+        for i in range(5):
+            Vehicle.objects.create(owner=self.user, make='Nissan', model='Leaf', year=2018 + i, vin=f'SJNFAAZE0U600000{i}')
+
+    def test_vehicle_export_streams_csv(self):
+        request = self.factory.get('/export/csv/')
+        force_authenticate(request, user=self.user)
+        response = ExportCSVView.as_view()(request)
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Make,Model,Year,VIN')
+        self.assertEqual(len(lines), 6)
+
+    def test_gzip_export_round_trips(self):
+        vehicle = Vehicle.objects.first()
+        SensorReading.objects.bulk_create(
+            SensorReading(vehicle=vehicle, sensor_type='pressure', value=i) for i in range(2500)
+        )
+        response = export_queryset_to_csv(
+            SensorReading.objects.all(), ['sensor_type', 'value'], filename='readings.csv',
+            request=self.factory.get('/', {'gzip': '1'}),
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('readings.csv.gz', response['Content-Disposition'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(lines[0], 'sensor_type,value')
+        self.assertEqual(len(lines), 2501)
+
+    def test_gzip_export_is_not_compressed_again_by_the_middleware(self):
+        token = str(AccessToken.for_user(self.user))
+        response = APIClient().get(reverse('export-csv'), {'gzip': '1', 'token': token}, secure=True, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(lines[0], 'Timestamp,Sensor,Value')
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='jobs', email='jobs@example.com', password='pass12345')
+        Vehicle.objects.create(owner=self.user, make='Kia', model='EV6', year=2023, vin='KNDC3DLC5P5000001')
+
+    def _download(self, job, **headers):
+        request = self.factory.get('/download/', **headers)
+        force_authenticate(request, user=self.user)
+        return ExportJobDownloadView.as_view()(request, pk=job.pk)
+
+    def test_worker_renders_and_download_supports_ranges(self):
+        job, reused = request_export(self.user, 'vehicles_csv')
+        self.assertFalse(reused)
+        self.assertEqual(job.status, 'pending')
+
+        call_command('run_export_worker', once=True, concurrency=1, stdout=open(os.devnull, 'w'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+        full = b''.join(self._download(job).streaming_content)
+        self.assertTrue(full.startswith(b'Make,Model,Year,VIN'))
+
+        partial = self._download(job, HTTP_RANGE='bytes=5-')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b''.join(partial.streaming_content), full[5:])
+        self.assertEqual(partial['Content-Range'], f'bytes 5-{len(full) - 1}/{len(full)}')
+
+        self.assertEqual(self._download(job, HTTP_RANGE=f'bytes={len(full)}-').status_code, 416)
+
+    def test_ranges_survive_the_middleware_stack_with_gzip(self):
+        for i in range(40):
+            Vehicle.objects.create(owner=self.user, make='Kia', model='Niro', year=2020, vin=f'KNDCC3LG0L{i:07d}')
+        job, _ = request_export(self.user, 'vehicles_csv')
+        call_command('run_export_worker', once=True, concurrency=1, stdout=open(os.devnull, 'w'))
+        job.refresh_from_db()
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('export-job-download', args=[job.pk])
+        full = client.get(url, secure=True, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(full.has_header('Content-Encoding'))
+        body = b''.join(full.streaming_content)
+
+        partial = client.get(url, secure=True, HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(partial.status_code, 206)
+        self.assertFalse(partial.has_header('Content-Encoding'))
+        self.assertEqual(partial['Content-Length'], '100')
+        self.assertEqual(partial['Content-Range'], f'bytes 100-199/{len(body)}')
+        self.assertEqual(b''.join(partial.streaming_content), body[100:200])
+
+        resumed = client.get(url, secure=True, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=full['ETag'])
+        self.assertEqual(resumed.status_code, 206)
+        self.assertEqual(full['ETag'], partial['ETag'])
+
+        # If-Range is a strong comparison: a weak validator gets the whole file
+        weak = client.get(url, secure=True, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=f'W/{full["ETag"]}')
+        self.assertEqual(weak.status_code, 200)
+        self.assertEqual(b''.join(weak.streaming_content), body)
+
+    def test_identical_export_within_ttl_reuses_artifact(self):
+        first, _ = request_export(self.user, 'vehicles_csv')
+        call_command('run_export_worker', once=True, concurrency=1, stdout=open(os.devnull, 'w'))
+
+        second, reused = request_export(self.user, 'vehicles_csv')
+        self.assertTrue(reused)
+        self.assertEqual(second.status, 'done')
+        self.assertEqual(second.file.name, ExportJob.objects.get(pk=first.pk).file.name)
+
+        with override_settings(EXPORT_JOB_TTL=0):
+            _, reused = request_export(self.user, 'vehicles_csv')
+        self.assertFalse(reused)
+
+    def test_requeue_leaves_jobs_with_a_live_heartbeat_alone(self):
+        job, _ = request_export(self.user, 'vehicles_csv')
+        claim_next_job()
+        # started long ago but still beating: a slow render, not a dead worker
+        ExportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 0)
+
+        ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+
+    def test_expired_artifacts_are_deleted(self):
+        first, _ = request_export(self.user, 'vehicles_csv')
+        call_command('run_export_worker', once=True, concurrency=1, stdout=open(os.devnull, 'w'))
+        second, reused = request_export(self.user, 'vehicles_csv')
+        self.assertTrue(reused)
+        first.refresh_from_db()
+        path = first.file.path
+
+        self.assertEqual(purge_expired_artifacts(timedelta(days=1)), 0)
+        self.assertTrue(os.path.exists(path))
+
+        self.assertEqual(purge_expired_artifacts(timedelta(0)), 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(
+            list(ExportJob.objects.filter(pk__in=[first.pk, second.pk]).values_list('status', 'file')),
+            [('expired', ''), ('expired', '')],
+        )
+        self.assertEqual(self._download(first).status_code, 409)
+
+class StubMetadataHandler(BaseHTTPRequestHandler):
+    # /vehicles/<vin>: VINs starting with "MISSING" -> 404, "BROKEN" -> 503.
+    hits = []
+
+    def do_GET(self):
+        vin = self.path.rstrip('/').rsplit('/', 1)[-1]
+        self.hits.append(vin)
+        if vin.startswith('MISSING'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        if vin.startswith('BROKEN'):
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({'engine': f'engine-{vin[-2:]}', 'transmission': 'auto', 'country_of_origin': 'DE'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class VinEnrichmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubMetadataHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubMetadataHandler.hits = []
+        enrichment._breaker = None
+        override = override_settings(
+            VIN_METADATA_URL=f'http://127.0.0.1:{self.server.server_port}/vehicles/{{vin}}',
+            VIN_METADATA_BREAKER_THRESHOLD=3,
+            VIN_METADATA_BREAKER_RESET=60,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(setattr, enrichment, '_breaker', None)
+
+    def test_misses_fetched_concurrently_then_served_from_cache(self):
+        vins = [f'WVWZZZ1KZAW0000{i:02d}' for i in range(20)]
+        result = enrichment.enrich_vins(vins)
+
+        self.assertEqual(len(StubMetadataHandler.hits), 20)
+        self.assertEqual(result[vins[3]]['engine'], 'engine-03')
+        self.assertEqual(VinMetadataCache.objects.count(), 20)
+
+        with self.assertNumQueries(1):
+            enrichment.enrich_vins(vins)
+        self.assertEqual(len(StubMetadataHandler.hits), 20)
+
+    def test_not_found_is_negatively_cached(self):
+        result = enrichment.enrich_vins(['MISSING0000000001'])
+        self.assertEqual(result['MISSING0000000001'], enrichment.FALLBACK_METADATA)
+        self.assertTrue(VinMetadataCache.objects.get(vin='MISSING0000000001').is_negative)
+
+        enrichment.enrich_vins(['MISSING0000000001'])
+        self.assertEqual(StubMetadataHandler.hits, ['MISSING0000000001'])
+
+    def test_breaker_opens_and_serves_stale_data(self):
+        enrichment.enrich_vins(['BROKEN00000000001'])
+        with override_settings(VIN_METADATA_TTL=0):
+            enrichment.enrich_vins(['WVWZZZ1KZAW000077'])
+
+        with override_settings(VIN_METADATA_URL=f'http://127.0.0.1:{self.server.server_port}/vehicles/BROKEN{{vin}}'):
+            enrichment.enrich_vins(['A0000000000000001', 'A0000000000000002', 'A0000000000000003'])
+            self.assertEqual(enrichment.get_breaker().state, 'open')
+
+            hits_before = len(StubMetadataHandler.hits)
+            result = enrichment.enrich_vins(['WVWZZZ1KZAW000077', 'A0000000000000004'])
+
+        self.assertEqual(len(StubMetadataHandler.hits), hits_before)
+        self.assertEqual(result['WVWZZZ1KZAW000077']['engine'], 'engine-77')
+        self.assertEqual(result['A0000000000000004'], enrichment.FALLBACK_METADATA)
+
+    def test_metadata_view_fetches_only_on_a_cold_cache(self):
+        user = User.objects.create_user(username='meta', email='meta@example.com', password='pw')
+        for i, vin in enumerate(['1HGCM82633A004352', 'WVWZZZ1KZAW000001', '1HGCM82633A00435Q']):
+            Vehicle.objects.create(owner=user, make='Make', model='Model', year=2010 + i, vin=vin)
+        payload = {'engine': '2.0 TSI', 'transmission': 'manual', 'country_of_origin': 'DE'}
+
+        def get_metadata():
+            cache.clear()  # bypass the response cache; only the VIN cache should save the round trips
+            request = APIRequestFactory().get('/')
+            force_authenticate(request, user=user)
+            return VehicleMetadataView.as_view()(request)
+
+        with mock.patch('vehicles.enrichment.get_session') as get_session:
+            get_session.return_value.get.return_value = mock.Mock(status_code=200, json=lambda: payload)
+            cold = get_metadata()
+            # one call per VIN that decodes; the invalid one is never sent upstream
+            self.assertEqual(
+                sorted(c.args[0].rsplit('/', 1)[-1] for c in get_session.return_value.get.call_args_list),
+                ['1HGCM82633A004352', 'WVWZZZ1KZAW000001'],
+            )
+
+            get_session.reset_mock()
+            warm = get_metadata()
+            get_session.return_value.get.assert_not_called()
+
+        self.assertEqual(cold.status_code, 200)
+        self.assertEqual(warm.data, cold.data)
+        by_vin = {row['vin']: row for row in warm.data}
+        self.assertEqual(by_vin['WVWZZZ1KZAW000001']['engine'], '2.0 TSI')
+        self.assertNotIn('engine', by_vin['1HGCM82633A00435Q'])
+
+class VinDecoderTests(SimpleTestCase):
+    def test_batch_decode(self):
+        honda, vw, bad = decode_vins(['1HGCM82633A004352', 'wvwzzz1kzaw000001', '1HGCM82633A00435Q'])
+
+        self.assertEqual(honda['manufacturer'], 'Honda')
+        self.assertEqual(honda['country'], 'United States')
+        self.assertEqual(honda['model_year'], 2003)
+        self.assertTrue(honda['check_digit_valid'])
+
+        self.assertEqual(vw['vin'], 'WVWZZZ1KZAW000001')
+        self.assertEqual(vw['country'], 'Germany')
+        self.assertEqual(vw['model_year'], 2010)
+
+        self.assertFalse(bad['valid'])
+        self.assertIn('invalid characters', bad['errors'][0])
+
+    def test_serializer_rejects_bad_north_american_check_digit(self):
+        serializer = VehicleSerializer()
+        with self.assertRaises(serializers.ValidationError):
+            serializer.validate_vin('1HGCM82613A004352')
+
+class EagerLoadingTests(TestCase):
+    """Every routed list endpoint must cost the same number of queries for 2 rows as for 6."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.staff = User.objects.create_user(username='staff', email='staff@example.com', password='pw', is_staff=True)
+        self.counter = 0
+
+    def _user(self):
+        self.counter += 1
+        return User.objects.create_user(username=f'u{self.counter}', email=f'u{self.counter}@example.com', password='pw')
+
+    def _vehicle(self):
+        self.counter += 1
+        return Vehicle.objects.create(owner=self._user(), make='Make', model='Model', year=2020, vin=f'VIN{self.counter:014d}')
+
+    def _listing(self):
+        return Listing.objects.create(seller=self._user(), title='Car', price=Decimal('100'), currency='EUR', location='Berlin')
+
+    def _create(self, model):
+        n = self.counter = self.counter + 1
+        factories = {
+            Vehicle: self._vehicle,
+            Part: lambda: Part.objects.create(seller=self._user(), name='Part', price=Decimal('10'), vehicle_make='M', vehicle_model='M', vehicle_year=2020),
+            Listing: self._listing,
+            SellerProfile: lambda: SellerProfile.objects.create(user=self._user()),
+            BuyRequest: lambda: BuyRequest.objects.create(buyer=self._user(), listing=self._listing(), offer_price=Decimal('90')),
+            AuctionBid: lambda: AuctionBid.objects.create(bidder=self._user(), listing=self._listing(), amount=Decimal('95')),
+            SellerFeedback: lambda: SellerFeedback.objects.create(seller=self._user(), reviewer=self._user(), rating=4),
+            EVTelemetry: lambda: EVTelemetry.objects.create(vehicle=self._vehicle(), battery_level=50, range_estimate_km=200, location_lat=0, location_lon=0, speed_kph=0),
+            Trip: lambda: Trip.objects.create(vehicle=self._vehicle(), started_at=timezone.now(), ended_at=timezone.now(), start_lat=0, start_lon=0, end_lat=0, end_lon=0, start_battery=50, end_battery=49),
+            ADASCalibration: lambda: ADASCalibration.objects.create(vehicle=self._vehicle(), sensor_type='radar', calibrated_by=self._user(), calibration_date=timezone.now()),
+            FuseBox: lambda: FuseBox.objects.create(vehicle=self._vehicle(), make='M', model='M', year=2020, location='Dash'),
+            WiringDiagram: lambda: WiringDiagram.objects.create(vehicle=self._vehicle(), title='Lights'),
+            SensorReading: lambda: SensorReading.objects.create(vehicle=self._vehicle(), sensor_type='oxygen', value=1.0),
+            OBDDiagnostic: lambda: OBDDiagnostic.objects.create(vehicle=self._vehicle(), dtc_code='P0001', description='x', severity='low'),
+            Sensor: lambda: Sensor.objects.create(name='S', type='speed', location='Wheel'),
+            Acronym: lambda: Acronym.objects.create(short_form=f'A{n}', full_form='Acronym'),
+            LegacyDiagnosticCode: lambda: LegacyDiagnosticCode.objects.create(code=f'C{n}', description='x'),
+            LegacyGuestBlog: lambda: LegacyGuestBlog.objects.create(title=f'Post {n}', slug=f'post-{n}', author='A', content='x'),
+            LegacyCarListing: lambda: LegacyCarListing.objects.create(seller=self._user(), title='Car', price=Decimal('1'), location='X'),
+            LegacySellerFeedback: lambda: LegacySellerFeedback.objects.create(seller=self._user(), reviewer=self._user(), rating=3),
+        }
+        return factories[model]()
+
+    def _list_queries(self, viewset, **params):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.staff)
+        view = viewset.as_view({'get': 'list'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = view(request)
+            response.render()
+        self.assertEqual(response.status_code, 200, response.data)
+        return len(ctx.captured_queries), len(response.data['results'])
+
+    def _nested(self, serializer, prefix=''):
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.BaseSerializer) and not field.write_only:
+                yield f'{prefix}{name}'
+                yield from self._nested(field, f'{prefix}{name}.')
+
+    def test_query_count_is_constant_per_page(self):
+        for prefix, viewset, basename in router.registry:
+            # by default and with every nested object expanded
+            for params in ({}, {'expand': ','.join(self._nested(viewset.serializer_class()))}):
+                with self.subTest(route=prefix, **params):
+                    model = viewset.queryset.model
+                    model.objects.all().delete()
+                    for _ in range(2):
+                        self._create(model)
+                    small, count = self._list_queries(viewset, **params)
+                    self.assertEqual(count, 2)
+
+                    for _ in range(4):
+                        self._create(model)
+                    large, count = self._list_queries(viewset, **params)
+                    self.assertEqual(count, 6)
+                    self.assertEqual(small, large)
+
+    def test_paths_follow_nested_serializers(self):
+        from vehicles.serializers import AuctionBidSerializer, EVTelemetrySerializer
+        self.assertEqual(eager_paths(AuctionBidSerializer), (('bidder', 'listing__seller'), ()))
+        self.assertEqual(eager_paths(EVTelemetrySerializer), (('vehicle__owner',), ()))
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='pager', email='pager@example.com', password='pw')
+        vehicle = Vehicle.objects.create(owner=self.user, make='Tesla', model='Model Y', year=2023, vin='7SAYGDEE5PF000001')
+        base = timezone.now()
+        for i in range(7):
+            reading = SensorReading.objects.create(vehicle=vehicle, sensor_type='oxygen', value=i)
+            # pairs of rows share a timestamp so the id tie-breaker matters
+            SensorReading.objects.filter(pk=reading.pk).update(timestamp=base - timedelta(minutes=i // 2))
+        self.expected = list(SensorReading.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def _get(self, url='/', **params):
+        request = self.factory.get(url, params)
+        force_authenticate(request, user=self.user)
+        return SensorReadingViewSet.as_view({'get': 'list'})(request)
+
+    def _cursor(self, link):
+        return dict(param.split('=', 1) for param in link.split('?', 1)[1].split('&'))['cursor']
+
+    def test_walks_forward_and_back_without_gaps(self):
+        pages = [self._get(page_size=3).data]
+        while pages[-1]['next']:
+            pages.append(self._get(page_size=3, cursor=self._cursor(pages[-1]['next'])).data)
+
+        seen = [row['id'] for page in pages for row in page['results']]
+        self.assertEqual(seen, self.expected)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('count', pages[0])
+
+        back = self._get(page_size=3, cursor=self._cursor(pages[-1]['previous'])).data
+        self.assertEqual([row['id'] for row in back['results']], [row['id'] for row in pages[-2]['results']])
+
+    def test_deep_page_costs_the_same_as_first(self):
+        with CaptureQueriesContext(connection) as first:
+            self._get(page_size=2).render()
+        deep = KeysetPagination().encode_cursor(
+            (SensorReading.objects.get(pk=self.expected[4]).timestamp, self.expected[4]), False
+        )
+        with CaptureQueriesContext(connection) as later:
+            response = self._get(page_size=2, cursor=deep)
+            response.render()
+        self.assertEqual(len(first.captured_queries), len(later.captured_queries))
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[5:7])
+        self.assertFalse(any('COUNT' in q['sql'] for q in later.captured_queries))
+
+    def test_page_number_fallback_and_bad_cursor(self):
+        response = self._get(page=2, page_size=3)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[3:6])
+
+        self.assertEqual(self._get(cursor='not-a-cursor').status_code, 404)
+
+class TelemetryRollupTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='charts', email='charts@example.com', password='pw')
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Kia', model='EV6', year=2023, vin='KNDC4DLC5P5000001')
+        self.t0 = timezone.now().replace(minute=10, second=0, microsecond=0) - timedelta(hours=3)
+
+    def _at(self, ts):
+        return mock.patch('django.utils.timezone.now', return_value=ts)
+
+    def _seed(self):
+        # one reading saved on its own (post_save), two batches through bulk ingest
+        with self._at(self.t0):
+            SensorReading.objects.create(vehicle=self.vehicle, sensor_type='oxygen', value=1.0)
+        with self._at(self.t0 + timedelta(minutes=20)):
+            ingest_rows(SensorReading, SensorReadingIngestSerializer, [
+                {'vehicle_id': self.vehicle.id, 'sensor_type': 'oxygen', 'value': 3.0},
+                {'vehicle_id': self.vehicle.id, 'sensor_type': 'oxygen', 'value': 5.0},
+            ])
+        with self._at(self.t0 + timedelta(hours=1)):
+            ingest_rows(SensorReading, SensorReadingIngestSerializer, [
+                {'vehicle_id': self.vehicle.id, 'sensor_type': 'oxygen', 'value': 10.0},
+            ])
+
+    def test_rollups_are_updated_incrementally_and_match_raw(self):
+        self._seed()
+        hourly = aggregate_series(self.vehicle.id, 'sensor', 'oxygen', '1h')
+        self.assertEqual([(p['count'], p['avg'], p['min'], p['max']) for p in hourly], [(3, 3.0, 1.0, 5.0), (1, 10.0, 10.0, 10.0)])
+        for interval in ('1m', '1h', '1d'):
+            self.assertEqual(
+                aggregate_series(self.vehicle.id, 'sensor', 'oxygen', interval),
+                aggregate_series_raw(self.vehicle.id, 'sensor', 'oxygen', interval),
+            )
+
+    def test_rebuild_reproduces_incremental_rollups(self):
+        self._seed()
+        before = sorted(TelemetryRollup.objects.values_list('interval', 'bucket', 'count', 'sum', 'min', 'max'))
+        TelemetryRollup.objects.all().delete()
+        call_command('rebuild_rollups', stdout=StringIO())
+        after = sorted(TelemetryRollup.objects.values_list('interval', 'bucket', 'count', 'sum', 'min', 'max'))
+        self.assertEqual(before, after)
+
+    def test_api_edits_and_deletes_rebuild_the_affected_days(self):
+        self._seed()
+        view = SensorReadingViewSet.as_view({'patch': 'partial_update', 'delete': 'destroy'})
+        lowest, highest = SensorReading.objects.order_by('value')[0], SensorReading.objects.order_by('-value')[0]
+
+        request = self.factory.patch('/', {'value': 7.0}, format='json')
+        force_authenticate(request, user=self.user)
+        self.assertEqual(view(request, pk=lowest.pk).status_code, 200)
+        request = self.factory.delete('/')
+        force_authenticate(request, user=self.user)
+        self.assertEqual(view(request, pk=highest.pk).status_code, 204)
+
+        for interval in ('1m', '1h', '1d'):
+            self.assertEqual(
+                aggregate_series(self.vehicle.id, 'sensor', 'oxygen', interval),
+                aggregate_series_raw(self.vehicle.id, 'sensor', 'oxygen', interval),
+            )
+        daily = aggregate_series(self.vehicle.id, 'sensor', 'oxygen', '1d', aggs=('max', 'count'))
+        self.assertEqual((max(p['max'] for p in daily), sum(p['count'] for p in daily)), (7.0, 3))
+
+    def test_telemetry_metrics_are_rolled_up(self):
+        with self._at(self.t0):
+            EVTelemetry.objects.create(vehicle=self.vehicle, battery_level=80, range_estimate_km=300, location_lat=0, location_lon=0, speed_kph=40)
+            EVTelemetry.objects.create(vehicle=self.vehicle, battery_level=70, range_estimate_km=280, location_lat=0, location_lon=0, speed_kph=60)
+        daily = aggregate_series(self.vehicle.id, 'telemetry', 'speed_kph', '1d')
+        self.assertEqual((daily[0]['avg'], daily[0]['count']), (50.0, 2))
+
+    def test_endpoint(self):
+        self._seed()
+        request = self.factory.get('/', {
+            'vehicle': self.vehicle.id, 'sensor_type': 'oxygen', 'interval': '1h', 'agg': 'avg,count',
+            'from': (self.t0 - timedelta(hours=1)).isoformat(),
+        })
+        force_authenticate(request, user=self.user)
+        response = TelemetryAggregateView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(p) for p in response.data['points']], [{'bucket', 'avg', 'count'}] * 2)
+        self.assertEqual([p['count'] for p in response.data['points']], [3, 1])
+
+        stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='pw')
+        request = self.factory.get('/', {'vehicle': self.vehicle.id, 'sensor_type': 'oxygen'})
+        force_authenticate(request, user=stranger)
+        self.assertEqual(TelemetryAggregateView.as_view()(request).status_code, 404)
+
+        request = self.factory.get('/', {'vehicle': self.vehicle.id, 'sensor_type': 'oxygen', 'interval': '1m', 'from': '2000-01-01T00:00:00'})
+        force_authenticate(request, user=self.user)
+        self.assertEqual(TelemetryAggregateView.as_view()(request).status_code, 400)
+
+def reference_lttb(points, threshold):
+    # Straightforward scalar LTTB used to check the vectorised version.
+    n = len(points)
+    every = (n - 2) / (threshold - 2)
+    keep, a = [0], 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            next_start, next_end = n - 1, n
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / (next_end - next_start)
+        areas = [
+            abs((points[a][0] - avg_x) * (points[j][1] - points[a][1]) - (points[a][0] - points[j][0]) * (avg_y - points[a][1]))
+            for j in range(start, end)
+        ]
+        a = start + areas.index(max(areas))
+        keep.append(a)
+    return keep + [n - 1]
+
+class DownsampleTests(SimpleTestCase):
+    def setUp(self):
+        self.points = [(float(i), float((i * 7919) % 101)) for i in range(1000)]
+
+    def test_matches_reference_implementation(self):
+        for threshold in (3, 10, 97, 500):
+            x, y = zip(*self.points)
+            self.assertEqual(list(lttb_indices(x, y, threshold)), reference_lttb(self.points, threshold))
+
+    def test_spike_survives_and_small_input_is_untouched(self):
+        y = [0.0] * 5000
+        y[3210] = 100.0
+        keep = lttb_indices(range(5000), y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertIn(3210, keep)
+        self.assertEqual(list(lttb_indices([1, 2, 3], [1, 2, 3], 50)), [0, 1, 2])
+
+class SensorChartDownsampleTests(TestCase):
+    def test_downsample_limits_points_per_series(self):
+        user = User.objects.create_user(username='chart', email='chart@example.com', password='pw')
+        vehicle = Vehicle.objects.create(owner=user, make='BMW', model='i4', year=2022, vin='WBY73AW05NFM00001')
+        ingest_rows(SensorReading, SensorReadingIngestSerializer, [
+            {'vehicle_id': vehicle.id, 'sensor_type': sensor, 'value': i % 13}
+            for sensor in ('oxygen', 'speed') for i in range(300)
+        ])
+        request = APIRequestFactory().get('/', {'downsample': 20})
+        response = SensorChartView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 40)
+        self.assertEqual({row['vehicle'] for row in response.data}, {str(vehicle)})
+
+        request = APIRequestFactory().get('/', {'downsample': 1})
+        self.assertEqual(SensorChartView.as_view()(request).status_code, 400)
+
+    def test_non_integer_vehicle_is_a_bad_request(self):
+        for view in (SensorChartView, SensorChartAPIView):
+            for params in ({'vehicle': 'abc'}, {'vehicle': 'abc', 'downsample': 20, 'sensor_type': 'oxygen'}):
+                request = APIRequestFactory().get('/', params, HTTP_IF_NONE_MATCH='*')
+                response = view.as_view()(request)
+                self.assertEqual(response.status_code, 400, (view, params))
+                self.assertIn('vehicle', response.data['error'])
+
+class VehicleLiveStateTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='fleet', email='fleet@example.com', password='pw', is_staff=True)
+        self.berlin = Vehicle.objects.create(owner=self.user, make='VW', model='ID.4', year=2022, vin='WVGZZZE2ZNP000001')
+        self.fiji = Vehicle.objects.create(owner=self.user, make='Nissan', model='Leaf', year=2020, vin='SJNFAAZE1U0000001')
+
+    def _telemetry(self, vehicle, battery, lat, lon):
+        return {'vehicle_id': vehicle.id, 'battery_level': battery, 'range_estimate_km': battery * 4,
+                'location_lat': lat, 'location_lon': lon, 'speed_kph': 0}
+
+    def test_single_and_bulk_writes_keep_latest(self):
+        first = self._telemetry(self.berlin, 90, 52.5, 13.4)
+        EVTelemetry.objects.create(vehicle=self.berlin, **{k: v for k, v in first.items() if k != 'vehicle_id'})
+        ingest_rows(EVTelemetry, EVTelemetryIngestSerializer, [
+            self._telemetry(self.berlin, 80, 52.5, 13.4),
+            self._telemetry(self.berlin, 75, 52.6, 13.5),
+            self._telemetry(self.fiji, 60, -17.7, 178.1),
+        ])
+        self.assertEqual(VehicleLiveState.objects.get(pk=self.berlin.pk).battery_level, 75)
+        self.assertEqual(VehicleLiveState.objects.count(), 2)
+
+        # an older reading arriving late does not win
+        late = self._telemetry(self.berlin, 10, 0, 0)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() - timedelta(days=1)):
+            EVTelemetry.objects.create(vehicle=self.berlin, **{k: v for k, v in late.items() if k != 'vehicle_id'})
+        self.assertEqual(VehicleLiveState.objects.get(pk=self.berlin.pk).battery_level, 75)
+
+        before = sorted(VehicleLiveState.objects.values_list('vehicle_id', 'telemetry_id'))
+        call_command('rebuild_live_state', stdout=StringIO())
+        self.assertEqual(sorted(VehicleLiveState.objects.values_list('vehicle_id', 'telemetry_id')), before)
+
+    def test_fleet_endpoint_with_bbox(self):
+        ingest_rows(EVTelemetry, EVTelemetryIngestSerializer, [
+            self._telemetry(self.berlin, 80, 52.5, 13.4),
+            self._telemetry(self.fiji, 60, -17.7, 178.1),
+        ])
+
+        def fleet(**params):
+            request = self.factory.get('/', params)
+            force_authenticate(request, user=self.user)
+            with CaptureQueriesContext(connection) as ctx:
+                response = FleetStatusView.as_view()(request)
+            self.assertEqual(len(ctx.captured_queries), 1)
+            return [row['vin'] for row in response.data['vehicles']]
+
+        self.assertEqual(fleet(), [self.berlin.vin, self.fiji.vin])
+        self.assertEqual(fleet(bbox='5,45,20,55'), [self.berlin.vin])
+        self.assertEqual(fleet(bbox='170,-20,-170,-10'), [self.fiji.vin])
+
+class TelemetryGeoTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='geo', email='geo@example.com', password='pw', is_staff=True)
+        self.vehicles = [
+            Vehicle.objects.create(owner=self.user, make='VW', model='ID.4', year=2022, vin=f'WVGZZZE2ZNP00000{i}')
+            for i in range(4)
+        ]
+        berlin, potsdam, hamburg, fiji = self.vehicles
+        ingest_rows(EVTelemetry, EVTelemetryIngestSerializer, [
+            self._telemetry(berlin, 52.5200, 13.4050),
+            self._telemetry(berlin, 52.5300, 13.4100),
+            self._telemetry(potsdam, 52.3906, 13.0645),
+            self._telemetry(hamburg, 53.5511, 9.9937),
+            self._telemetry(fiji, -17.7134, 178.0650),
+        ])
+
+    def _telemetry(self, vehicle, lat, lon):
+        return {'vehicle_id': vehicle.id, 'battery_level': 50, 'range_estimate_km': 200,
+                'location_lat': lat, 'location_lon': lon, 'speed_kph': 0}
+
+    def _query(self, **params):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.user)
+        return TelemetryGeoView.as_view()(request)
+
+    def test_encoding_and_cover(self):
+        self.assertEqual(encode(57.64911, 10.40744)[:9], 'u4pruydqq')
+        self.assertTrue(all(t.geohash for t in EVTelemetry.objects.all()))
+        single = EVTelemetry.objects.create(vehicle=self.vehicles[0], battery_level=1, range_estimate_km=1,
+                                            location_lat=52.52, location_lon=13.405, speed_kph=0)
+        self.assertEqual(single.geohash, encode(52.52, 13.405))
+
+        prefixes = covering_prefixes(13.0, 52.3, 13.5, 52.6)
+        self.assertLessEqual(len(prefixes), 32)
+        self.assertTrue(any(encode(52.52, 13.405).startswith(p) for p in prefixes))
+        self.assertAlmostEqual(float(haversine_km(52.52, 13.405, [53.5511], [9.9937])[0]), 255, delta=2)
+
+    def test_radius_bbox_and_nearest(self):
+        berlin, potsdam, hamburg, fiji = self.vehicles
+
+        response = self._query(lat=52.52, lon=13.405, radius_km=30)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['vehicle'] for r in response.data['results']], [berlin.id, potsdam.id])
+        self.assertEqual(response.data['results'][0]['distance_km'], 0)
+
+        response = self._query(bbox='170,-20,-170,-10')
+        self.assertEqual([r['vehicle'] for r in response.data['results']], [fiji.id])
+        response = self._query(bbox='5,50,15,55')
+        self.assertEqual({r['vehicle'] for r in response.data['results']}, {berlin.id, potsdam.id, hamburg.id})
+
+        response = self._query(lat=52.52, lon=13.405, k=3)
+        self.assertEqual([r['vehicle'] for r in response.data['results']], [berlin.id, potsdam.id, hamburg.id])
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(hours=2)):
+            self.assertEqual(self._query(lat=52.52, lon=13.405, k=3).data['count'], 0)
+        self.assertEqual(self._query(lat=52.52, lon=13.405).status_code, 400)
+        self.assertEqual(self._query(lat=95, lon=0, k=1).status_code, 400)
+        for bbox in ('-inf,0,10,10', '0,nan,10,10', '-200,0,10,10', '0,0,10,91', '0,0,10'):
+            self.assertEqual(self._query(bbox=bbox).status_code, 400, bbox)
+
+    def test_backfill_command(self):
+        EVTelemetry.objects.update(geohash='')
+        call_command('backfill_geohash', stdout=StringIO())
+        for t in EVTelemetry.objects.all():
+            self.assertEqual(t.geohash, encode(t.location_lat, t.location_lon))
+
+class TripSegmentationTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='driver', email='driver@example.com', password='pw')
+        self.vehicle = Vehicle.objects.create(owner=self.owner, make='Tesla', model='Model 3', year=2021, vin='5YJ3E1EA7MF000001')
+        self.t0 = timezone.now() - timedelta(hours=3)
+
+    def _reading(self, minute, speed, lat=52.0, battery=80):
+        with mock.patch('django.utils.timezone.now', return_value=self.t0 + timedelta(minutes=minute)):
+            return EVTelemetry.objects.create(vehicle=self.vehicle, battery_level=battery, range_estimate_km=300,
+                                              location_lat=lat, location_lon=13.0, speed_kph=speed)
+
+    def _trips(self):
+        return list(Trip.objects.filter(vehicle=self.vehicle).order_by('started_at').values_list(
+            'started_at', 'ended_at', 'reading_count', 'distance_km', 'start_battery', 'end_battery'))
+
+    def test_incremental_segmentation_matches_rebuild(self):
+        self._reading(0, 0)
+        self._reading(1, 30, lat=52.00, battery=80)
+        self._reading(2, 40, lat=52.01, battery=79)
+        self._reading(3, 50, lat=52.02, battery=78)
+        self.assertEqual(segment_vehicle(self.vehicle.id), (4, 0))
+        trip = Trip.objects.get()
+        self.assertTrue(trip.is_open)
+        self.assertEqual(trip.reading_count, 3)
+        self.assertAlmostEqual(trip.distance_km, 2.22, places=1)
+
+        # only readings after the checkpoint are read, and the open trip is extended
+        self._reading(4, 0, lat=52.03)
+        self._reading(5, 45, lat=52.03, battery=77)
+        self.assertEqual(segment_vehicle(self.vehicle.id), (2, 0))
+        self.assertEqual(Trip.objects.get().reading_count, 4)
+
+        # a gap longer than TRIP_STOP_GAP starts a new trip; a lone moving reading is noise
+        self._reading(20, 35, lat=52.10)
+        self._reading(40, 25, lat=52.20)
+        self._reading(41, 25, lat=52.21)
+        self.assertEqual(segment_vehicle(self.vehicle.id), (3, 1))
+        self.assertEqual(TripCheckpoint.objects.get().last_timestamp, self.t0 + timedelta(minutes=41))
+
+        totals = segment_trips()
+        self.assertEqual(totals['readings'], 0)
+        incremental = self._trips()
+        self.assertEqual([t[2] for t in incremental], [4, 2])
+        self.assertFalse(Trip.objects.filter(is_open=True).exists())
+
+        segment_trips(rebuild=True)
+        self.assertEqual(self._trips(), incremental)
+
+    def test_trip_list_is_scoped_to_owner(self):
+        for minute, lat in ((0, 52.0), (1, 52.01), (2, 52.02)):
+            self._reading(minute, 60, lat=lat)
+        call_command('segment_trips', stdout=StringIO())
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        view = TripViewSet.as_view({'get': 'list'})
+
+        request = APIRequestFactory().get('/', {'vehicle': self.vehicle.id})
+        force_authenticate(request, user=self.owner)
+        results = view(request).data['results']
+        self.assertEqual(len(results), 1)
+        self.assertAlmostEqual(results[0]['avg_speed_kph'], 66.7, delta=1)
+        self.assertEqual(results[0]['battery_used'], 0)
+
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=other)
+        self.assertEqual(view(request).data['results'], [])
+
+class BatteryAlertTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='alerts', email='alerts@example.com', password='pw')
+        self.vehicle = Vehicle.objects.create(owner=self.owner, make='Kia', model='EV6', year=2023, vin='KNDC3DLC5P5000001')
+        self.t0 = timezone.now()
+
+    def _ingest(self, *levels, start=0):
+        rows = [
+            {'vehicle_id': self.vehicle.id, 'battery_level': level, 'range_estimate_km': level * 4,
+             'location_lat': 0, 'location_lon': 0, 'speed_kph': 0}
+            for level in levels
+        ]
+        with mock.patch('django.utils.timezone.now', return_value=self.t0 + timedelta(minutes=start)):
+            ingest_rows(EVTelemetry, EVTelemetryIngestSerializer, rows)
+
+    def _alerts(self):
+        return EmailOutbox.objects.filter(subject__startswith='Low Battery Alert').count()
+
+    def test_alerts_once_per_crossing_with_hysteresis_and_cooldown(self):
+        self._ingest(30, 19, 18, 17, 21, 19)
+        self.assertEqual(len(mail.outbox), 0)  # delivery is left to the outbox worker
+        self.assertEqual(self._alerts(), 1)
+        outbox = EmailOutbox.objects.get(subject__startswith='Low Battery Alert')
+        self.assertEqual(outbox.to, ['alerts@example.com'])
+        self.assertIn('19', outbox.body)
+        self.assertTrue(BatteryAlertState.objects.get(pk=self.vehicle.pk).is_low)
+
+        # recovering above LOW_BATTERY_CLEAR re-arms, but the cooldown still applies
+        self._ingest(30, 15, start=10)
+        self.assertEqual(self._alerts(), 1)
+        self._ingest(30, 15, start=120)
+        self.assertEqual(self._alerts(), 2)
+
+    def test_crossing_during_cooldown_alerts_once_it_ends(self):
+        self._ingest(30, 15)
+        self._ingest(30, 15, start=10)  # re-crossed inside the cooldown: held back
+        self.assertEqual(self._alerts(), 1)
+        self.assertTrue(BatteryAlertState.objects.get(pk=self.vehicle.pk).alert_pending)
+
+        self._ingest(14, start=30)
+        self.assertEqual(self._alerts(), 1)
+        self._ingest(12, 11, start=70)
+        self.assertEqual(self._alerts(), 2)
+        self.assertIn('12', EmailOutbox.objects.filter(subject__startswith='Low Battery Alert').latest('id').body)
+
+        # recovering drops a held-back alert
+        self._ingest(30, 15, start=80)
+        self._ingest(30, start=90)
+        self._ingest(30, start=200)
+        self.assertEqual(self._alerts(), 2)
+        self.assertFalse(BatteryAlertState.objects.get(pk=self.vehicle.pk).alert_pending)
+
+    def test_single_saves_share_the_state(self):
+        for level in (50, 10, 10, 10):
+            EVTelemetry.objects.create(vehicle=self.vehicle, battery_level=level, range_estimate_km=1,
+                                       location_lat=0, location_lon=0, speed_kph=0)
+        self.assertEqual(self._alerts(), 1)
+        self.assertEqual(BatteryAlertState.objects.get(pk=self.vehicle.pk).last_level, 10)
+
+class SellerRatingTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pw')
+        self.other = User.objects.create_user(username='seller2', email='seller2@example.com', password='pw')
+        self.reviewer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pw')
+        self.profile = SellerProfile.objects.create(user=self.seller)
+        self.other_profile = SellerProfile.objects.create(user=self.other)
+
+    def _totals(self, profile):
+        profile.refresh_from_db()
+        return profile.rating_sum, profile.rating_count, profile.rating
+
+    def test_create_update_delete_are_single_updates(self):
+        first = SellerFeedback.objects.create(seller=self.seller, reviewer=self.reviewer, rating=5)
+        LegacySellerFeedback.objects.create(seller=self.seller, reviewer=self.reviewer, rating=2)
+        with CaptureQueriesContext(connection) as ctx:
+            SellerFeedback.objects.create(seller=self.seller, reviewer=self.reviewer, rating=4)
+        statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 2)  # INSERT + UPDATE, independent of review count
+        self.assertEqual(self._totals(self.profile), (11, 3, 3.67))
+
+        first.rating = 1
+        first.save()
+        self.assertEqual(self._totals(self.profile), (7, 3, 2.33))
+
+        first.seller = self.other
+        first.save()
+        self.assertEqual(self._totals(self.profile), (6, 2, 3.0))
+        self.assertEqual(self._totals(self.other_profile), (1, 1, 1.0))
+
+        SellerFeedback.objects.filter(seller=self.seller).delete()
+        LegacySellerFeedback.objects.all().delete()
+        self.assertEqual(self._totals(self.profile), (0, 0, 0.0))
+
+    def test_reconcile_command_and_late_profiles(self):
+        late_seller = User.objects.create_user(username='late', email='late@example.com', password='pw')
+        SellerFeedback.objects.create(seller=late_seller, reviewer=self.reviewer, rating=3)
+        self.assertEqual(SellerProfile.objects.create(user=late_seller).rating_count, 1)
+
+        SellerFeedback.objects.bulk_create([SellerFeedback(seller=self.seller, reviewer=self.reviewer, rating=r) for r in (5, 4)])
+        LegacySellerFeedback.objects.bulk_create([LegacySellerFeedback(seller=self.seller, reviewer=self.reviewer, rating=3)])
+        out = StringIO()
+        call_command('reconcile_seller_ratings', '--dry-run', stdout=out)
+        self.assertIn('1 seller profile(s) out of date', out.getvalue())
+        self.assertEqual(self._totals(self.profile), (0, 0, 0.0))
+
+        # Deleting an uncounted row recomputes the seller rather than going negative.
+        SellerFeedback.objects.create(seller=self.seller, reviewer=self.reviewer, rating=1)
+        SellerFeedback.objects.filter(rating=5).get().delete()
+        self.assertEqual(self._totals(self.profile), (8, 3, 2.67))
+        SellerFeedback.objects.create(seller=self.seller, reviewer=self.reviewer, rating=5)
+        SellerFeedback.objects.filter(rating=1).delete()
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('reconcile_seller_ratings', stdout=StringIO())
+        self.assertEqual(len(ctx.captured_queries), 2)  # drift count + one UPDATE
+        self.assertEqual(self._totals(self.profile), (12, 3, 4.0))
+        self.assertEqual(self._totals(self.other_profile), (0, 0, 0.0))
+
+@override_settings(RESPONSE_CACHE_SHARED=True)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        response_cache.reset_metrics()
+        self.factory = APIRequestFactory()
+        self.staff = User.objects.create_user(username='staff', email='staff@example.com', password='pw', is_staff=True)
+        Acronym.objects.create(short_form='ABS', full_form='Anti-lock Braking System')
+
+    def _get(self, view, user=None, **params):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=user or self.staff)
+        with CaptureQueriesContext(connection) as ctx:
+            response = view(request)
+            response.render()
+        return response, len(ctx.captured_queries)
+
+    def test_list_is_served_from_cache_until_a_write(self):
+        view = AcronymViewSet.as_view({'get': 'list'})
+        first, _ = self._get(view)
+        second, queries = self._get(view)
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(queries, 1)  # only the ETag aggregate
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self._get(view, short_form='X')[0]['X-Cache'], 'MISS')  # query string is part of the key
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Acronym.objects.create(short_form='TPMS', full_form='Tyre Pressure Monitoring System')
+        self.assertEqual(len(callbacks), 1)  # bumped again once committed
+        response, _ = self._get(view)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 2)
+
+        # Bulk writes skip post_save; callers bump the generation themselves.
+        Acronym.objects.update(full_form='changed')
+        self.assertEqual(self._get(view)[0]['X-Cache'], 'HIT')
+        response_cache.bump(Acronym)
+        response, _ = self._get(view)
+        self.assertEqual({row['full_form'] for row in response.data['results']}, {'changed'})
+
+    def test_vehicle_dropdown_is_cached_per_user_through_the_router(self):
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        Vehicle.objects.create(owner=owner, make='Kia', model='EV6', year=2023, vin='KNDC3DLC5P5000001')
+        Vehicle.objects.create(owner=self.staff, make='VW', model='ID.3', year=2021, vin='WVWZZZE1ZMP000001')
+        client = APIClient()
+        url = reverse('vehicle-dropdown')
+
+        client.force_authenticate(owner)
+        first = client.get(url, secure=True)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([row['make'] for row in first.json()], ['Kia'])
+        self.assertEqual(client.get(url, secure=True)['X-Cache'], 'HIT')
+
+        client.force_authenticate(self.staff)
+        response = client.get(url, secure=True)
+        self.assertEqual((response['X-Cache'], len(response.json())), ('MISS', 2))
+        self.assertFalse(client.get(reverse('vehicle-list'), secure=True).has_header('X-Cache'))
+
+        Vehicle.objects.create(owner=owner, make='Kia', model='Niro', year=2022, vin='KNDCE3LG5N5000001')
+        response = client.get(url, secure=True)
+        self.assertEqual((response['X-Cache'], len(response.json())), ('MISS', 3))
+
+    def test_errors_are_not_cached_and_per_user_views_vary(self):
+        self.assertEqual(self._get(FuseBoxLookupView.as_view())[0].status_code, 400)
+        self.assertEqual(self._get(FuseBoxLookupView.as_view())[0].status_code, 400)
+        self.assertEqual(response_cache.metrics()['vehicles.views.FuseBoxLookupView']['misses'], 2)
+
+        seller = User.objects.create_user(username='seller', email='seller@example.com', password='pw', role='seller')
+        Vehicle.objects.create(owner=seller, make='Kia', model='EV6', year=2023, vin='BADVIN')
+        Vehicle.objects.create(owner=self.staff, make='VW', model='ID.3', year=2021, vin='BADVIN2')
+        view = VehicleMetadataView.as_view()
+        self.assertEqual([row['make'] for row in self._get(view, user=seller)[0].data], ['Kia'])
+        self.assertEqual(len(self._get(view)[0].data), 2)
+        self.assertEqual([row['make'] for row in self._get(view, user=seller)[0].data], ['Kia'])
+
+        report = self._get(ResponseCacheMetricsView.as_view())[0].data
+        entry = report['views']['vehicles.views.VehicleMetadataView']
+        self.assertEqual((entry['hits'], entry['misses'], entry['hit_ratio']), (1, 2, 0.3333))
+        self.assertIn('vehicles.vehicle', report['generations'])
+        self.assertEqual(self._get(ResponseCacheMetricsView.as_view(), user=seller)[0].status_code, 403)
+
+@override_settings(RESPONSE_CACHE_SHARED=True)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='etag', email='etag@example.com', password='pw')
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Nissan', model='Leaf', year=2019, vin='SJNFAAZE0U0000001')
+        OBDDiagnostic.objects.create(vehicle=self.vehicle, dtc_code='P0A80', description='Battery pack', severity='high')
+
+    def _get(self, view, etag=None, **params):
+        request = self.factory.get('/', params, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+        force_authenticate(request, user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = view(request)
+            response.render()
+        return response, ctx.captured_queries
+
+    def test_unchanged_list_is_304_without_serializing(self):
+        view = OBDDiagnosticViewSet.as_view({'get': 'list'})
+        response, _ = self._get(view)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with mock.patch.object(OBDDiagnosticSerializer, 'to_representation', side_effect=AssertionError):
+            response, queries = self._get(view, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('MAX', queries[0]['sql'])
+
+        self.assertEqual(self._get(view, etag, severity='high')[0].status_code, 200)  # filters are part of the tag
+        # an edit to a nested object (the vehicle's owner) moves its generation
+        self.user.email = 'renamed@example.com'
+        self.user.save()
+        response, _ = self._get(view, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['vehicle'], self.vehicle.pk)
+        response, _ = self._get(view, expand='vehicle.owner')
+        self.assertEqual(response.data['results'][0]['vehicle']['owner']['email'], 'renamed@example.com')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_append_only_tables_skip_count_and_track_api_edits(self):
+        reading = SensorReading.objects.create(vehicle=self.vehicle, sensor_type='oxygen', value=1.0)
+        view = SensorReadingViewSet.as_view({'get': 'list'})
+        response, queries = self._get(view)
+        etag = response['ETag']
+        self.assertFalse(any('COUNT' in q['sql'] for q in queries))
+        self.assertEqual(self._get(view, etag)[0].status_code, 304)
+
+        ingest_rows(SensorReading, SensorReadingIngestSerializer, [{'vehicle_id': self.vehicle.pk, 'sensor_type': 'oxygen', 'value': 2.0}])
+        response, _ = self._get(view, etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        request = self.factory.patch('/', {'value': 9.5}, format='json')
+        force_authenticate(request, user=self.user)
+        update = SensorReadingViewSet.as_view({'patch': 'partial_update'})
+        self.assertEqual(update(request, pk=reading.pk).status_code, 200)
+        self.assertEqual(self._get(view, etag)[0].status_code, 200)
+
+    @override_settings(RESPONSE_CACHE_SHARED=False)
+    def test_tags_come_from_the_database_without_a_shared_cache(self):
+        view = OBDDiagnosticViewSet.as_view({'get': 'list'})
+        response, queries = self._get(view)
+        etag = response['ETag']
+        self.assertEqual(len([q for q in queries if 'MAX' in q['sql']]), 1)
+        self.assertEqual(self._get(view, etag)[0].status_code, 304)
+
+        # Generations are per process here; what moves the tag is updated_at, in place or on a nested row.
+        with mock.patch('vehicles.conditional.generations', side_effect=AssertionError):
+            diagnostic = OBDDiagnostic.objects.get()
+            diagnostic.severity = 'low'
+            diagnostic.save()
+            response, _ = self._get(view, etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+            self.user.email = 'moved@example.com'
+            self.user.save()
+            self.assertEqual(self._get(view, etag)[0].status_code, 200)
+
+        request = self.factory.get('/')
+        force_authenticate(request, user=self.user)
+        self.assertTrue(VehicleMetadataView.as_view()(request).has_header('ETag'))
+
+    def test_plain_api_views(self):
+        FuseBox.objects.create(vehicle=self.vehicle, make='Nissan', model='Leaf', year=2019, location='Dash')
+        view = FuseBoxLookupView.as_view()
+        response, _ = self._get(view)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('ETag'))
+
+        params = {'make': 'Nissan', 'model': 'Leaf', 'year': 2019}
+        etag = self._get(view, **params)[0]['ETag']
+        self.assertEqual(self._get(view, etag, **params)[0].status_code, 304)
+        self.assertEqual(self._get(view, f'"other", {etag}', **params)[0].status_code, 304)
+        FuseBox.objects.create(make='Nissan', model='Leaf', year=2019, location='Boot')
+        self.assertEqual(self._get(view, etag, **params)[0].status_code, 200)
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='sparse', email='sparse@example.com', password='pw')
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Kia', model='EV6', year=2022, vin='KNDC3DLC5N0000001')
+        for level in (80, 70, 60):
+            EVTelemetry.objects.create(vehicle=self.vehicle, battery_level=level, range_estimate_km=300, location_lat=0, location_lon=0, speed_kph=50)
+
+    def _list(self, **params):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = EVTelemetryViewSet.as_view({'get': 'list'})(request)
+            response.render()
+        self.assertEqual(response.status_code, 200)
+        return response.data, [q['sql'] for q in ctx.captured_queries]
+
+    def test_nested_objects_are_ids_until_expanded(self):
+        data, queries = self._list()
+        self.assertEqual(data['results'][0]['vehicle'], self.vehicle.pk)
+        self.assertFalse(any('accounts_customuser' in sql for sql in queries))
+
+        data, _ = self._list(expand='vehicle')
+        self.assertEqual(data['results'][0]['vehicle']['make'], 'Kia')
+        self.assertEqual(data['results'][0]['vehicle']['owner'], self.user.pk)  # shallow
+
+        data, _ = self._list(expand='vehicle.owner')
+        self.assertEqual(data['results'][0]['vehicle']['owner']['email'], 'sparse@example.com')
+
+    def test_fields_narrow_the_payload_and_the_select(self):
+        data, queries = self._list(fields='id,battery_level')
+        self.assertEqual([set(row) for row in data['results']], [{'id', 'battery_level'}] * 3)
+        self.assertEqual([row['battery_level'] for row in data['results']], [60, 70, 80])
+        select = next(sql for sql in queries if 'FROM "vehicles_evtelemetry"' in sql and 'MAX' not in sql)
+        self.assertNotIn('speed_kph', select)
+        self.assertIn('"timestamp"', select)  # the keyset cursor still reads it
+
+        data, queries = self._list(fields='id,vehicle.make', expand='vehicle')
+        self.assertEqual(data['results'][0], {'id': data['results'][0]['id'], 'vehicle': {'make': 'Kia'}})
+        select = next(sql for sql in queries if 'INNER JOIN "vehicles_vehicle"' in sql)
+        self.assertNotIn('"vin"', select)
+
+class FastListTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='fast', email='fäst@example.com', password='pw')
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Škoda', model='Enyaq', year=2023, vin='TMBJC7NY0P0000001')
+        for i, value in enumerate((0.1, 1e16, -3.0, 42.5)):
+            SensorReading.objects.create(vehicle=self.vehicle, sensor_type=f'lambda {i}', value=value)
+            EVTelemetry.objects.create(vehicle=self.vehicle, battery_level=i, range_estimate_km=value, location_lat=1.5, location_lon=-2.25, speed_kph=0)
+
+    def _content(self, viewset, **params):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.user)
+        response = viewset.as_view({'get': 'list'})(request)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_output_is_byte_identical_to_the_serializer(self):
+        cases = [{}, {'expand': 'vehicle'}, {'fields': 'id,value,vehicle.make', 'expand': 'vehicle'}, {'page_size': 2}, {'page': 1}]
+        for viewset, serializer_class in ((SensorReadingViewSet, SensorReadingSerializer), (EVTelemetryViewSet, EVTelemetrySerializer)):
+            for params in cases:
+                with self.subTest(viewset=viewset.__name__, **params):
+                    with override_settings(FAST_LIST_ENABLED=False):
+                        expected = self._content(viewset, **params)
+                    with mock.patch.object(serializer_class, 'to_representation', side_effect=AssertionError):
+                        self.assertEqual(self._content(viewset, **params), expected)
+            with override_settings(TIME_ZONE='America/Caracas'):
+                with override_settings(FAST_LIST_ENABLED=False):
+                    expected = self._content(viewset)
+                self.assertEqual(self._content(viewset), expected)
+            # the owner's get_full_name is a method: served by the serializer, same bytes either way
+            with override_settings(FAST_LIST_ENABLED=False):
+                expected = self._content(viewset, expand='vehicle.owner')
+            self.assertEqual(self._content(viewset, expand='vehicle.owner'), expected)
+
+    def test_keyset_cursor_from_row_dicts(self):
+        first = json.loads(self._content(SensorReadingViewSet, page_size=3))
+        cursor = dict(param.split('=', 1) for param in first['next'].split('?', 1)[1].split('&'))['cursor']
+        second = json.loads(self._content(SensorReadingViewSet, page_size=3, cursor=cursor))
+        with override_settings(FAST_LIST_ENABLED=False):
+            self.assertEqual(json.loads(self._content(SensorReadingViewSet, page_size=3, cursor=cursor)), second)
+        self.assertEqual(len(first['results']) + len(second['results']), 4)
+
+    def test_plan_falls_back_for_fields_it_cannot_express(self):
+        from vehicles.fastpath import ListPlan
+        self.assertIsNone(ListPlan.compile(TripSerializer()))  # duration_seconds is a property
+        self.assertIsNone(ListPlan.compile(SensorReadingSerializer()))  # nests the owner's get_full_name
+        self.assertIsNotNone(ListPlan.compile(AcronymSerializer()))
+
+class SeriesRendererTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='columns', email='columns@example.com', password='pw')
+        vehicle = Vehicle.objects.create(owner=self.user, make='BMW', model='i3', year=2018, vin='WBY1Z4C50JV000001')
+        for level in (90, 80):
+            EVTelemetry.objects.create(vehicle=vehicle, battery_level=level, range_estimate_km=150, location_lat=0, location_lon=0, speed_kph=30)
+
+    def _get(self, accept=None, **params):
+        request = self.factory.get('/', params, **({'HTTP_ACCEPT': accept} if accept else {}))
+        force_authenticate(request, user=self.user)
+        response = EVTelemetryViewSet.as_view({'get': 'list'})(request)
+        response.render()
+        return response
+
+    def test_columnar_json_by_format_or_accept(self):
+        rows = json.loads(self._get().content)['results']
+        response = self._get(format='columnar', fields='id,battery_level,timestamp')
+        self.assertEqual(response['Content-Type'], 'application/vnd.columnar+json')
+        columns = json.loads(response.content)['results']
+        self.assertEqual(list(columns), ['id', 'battery_level', 'timestamp'])
+        self.assertEqual(columns['battery_level'], [row['battery_level'] for row in rows])
+
+        by_accept = self._get(accept='application/vnd.columnar+json', fields='id,battery_level,timestamp')
+        self.assertEqual(json.loads(by_accept.content), json.loads(response.content))
+        self.assertIn('Accept', by_accept['Vary'])
+        self.assertNotEqual(by_accept['ETag'], self._get(fields='id,battery_level,timestamp')['ETag'])
+
+    def test_to_columns_fills_missing_keys(self):
+        from vehicles.renderers import to_columns
+        self.assertEqual(to_columns([{'a': 1}, {'a': 2, 'b': 3}]), {'a': [1, 2], 'b': [None, 3]})
+        self.assertEqual(to_columns([]), {})
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed (see requirements.txt)")
+    def test_msgpack(self):
+        response = self._get(format='msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content), json.loads(self._get().content))
@@ -0,0 +1,121 @@
+"""
+Incremental trip segmentation over EVTelemetry.
+
+Each vehicle's readings are walked in (timestamp, id) order from its
+TripCheckpoint onwards. Readings at or above TRIP_MOVING_SPEED_KPH belong to
+a trip; a trip ends once no moving reading follows within TRIP_STOP_GAP
+seconds. The most recent trip stays `is_open` so the next run can extend it
+instead of rescanning: every run reads only the readings added since the
+previous one.
+
+Readings that arrive with a timestamp before the checkpoint are not picked
+up; `segment_trips(rebuild=True)` recomputes everything from scratch.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .geo import haversine_km
+from .models import EVTelemetry, Trip, TripCheckpoint, VehicleLiveState
+
+READING_FIELDS = ('id', 'timestamp', 'location_lat', 'location_lon', 'speed_kph', 'battery_level')
+
+def _settings():
+    return settings.TRIP_MOVING_SPEED_KPH, timedelta(seconds=settings.TRIP_STOP_GAP), settings.TRIP_MIN_READINGS
+
+def _readings(vehicle_id, checkpoint, chunk_size):
+    queryset = EVTelemetry.objects.filter(vehicle_id=vehicle_id)
+    if checkpoint is not None:
+        queryset = queryset.filter(
+            Q(timestamp__gt=checkpoint.last_timestamp)
+            | Q(timestamp=checkpoint.last_timestamp, id__gt=checkpoint.last_telemetry_id)
+        )
+    return queryset.order_by('timestamp', 'id').values_list(*READING_FIELDS).iterator(chunk_size=chunk_size)
+
+def _close(trip, min_readings):
+    trip.is_open = False
+    if trip.reading_count < min_readings:
+        if trip.pk:
+            trip.delete()
+        return None
+    trip.save()
+    return trip
+
+def segment_vehicle(vehicle_id, chunk_size=2000):
+    """Fold new readings for one vehicle into its trips. Returns (readings, trips closed)."""
+    moving_speed, stop_gap, min_readings = _settings()
+    checkpoint = TripCheckpoint.objects.filter(vehicle_id=vehicle_id).first()
+    trip = Trip.objects.filter(vehicle_id=vehicle_id, is_open=True).order_by('-started_at').first()
+
+    processed = closed = 0
+    last = None
+    for last in _readings(vehicle_id, checkpoint, chunk_size):
+        telemetry_id, ts, lat, lon, speed, battery = last
+        processed += 1
+        if trip is not None and ts - trip.ended_at > stop_gap:
+            closed += _close(trip, min_readings) is not None
+            trip = None
+        if speed < moving_speed:
+            continue
+        if trip is None:
+            trip = Trip(
+                vehicle_id=vehicle_id, started_at=ts, start_lat=lat, start_lon=lon, start_battery=battery,
+                ended_at=ts, end_lat=lat, end_lon=lon, end_battery=battery,
+                max_speed_kph=speed, reading_count=1,
+            )
+            continue
+        trip.distance_km += float(haversine_km(trip.end_lat, trip.end_lon, [lat], [lon])[0])
+        trip.ended_at, trip.end_lat, trip.end_lon, trip.end_battery = ts, lat, lon, battery
+        trip.max_speed_kph = max(trip.max_speed_kph, speed)
+        trip.reading_count += 1
+
+    if last is None:
+        return 0, 0
+    if trip is not None:
+        trip.save()
+    TripCheckpoint.objects.update_or_create(
+        vehicle_id=vehicle_id, defaults={'last_timestamp': last[1], 'last_telemetry_id': last[0]}
+    )
+    return processed, closed
+
+def close_stale_trips(now=None):
+    """Close open trips whose vehicle has not moved for longer than the stop gap."""
+    _, stop_gap, min_readings = _settings()
+    cutoff = (now or timezone.now()) - stop_gap
+    stale = Trip.objects.filter(is_open=True, ended_at__lt=cutoff)
+    stale.filter(reading_count__lt=min_readings).delete()
+    return stale.update(is_open=False)
+
+def pending_vehicle_ids():
+    """Vehicles whose latest reading is newer than their checkpoint."""
+    checkpoints = dict(TripCheckpoint.objects.values_list('vehicle_id', 'last_telemetry_id'))
+    return [
+        vehicle_id
+        for vehicle_id, telemetry_id in VehicleLiveState.objects.values_list('vehicle_id', 'telemetry_id')
+        if checkpoints.get(vehicle_id) != telemetry_id
+    ]
+
+def segment_trips(vehicle_ids=None, rebuild=False, chunk_size=2000):
+    """Segment new telemetry for `vehicle_ids` (default: every vehicle with new readings)."""
+    if rebuild:
+        scope = {'vehicle_id__in': vehicle_ids} if vehicle_ids is not None else {}
+        with transaction.atomic():
+            Trip.objects.filter(**scope).delete()
+            TripCheckpoint.objects.filter(**scope).delete()
+        if vehicle_ids is None:
+            vehicle_ids = list(EVTelemetry.objects.order_by().values_list('vehicle_id', flat=True).distinct())
+    elif vehicle_ids is None:
+        vehicle_ids = pending_vehicle_ids()
+
+    totals = {'vehicles': 0, 'readings': 0, 'closed': 0}
+    for vehicle_id in vehicle_ids:
+        with transaction.atomic():
+            readings, closed = segment_vehicle(vehicle_id, chunk_size)
+        totals['vehicles'] += bool(readings)
+        totals['readings'] += readings
+        totals['closed'] += closed
+    totals['closed'] += close_stale_trips()
+    return totals
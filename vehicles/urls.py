@@ -3,9 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .api_views import (  # ✅ Use api_views.py, not .api
     VehicleViewSet, PartViewSet, ListingViewSet, SellerProfileViewSet,
     BuyRequestViewSet, AuctionBidViewSet, SellerFeedbackViewSet,
-    EVTelemetryViewSet, ADASCalibrationViewSet, FuseBoxViewSet,
+    EVTelemetryViewSet, TripViewSet, ADASCalibrationViewSet, FuseBoxViewSet,
     WiringDiagramViewSet, SensorReadingViewSet, OBDDiagnosticViewSet,
-    SensorViewSet, AcronymViewSet, BlogPostViewSet,
+    SensorViewSet, AcronymViewSet,
     LegacyDiagnosticCodeViewSet, LegacyGuestBlogViewSet,
     LegacyCarListingViewSet, LegacySellerFeedbackViewSet
 )
@@ -14,8 +14,15 @@ from .views import (
     VehicleMetadataView,
     FuseBoxLookupView,
     SensorChartView,
+    TelemetryAggregateView,
+    TelemetryGeoView,
+    FleetStatusView,
     ExportCSVView,
     ExportPDFView,
+    ExportJobListCreateView,
+    ExportJobDetailView,
+    ExportJobDownloadView,
+    ResponseCacheMetricsView,
 )
 
 # Register all viewsets with DRF router
@@ -28,6 +35,7 @@ router.register(r'buyrequests', BuyRequestViewSet)
 router.register(r'auctions', AuctionBidViewSet)
 router.register(r'feedback', SellerFeedbackViewSet)
 router.register(r'telemetry', EVTelemetryViewSet)
+router.register(r'trips', TripViewSet)
 router.register(r'adas', ADASCalibrationViewSet)
 router.register(r'fuseboxes', FuseBoxViewSet)
 router.register(r'wiringdiagrams', WiringDiagramViewSet)
@@ -35,7 +43,6 @@ router.register(r'sensorreadings', SensorReadingViewSet)
 router.register(r'obd', OBDDiagnosticViewSet)
 router.register(r'sensors', SensorViewSet)
 router.register(r'acronyms', AcronymViewSet)
-router.register(r'blogposts', BlogPostViewSet)
 router.register(r'legacy/dtc', LegacyDiagnosticCodeViewSet)
 router.register(r'legacy/blogs', LegacyGuestBlogViewSet)
 router.register(r'legacy/listings', LegacyCarListingViewSet)
@@ -48,6 +55,13 @@ urlpatterns = [
     path('metadata/', VehicleMetadataView.as_view(), name='vehicle-metadata'),
     path('fusebox/', FuseBoxLookupView.as_view(), name='fusebox-lookup'),
     path('sensor-chart/', SensorChartView.as_view(), name='sensor-chart'),
+    path('telemetry/aggregate/', TelemetryAggregateView.as_view(), name='telemetry-aggregate'),
+    path('telemetry/geo/', TelemetryGeoView.as_view(), name='telemetry-geo'),
+    path('fleet/status/', FleetStatusView.as_view(), name='fleet-status'),
     path('export/csv/', ExportCSVView.as_view(), name='export-csv'),
     path('export/pdf/', ExportPDFView.as_view(), name='export-pdf'),
+    path('export/jobs/', ExportJobListCreateView.as_view(), name='export-jobs'),
+    path('export/jobs/<int:pk>/', ExportJobDetailView.as_view(), name='export-job-detail'),
+    path('export/jobs/<int:pk>/download/', ExportJobDownloadView.as_view(), name='export-job-download'),
+    path('cache/metrics/', ResponseCacheMetricsView.as_view(), name='response-cache-metrics'),
 ]
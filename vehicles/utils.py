@@ -1,25 +1,14 @@
-import requests
-import logging
+from .enrichment import FALLBACK_METADATA, enrich_vins
 
 def fetch_external_metadata(vin):
-    url = f"https://external-api.example.com/vehicles/{vin}"
-    headers = {
-        # 'Authorization': 'Bearer YOUR_API_KEY',  # Optional: if external API requires auth
-        'Accept': 'application/json'
-    }
+    # Single-VIN convenience wrapper; prefer enrich_vins() for many vehicles.
+    return enrich_vins([vin]).get(vin, FALLBACK_METADATA)
 
+def parse_vehicle_id(value):
+    """`?vehicle=` -> int, or None when absent. ValueError when not an integer id."""
+    if value in (None, ''):
+        return None
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logging.warning(f"Metadata fetch failed for VIN {vin}: {response.status_code}")
-    except requests.RequestException as e:
-        logging.error(f"Metadata fetch error for VIN {vin}: {e}")
-
-    # Fallback structure
-    return {
-        "engine": None,
-        "transmission": None,
-        "country_of_origin": None
-    }
+        return int(value)
+    except ValueError:
+        raise ValueError("vehicle must be an integer id") from None
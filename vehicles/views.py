@@ -1,21 +1,34 @@
-from django.http import HttpResponse, JsonResponse, FileResponse
+from django.http import JsonResponse, FileResponse
 from django.shortcuts import render
 from rest_framework import status, viewsets
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.db.models import Max, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta, timezone as dt_timezone
 
-from .models import Vehicle, FuseBox, SensorReading
-from .serializers import VehicleSerializer, FuseBoxSerializer, SensorReadingSerializer
+from .models import Vehicle, FuseBox, SensorReading, EVTelemetry, ExportJob, VehicleLiveState, VinMetadataCache
+from .serializers import VehicleSerializer, FuseBoxSerializer, SensorReadingSerializer, ExportJobSerializer
 from .filters import VehicleFilter, FuseBoxFilter
-from .utils import fetch_external_metadata
+from .enrichment import enrich_vins
+from .vin import decode_vins
+from .export import export_queryset_to_csv, write_sensor_pdf
+from .export_jobs import EXPORT_KINDS, request_export, ranged_file_response
+from .downsample import downsample, parse_threshold
+from .geo import closest_per_vehicle, latest_per_vehicle_in_bbox, nearest_vehicles, within_radius
+from .conditional import ConditionalGetMixin
+from .response_cache import CachedResponseMixin, metrics, tracked_generations
+from .utils import parse_vehicle_id
+from .rollups import AGGREGATES, INTERVALS, TELEMETRY_METRICS, aggregate_series, aggregate_series_raw
 from accounts.permissions import IsAdmin, IsTechnician, IsSeller
 
+import math
 from io import BytesIO
-import csv
-from reportlab.pdfgen import canvas
 from rest_framework_simplejwt.tokens import AccessToken
 
 User = get_user_model()
@@ -41,7 +54,15 @@ class FuseBoxViewSet(viewsets.ModelViewSet):
     filterset_class = FuseBoxFilter
 
 # 🔍 FuseBox Lookup API
-class FuseBoxLookupView(APIView):
+class FuseBoxLookupView(ConditionalGetMixin, CachedResponseMixin, APIView):
+    cache_models = (FuseBox,)
+
+    def get_etag_queryset(self):
+        params = self.request.query_params
+        if not (params.get('make') and params.get('model') and params.get('year')):
+            return None
+        return FuseBox.objects.filter(make=params['make'], model=params['model'], year=params['year'])
+
     def get(self, request):
         make = request.query_params.get('make')
         model = request.query_params.get('model')
@@ -58,19 +79,233 @@ class FuseBoxLookupView(APIView):
         return Response(serializer.data)
 
 # 📊 Sensor Chart API
-class SensorChartView(APIView):
+class SensorChartView(ConditionalGetMixin, APIView):
+    etag_models = (SensorReading, Vehicle)
+    etag_append_only = True
+
+    def get_etag_queryset(self):
+        try:
+            vehicle_id = parse_vehicle_id(self.request.query_params.get('vehicle'))
+        except ValueError:
+            return None  # get() answers 400
+        readings = SensorReading.objects.all()
+        if vehicle_id is not None:
+            readings = readings.filter(vehicle_id=vehicle_id)
+        if self.request.query_params.get('sensor_type'):
+            readings = readings.filter(sensor_type=self.request.query_params['sensor_type'])
+        return readings
+
     def get(self, request):
-        readings = SensorReading.objects.all().order_by('timestamp')
+        try:
+            threshold = parse_threshold(request.query_params.get('downsample'))
+            vehicle_id = parse_vehicle_id(request.query_params.get('vehicle'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        readings = SensorReading.objects.all()
+        if vehicle_id is not None:
+            readings = readings.filter(vehicle_id=vehicle_id)
+        if request.query_params.get('sensor_type'):
+            readings = readings.filter(sensor_type=request.query_params['sensor_type'])
+
+        if threshold is None:
+            data = [
+                {
+                    'timestamp': r.timestamp.isoformat(),
+                    'value': r.value,
+                    'sensor': r.sensor_type,
+                    'vehicle': str(r.vehicle)
+                }
+                for r in readings.select_related('vehicle').order_by('timestamp')
+            ]
+            return Response(data)
+
+        # ?downsample=N: at most N points per (vehicle, sensor) series
+        series = {}
+        for ts, value, vehicle_id, sensor in readings.order_by('timestamp').values_list('timestamp', 'value', 'vehicle_id', 'sensor_type'):
+            series.setdefault((vehicle_id, sensor), []).append((ts, value, vehicle_id, sensor))
+        labels = {v.pk: str(v) for v in Vehicle.objects.filter(pk__in={vehicle_id for vehicle_id, _ in series})}
+        points = sorted(
+            (row for rows in series.values() for row in downsample(rows, threshold)),
+            key=lambda row: row[0],
+        )
         data = [
+            {'timestamp': ts.isoformat(), 'value': value, 'sensor': sensor, 'vehicle': labels[vehicle_id]}
+            for ts, value, vehicle_id, sensor in points
+        ]
+        return Response(data)
+
+# 📈 Time-bucketed telemetry aggregates (served from the rollup tables)
+class TelemetryAggregateView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_windows = {'1m': timedelta(hours=6), '1h': timedelta(days=7), '1d': timedelta(days=365)}
+    max_buckets = 5000
+
+    def get(self, request):
+        params = request.query_params
+        interval = params.get('interval', '1h')
+        if interval not in INTERVALS:
+            return Response({"error": f"interval must be one of {', '.join(INTERVALS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if params.get('sensor_type'):
+            source, metric = 'sensor', params['sensor_type']
+        elif params.get('metric') in TELEMETRY_METRICS:
+            source, metric = 'telemetry', params['metric']
+        else:
+            return Response(
+                {"error": f"Pass sensor_type, or metric as one of {', '.join(TELEMETRY_METRICS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        aggs = [a for a in params.get('agg', ','.join(AGGREGATES)).split(',') if a]
+        if not aggs or set(aggs) - set(AGGREGATES):
+            return Response({"error": f"agg must be a comma-separated subset of {','.join(AGGREGATES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end = self._parse_time(params.get('to')) or timezone.now()
+            start = self._parse_time(params.get('from')) or end - self.default_windows[interval]
+        except ValueError:
+            return Response({"error": "from/to must be ISO 8601 datetimes"}, status=status.HTTP_400_BAD_REQUEST)
+        bucket_seconds = {'1m': 60, '1h': 3600, '1d': 86400}[interval]
+        if (end - start).total_seconds() / bucket_seconds > self.max_buckets:
+            return Response({"error": f"Range spans more than {self.max_buckets} buckets; use a coarser interval"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not params.get('vehicle', '').isdigit():
+            return Response({"error": "vehicle is required"}, status=status.HTTP_400_BAD_REQUEST)
+        vehicles = Vehicle.objects.all()
+        if not request.user.is_staff:
+            vehicles = vehicles.filter(owner=request.user)
+        vehicle = get_object_or_404(vehicles, pk=params['vehicle'])
+
+        series = aggregate_series_raw if params.get('raw') == '1' else aggregate_series
+        return Response({
+            "vehicle": vehicle.pk,
+            "source": source,
+            "metric": metric,
+            "interval": interval,
+            "from": start,
+            "to": end,
+            "points": series(vehicle.pk, source, metric, interval, start, end, aggs),
+        })
+
+    def _parse_time(self, value):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+
+# 📍 Geo queries over recent telemetry: radius, bounding box or nearest vehicles
+class TelemetryGeoView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_window = timedelta(minutes=60)
+    max_radius_km = 500
+    max_k = 100
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            since = self._since(params)
+        except ValueError:
+            return Response({"error": "since must be an ISO 8601 datetime and minutes a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        readings = EVTelemetry.objects.filter(timestamp__gte=since)
+        if not request.user.is_staff:
+            readings = readings.filter(vehicle__owner=request.user)
+
+        try:
+            if params.get('bbox'):
+                west, south, east, north = (float(v) for v in params['bbox'].split(','))
+                if not all(map(math.isfinite, (west, south, east, north))):
+                    raise ValueError
+                if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= 90 and -90 <= north <= 90):
+                    raise ValueError
+                mode, rows = 'bbox', latest_per_vehicle_in_bbox(readings, west, south, east, north)
+            else:
+                lat, lon = float(params['lat']), float(params['lon'])
+                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                    raise ValueError
+                if params.get('k'):
+                    k = int(params['k'])
+                    if not 1 <= k <= self.max_k:
+                        raise ValueError
+                    mode, rows = 'nearest', nearest_vehicles(readings, lat, lon, k)
+                else:
+                    radius_km = float(params['radius_km'])
+                    if not 0 < radius_km <= self.max_radius_km:
+                        raise ValueError
+                    mode, rows = 'radius', closest_per_vehicle(within_radius(readings, lat, lon, radius_km))
+        except (KeyError, ValueError):
+            return Response(
+                {"error": f"Pass bbox=west,south,east,north, or lat & lon with radius_km (max {self.max_radius_km}) or k (max {self.max_k})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [
             {
-                'timestamp': r.timestamp.isoformat(),
-                'value': r.value,
-                'sensor': r.sensor_type,
-                'vehicle': str(r.vehicle)
+                'vehicle': row['vehicle_id'],
+                'telemetry': row['id'],
+                'location': {'lat': row['location_lat'], 'lon': row['location_lon']},
+                'timestamp': row['timestamp'],
+                **({'distance_km': round(row['distance_km'], 3)} if 'distance_km' in row else {}),
             }
-            for r in readings
+            for row in rows
         ]
-        return Response(data)
+        return Response({'mode': mode, 'since': since, 'count': len(results), 'results': results})
+
+    def _since(self, params):
+        if params.get('since'):
+            parsed = parse_datetime(params['since'])
+            if parsed is None:
+                raise ValueError(params['since'])
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+        minutes = int(params['minutes']) if params.get('minutes') else None
+        if minutes is not None and minutes <= 0:
+            raise ValueError(minutes)
+        return timezone.now() - (timedelta(minutes=minutes) if minutes else self.default_window)
+
+# 🗺️ Fleet status: latest reading per vehicle from the live state table
+class FleetStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+    fields = (
+        'vehicle_id', 'vehicle__vin', 'vehicle__make', 'vehicle__model',
+        'battery_level', 'range_estimate_km', 'location_lat', 'location_lon', 'speed_kph', 'recorded_at',
+    )
+
+    def get(self, request):
+        states = VehicleLiveState.objects.all()
+        if not request.user.is_staff:
+            states = states.filter(vehicle__owner=request.user)
+
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            # west,south,east,north (GeoJSON order); west > east crosses the antimeridian
+            try:
+                west, south, east, north = (float(v) for v in bbox.split(','))
+            except ValueError:
+                return Response({"error": "bbox must be west,south,east,north"}, status=status.HTTP_400_BAD_REQUEST)
+            states = states.filter(location_lat__gte=south, location_lat__lte=north)
+            if west <= east:
+                states = states.filter(location_lon__gte=west, location_lon__lte=east)
+            else:
+                states = states.filter(Q(location_lon__gte=west) | Q(location_lon__lte=east))
+
+        rows = [
+            {
+                'vehicle': row['vehicle_id'],
+                'vin': row['vehicle__vin'],
+                'make': row['vehicle__make'],
+                'model': row['vehicle__model'],
+                'battery_level': row['battery_level'],
+                'range_estimate_km': row['range_estimate_km'],
+                'location': {'lat': row['location_lat'], 'lon': row['location_lon']},
+                'speed_kph': row['speed_kph'],
+                'recorded_at': row['recorded_at'],
+            }
+            for row in states.order_by('vehicle_id').values(*self.fields)
+        ]
+        return Response({'count': len(rows), 'vehicles': rows})
 
 # 📤 CSV Export API with Token Validation
 class ExportCSVView(APIView):
@@ -88,13 +323,14 @@ class ExportCSVView(APIView):
         except Exception:
             return Response({'error': 'Unauthorized'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="sensor_data.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Timestamp', 'Sensor', 'Value'])
-        for r in SensorReading.objects.all():
-            writer.writerow([r.timestamp.isoformat(), r.sensor_type, r.value])
-        return response
+        return export_queryset_to_csv(
+            SensorReading.objects.all(),
+            ['timestamp', 'sensor_type', 'value'],
+            filename='sensor_data.csv',
+            header=['Timestamp', 'Sensor', 'Value'],
+            formatters={'timestamp': lambda ts: ts.isoformat()},
+            request=request,
+        )
 
 
 # 📤 PDF Export API with Token Validation
@@ -114,29 +350,67 @@ class ExportPDFView(APIView):
             return Response({'error': 'Unauthorized'}, status=status.HTTP_401_UNAUTHORIZED)
 
         buffer = BytesIO()
-        p = canvas.Canvas(buffer)
-        p.setTitle("Sensor Report")
-        p.setFont("Helvetica", 12)
-        p.drawString(100, 800, "Sensor Report")
-
-        y = 780
-        for r in SensorReading.objects.all():
-            line = f"{r.timestamp.strftime('%Y-%m-%d %H:%M:%S')} - {r.sensor_type}: {r.value}"
-            p.drawString(100, y, line)
-            y -= 20
-            if y < 50:
-                p.showPage()
-                y = 800
-
-        p.showPage()
-        p.save()
+        write_sensor_pdf(buffer)
         buffer.seek(0)
         return FileResponse(buffer, as_attachment=True, filename='sensor_report.pdf')
 
 
+# 🧾 Background Export Jobs: queue, poll, then download with Range support
+class ExportJobListCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        jobs = ExportJob.objects.filter(requested_by=request.user)[:50]
+        return Response(ExportJobSerializer(jobs, many=True, context={'request': request}).data)
+
+    def post(self, request):
+        serializer = ExportJobSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        job, reused = request_export(request.user, serializer.validated_data['kind'])
+        data = ExportJobSerializer(job, context={'request': request}).data
+        data['reused'] = reused
+        return Response(data, status=status.HTTP_200_OK if job.status == 'done' else status.HTTP_202_ACCEPTED)
+
+class ExportJobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user)
+        return Response(ExportJobSerializer(job, context={'request': request}).data)
+
+class ExportJobDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user)
+        if job.status != 'done' or not job.file:
+            return Response({'error': f'Export is {job.status}.'}, status=status.HTTP_409_CONFLICT)
+
+        extension, content_type, _ = EXPORT_KINDS[job.kind]
+        filename = f'{job.kind}_{job.finished_at.strftime("%Y%m%d_%H%M%S")}.{extension}'
+        etag = f'"{job.file.name}:{job.size}"'
+        return ranged_file_response(request, job.file.path, filename, content_type, etag=etag)
+
+
 # 🚗 Vehicle Metadata API with Role-Based Access + Enrichment
-class VehicleMetadataView(APIView):
+class VehicleMetadataView(ConditionalGetMixin, CachedResponseMixin, APIView):
     permission_classes = [IsAuthenticated]
+    cache_models = etag_models = (Vehicle, VinMetadataCache)
+    cache_per_user = True  # sellers only see their own vehicles
+
+    def get_etag_queryset(self):
+        user = self.request.user
+        if getattr(user, 'role', None) == 'seller':
+            return Vehicle.objects.filter(owner=user)
+        return Vehicle.objects.all()
+
+    def get_etag_markers(self, queryset, models):
+        markers = super().get_etag_markers(queryset, (Vehicle,))
+        if markers is not None:
+            # Enrichment refreshes show up as a newer fetched_at.
+            latest = VinMetadataCache.objects.order_by('-fetched_at').values('fetched_at')[:1]
+            markers['vin_cache'] = Max(Subquery(latest))
+        return markers
 
     def get(self, request):
         user = request.user
@@ -146,23 +420,40 @@ class VehicleMetadataView(APIView):
         else:
             vehicles = Vehicle.objects.all()
 
+        rows = list(vehicles.values_list('make', 'model', 'year', 'vin'))
+        decoded = decode_vins([vin for _, _, _, vin in rows])
+        # Country, manufacturer and model year come from the VIN itself; only
+        # engine/transmission need the (cached) upstream service.
+        external = enrich_vins([info['vin'] for info in decoded if info['valid']])
+
         enriched_data = []
-        for v in vehicles:
+        for (make, model, year, vin), info in zip(rows, decoded):
             base = {
-                "make": v.make,
-                "model": v.model,
-                "year": v.year,
-                "vin": v.vin
+                "make": make,
+                "model": model,
+                "year": year,
+                "vin": vin,
+                "manufacturer": info.get("manufacturer"),
+                "model_year": info.get("model_year"),
+                "country": info.get("country"),
             }
 
-            external = fetch_external_metadata(v.vin)
-            if external:
+            metadata = external.get(info['vin'])
+            if metadata:
                 base.update({
-                    "engine": external.get("engine"),
-                    "transmission": external.get("transmission"),
-                    "country": external.get("country_of_origin")
+                    "engine": metadata.get("engine"),
+                    "transmission": metadata.get("transmission"),
+                    "country": base["country"] or metadata.get("country_of_origin")
                 })
 
             enriched_data.append(base)
 
         return Response(enriched_data)
+
+
+# 📈 Response cache hit ratio and latency (per server process)
+class ResponseCacheMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'views': metrics(), 'generations': tracked_generations()})
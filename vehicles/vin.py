@@ -0,0 +1,196 @@
+"""
+Offline VIN decoding (ISO 3779 / 49 CFR 565).
+
+    positions 1-3   WMI  world manufacturer identifier -> manufacturer, country
+    positions 4-8   VDS  vehicle descriptor section
+    position  9          check digit (mandatory for North American VINs)
+    position  10         model year code
+    position  11         plant code
+    positions 12-17      serial number
+
+The lookup tables are built once at import time. decode_vins() works on a
+whole batch at once: check digits and model years are computed with NumPy
+over an (n, 17) byte matrix, and each distinct WMI is looked up only once.
+"""
+import datetime
+
+import numpy as np
+
+VIN_LENGTH = 17
+VALID_CHARS = frozenset('0123456789ABCDEFGHJKLMNPRSTUVWXYZ')
+
+_TRANSLITERATION = {
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+}
+_WEIGHTS = np.array([8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+
+# byte value -> transliterated value, used to vectorise the check digit
+_CHAR_VALUES = np.zeros(256, dtype=np.int64)
+for _c in '0123456789':
+    _CHAR_VALUES[ord(_c)] = int(_c)
+for _c, _v in _TRANSLITERATION.items():
+    _CHAR_VALUES[ord(_c)] = _v
+
+# Model year: 30-year cycle, 1980-2009 then 2010-2039 (I, O, Q, U, Z and 0 unused).
+_YEAR_CODES = 'ABCDEFGHJKLMNPRSTVWXY123456789'
+_YEAR_OFFSETS = np.full(256, -1, dtype=np.int64)
+for _i, _c in enumerate(_YEAR_CODES):
+    _YEAR_OFFSETS[ord(_c)] = _i
+
+# Second-character order used by the ISO 3779 country ranges.
+_RANGE_ORDER = 'ABCDEFGHJKLMNPRSTUVWXYZ1234567890'
+
+# (first char, second char from, second char to, country)
+_COUNTRY_RANGES = [
+    ('A', 'A', 'H', 'South Africa'),
+    ('J', 'A', '0', 'Japan'),
+    ('K', 'L', 'R', 'South Korea'),
+    ('L', 'A', '0', 'China'),
+    ('M', 'A', 'E', 'India'),
+    ('M', 'F', 'K', 'Indonesia'),
+    ('M', 'L', 'R', 'Thailand'),
+    ('S', 'A', 'M', 'United Kingdom'),
+    ('S', 'N', 'T', 'Germany'),
+    ('S', 'U', 'Z', 'Poland'),
+    ('T', 'A', 'H', 'Switzerland'),
+    ('T', 'J', 'P', 'Czech Republic'),
+    ('T', 'R', 'V', 'Hungary'),
+    ('V', 'A', 'E', 'Austria'),
+    ('V', 'F', 'R', 'France'),
+    ('V', 'S', 'W', 'Spain'),
+    ('W', 'A', '0', 'Germany'),
+    ('X', 'L', 'R', 'Netherlands'),
+    ('X', 'S', '0', 'Russia'),
+    ('Y', 'A', 'E', 'Belgium'),
+    ('Y', 'F', 'K', 'Finland'),
+    ('Y', 'S', 'W', 'Sweden'),
+    ('Z', 'A', 'R', 'Italy'),
+    ('1', 'A', '0', 'United States'),
+    ('2', 'A', '0', 'Canada'),
+    ('3', 'A', 'W', 'Mexico'),
+    ('4', 'A', '0', 'United States'),
+    ('5', 'A', '0', 'United States'),
+    ('6', 'A', 'W', 'Australia'),
+    ('7', 'A', 'E', 'New Zealand'),
+    ('7', 'F', '0', 'United States'),
+    ('9', 'A', 'E', 'Brazil'),
+]
+_COUNTRIES = {
+    first + second: country
+    for first, lo, hi, country in _COUNTRY_RANGES
+    for second in _RANGE_ORDER[_RANGE_ORDER.index(lo):_RANGE_ORDER.index(hi) + 1]
+}
+
+_REGIONS = {}
+_REGIONS.update(dict.fromkeys('ABCDEFGH', 'Africa'))
+_REGIONS.update(dict.fromkeys('JKLMNPR', 'Asia'))
+_REGIONS.update(dict.fromkeys('STUVWXYZ', 'Europe'))
+_REGIONS.update(dict.fromkeys('12345', 'North America'))
+_REGIONS.update(dict.fromkeys('67', 'Oceania'))
+_REGIONS.update(dict.fromkeys('89', 'South America'))
+
+# Common WMIs. Unknown WMIs still decode country, region and model year.
+WMI_MANUFACTURERS = {
+    '1C3': 'Chrysler', '1C4': 'Chrysler', '1C6': 'Ram', '1FA': 'Ford', '1FD': 'Ford',
+    '1FM': 'Ford', '1FT': 'Ford', '1G1': 'Chevrolet', '1G4': 'Buick', '1G6': 'Cadillac',
+    '1GC': 'Chevrolet', '1GM': 'Pontiac', '1GT': 'GMC', '1HG': 'Honda', '1J4': 'Jeep',
+    '1LN': 'Lincoln', '1ME': 'Mercury', '1N4': 'Nissan', '1N6': 'Nissan', '1VW': 'Volkswagen',
+    '1YV': 'Mazda', '2C3': 'Chrysler', '2FA': 'Ford', '2G1': 'Chevrolet', '2HG': 'Honda',
+    '2HK': 'Honda', '2HM': 'Hyundai', '2T1': 'Toyota', '2T2': 'Lexus', '3FA': 'Ford',
+    '3G1': 'Chevrolet', '3MZ': 'Mazda', '3N1': 'Nissan', '3VW': 'Volkswagen', '4JG': 'Mercedes-Benz',
+    '4S3': 'Subaru', '4S4': 'Subaru', '4T1': 'Toyota', '4T3': 'Toyota', '4US': 'BMW',
+    '5FN': 'Honda', '5J6': 'Honda', '5N1': 'Nissan', '5NP': 'Hyundai', '5TD': 'Toyota',
+    '5UX': 'BMW', '5YJ': 'Tesla', '7G2': 'Tesla', '7SA': 'Tesla', '9BW': 'Volkswagen',
+    'JA3': 'Mitsubishi', 'JA4': 'Mitsubishi', 'JF1': 'Subaru', 'JF2': 'Subaru', 'JHL': 'Honda',
+    'JHM': 'Honda', 'JM1': 'Mazda', 'JN1': 'Nissan', 'JN8': 'Nissan', 'JS2': 'Suzuki',
+    'JT2': 'Toyota', 'JTD': 'Toyota', 'JTE': 'Toyota', 'JTH': 'Lexus', 'JTJ': 'Lexus',
+    'JTN': 'Toyota', 'KL1': 'GM Korea', 'KMH': 'Hyundai', 'KNA': 'Kia', 'KND': 'Kia',
+    'KNM': 'Renault Samsung', 'KPT': 'SsangYong', 'LFV': 'FAW-Volkswagen', 'LPS': 'Polestar',
+    'LRW': 'Tesla', 'LSV': 'SAIC Volkswagen', 'LVS': 'Changan Ford', 'LYV': 'Volvo',
+    'SAJ': 'Jaguar', 'SAL': 'Land Rover', 'SCC': 'Lotus', 'SCF': 'Aston Martin', 'SHH': 'Honda',
+    'SJN': 'Nissan', 'TMB': 'Skoda', 'TRU': 'Audi', 'VF1': 'Renault', 'VF3': 'Peugeot',
+    'VF7': 'Citroen', 'VSS': 'SEAT', 'W0L': 'Opel', 'W1K': 'Mercedes-Benz', 'W1N': 'Mercedes-Benz',
+    'WA1': 'Audi', 'WAU': 'Audi', 'WBA': 'BMW', 'WBS': 'BMW M', 'WBY': 'BMW i',
+    'WDB': 'Mercedes-Benz', 'WDC': 'Mercedes-Benz', 'WDD': 'Mercedes-Benz', 'WF0': 'Ford',
+    'WMW': 'MINI', 'WP0': 'Porsche', 'WP1': 'Porsche', 'WV1': 'Volkswagen', 'WV2': 'Volkswagen',
+    'WVG': 'Volkswagen', 'WVW': 'Volkswagen', 'XTA': 'Lada', 'YS3': 'Saab', 'YV1': 'Volvo',
+    'YV4': 'Volvo', 'ZAR': 'Alfa Romeo', 'ZFA': 'Fiat', 'ZFF': 'Ferrari', 'ZHW': 'Lamborghini',
+}
+
+def is_north_american(vin):
+    return bool(vin) and vin[0] in '12345'
+
+def vin_errors(vin):
+    """Structural problems with `vin`; the check digit is verified separately."""
+    if len(vin) != VIN_LENGTH:
+        return ["VIN must be exactly 17 characters."]
+    bad = sorted(set(vin) - VALID_CHARS)
+    if bad:
+        return [f"VIN contains invalid characters: {', '.join(bad)} (I, O and Q are never used)."]
+    return []
+
+def _wmi_info(wmi):
+    return {
+        'manufacturer': WMI_MANUFACTURERS.get(wmi),
+        'country': _COUNTRIES.get(wmi[:2]),
+        'region': _REGIONS.get(wmi[0]),
+    }
+
+def decode_vins(vins, current_year=None):
+    """
+    Decode a list of VINs, returning one dict per input in the same order.
+    Invalid VINs get `valid: False` and their `errors`, nothing else.
+    """
+    current_year = current_year or datetime.date.today().year
+    vins = [(vin or '').strip().upper() for vin in vins]
+    errors = [vin_errors(vin) for vin in vins]
+    ok = [i for i, errs in enumerate(errors) if not errs]
+
+    results = [{'vin': vin, 'valid': False, 'errors': errs} for vin, errs in zip(vins, errors)]
+    if not ok:
+        return results
+
+    matrix = np.frombuffer(''.join(vins[i] for i in ok).encode('ascii'), dtype=np.uint8).reshape(-1, VIN_LENGTH)
+
+    remainders = (_CHAR_VALUES[matrix] @ _WEIGHTS) % 11
+    expected = np.where(remainders == 10, ord('X'), remainders + ord('0'))
+    check_ok = expected == matrix[:, 8]
+
+    # Position 7 alphabetic -> 2010+ cycle (North American rule); otherwise
+    # take the latest cycle that is not in the future.
+    offsets = _YEAR_OFFSETS[matrix[:, 9]]
+    recent = 2010 + offsets
+    alpha_pos7 = matrix[:, 6] >= ord('A')
+    north_american = np.isin(matrix[:, 0], np.frombuffer(b'12345', dtype=np.uint8))
+    years = np.where(
+        north_american,
+        np.where(alpha_pos7, recent, 1980 + offsets),
+        np.where(recent <= current_year + 1, recent, 1980 + offsets),
+    )
+    years = np.where(offsets < 0, -1, years)
+
+    wmi_cache = {}
+    for row, i in enumerate(ok):
+        vin = vins[i]
+        wmi = vin[:3]
+        if wmi not in wmi_cache:
+            wmi_cache[wmi] = _wmi_info(wmi)
+        results[i] = {
+            'vin': vin,
+            'valid': True,
+            'errors': [],
+            'wmi': wmi,
+            'vds': vin[3:8],
+            'vis': vin[9:],
+            **wmi_cache[wmi],
+            'model_year': int(years[row]) if years[row] > 0 else None,
+            'plant_code': vin[10],
+            'serial_number': vin[11:],
+            'check_digit_valid': bool(check_ok[row]),
+        }
+    return results
+
+def decode_vin(vin, current_year=None):
+    return decode_vins([vin], current_year=current_year)[0]